@@ -1,5 +1,5 @@
 import logging
-from flask import Flask
+from flask import Flask, Response
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
@@ -8,6 +8,7 @@ from flask_admin.menu import MenuLink
 from flask_mail import Mail
 from flask_session import Session
 from scramp import ScramMechanism
+from app.routing_session import RoutingSession
 
 # Logger Configuration
 logging.basicConfig(
@@ -18,7 +19,7 @@ logging.basicConfig(
 
 # Components
 logger: logging.Logger
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
 mail = Mail()
@@ -31,23 +32,36 @@ def create_app(config):
 
     # Set config
     app.config.from_object(config)
-    app.config["SESSION_SQLALCHEMY"] = db
     
     # Init components
     global logger
     logger = app.logger
+    from app.util import db_pool, read_replica
+    pool = db_pool.configure(app)
+    has_replica = read_replica.configure(app)
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     mail.init_app(app)
-    if not app.config.get("TESTING", False): # Only use the server stored session when not testing
+    
+    # Init the session backend
+    from app.util import session_backend
+    backend = session_backend.configure(app)
+    if backend != "cookie":
         sess.init_app(app)
-    logger.info("Initialized basic components")
+    app.after_request(session_backend.refresh_session)
+    logger.info(f"Initialized basic components, using the '{pool}' database pool and the '{backend}' session backend")
+    
+    # Route the reads of GET requests to the read replica, if any
+    if has_replica:
+        app.before_request(read_replica.select_reads)
+        app.after_request(read_replica.pin_after_writes)
+        logger.info("Reading GET requests from the read replica")
 
     with app.app_context():
         from app import models  # ORM Models
-        from app.util import security  # Required utilities
-        from app.routes import vault_bp, auth_bp, account_bp, admin_control_bp  # Route blueprints
+        from app.util import security, search, query_counter, handshake, user_cache, totp_qrcode, rate_limit, metrics  # Required utilities
+        from app.routes import vault_bp, auth_bp, account_bp, admin_control_bp, async_read_bp, metrics_bp  # Route blueprints
         from app.views import AdminHomeView, UserModelView, VaultEntryModelView, OTPModelView, SecretModelView    # ModelViews
         
         # Init kdf and fernet
@@ -55,13 +69,66 @@ def create_app(config):
             raise ValueError("FERNET_KEY or KDF_SECRET not set in config")
         fernet_key, kdf_secret = str(app.config["FERNET_KEY"]), str(app.config["KDF_SECRET"])
         security.fernet.init(fernet_key.encode())
-        security.kdf.init(kdf_secret.encode())
-        logger.info("Initialized security components")
+        security.pool.init(
+            app.config.get("CRYPTO_POOL_WORKERS", 2),
+            app.config.get("CRYPTO_POOL_MAX_PENDING", 64),
+            app.config.get("CRYPTO_POOL_TIMEOUT_SECONDS", 30)
+        )
+        security.kdf.init(kdf_secret.encode(), app.config.get("KDF_ITERATIONS", 390000))
+        security.hasher.init(app.config.get("PASSWORD_HASH_METHOD", "scrypt"))
+        scram.iteration_count = app.config.get("SCRAM_ITERATIONS", 4096)
+        security.otp_hasher.init(kdf_secret.encode())
+        security.secret_cache.init(app.config.get("SECRET_CACHE_MAX_ENTRIES", 10000), app.config.get("SECRET_CACHE_TTL_SECONDS", 300))
+        handshake_store = handshake.init(
+            app.config.get("SCRAM_HANDSHAKE_STORE", "token"),
+            fernet_key.encode(),
+            app.config.get("SCRAM_HANDSHAKE_TTL_SECONDS", 60),
+            app.config.get("SCRAM_HANDSHAKE_MAX_ENTRIES", 10000)
+        )
+        logger.info(f"Initialized security components, using the '{handshake_store.name}' SCRAM handshake store")
+        
+        # Init the rate limiter
+        limiter = rate_limit.init(
+            app.config.get("RATE_LIMIT_BACKEND", "memory"),
+            app.config.get("RATE_LIMIT_REDIS_URL"),
+            app.config.get("RATE_LIMIT_MAX_ENTRIES", 100000),
+            app.config.get("RATE_LIMIT_REDIS_BACKOFF_SECONDS", 30)
+        )
+        logger.info(f"Initialized the rate limiter, using the '{limiter.name if limiter is not None else 'none'}' backend")
         
-        # Create all tables
-        db.create_all()
+        # Create all tables, on the primary only since the replica gets them through replication
+        db.create_all(bind_key=None)
         logger.info("Created database tables")
         
+        # Init the user cache
+        user_cache.init(app.config.get("USER_CACHE_MAX_ENTRIES", 10000), app.config.get("USER_CACHE_TTL_SECONDS", 5))
+        
+        # Init the TOTP QR code cache
+        totp_qrcode.init(app.config.get("TOTP_QRCODE_CACHE_MAX_ENTRIES", 1000), app.config.get("TOTP_QRCODE_CACHE_TTL_SECONDS", 300))
+        
+        # Count the queries of each request, on the primary and the replica
+        for engine in db.engines.values():
+            query_counter.init(engine)
+        if app.config.get("QUERY_COUNT_HEADER", False):
+            @app.after_request
+            def add_query_count_header(response: Response):
+                response.headers["X-Query-Count"] = str(query_counter.get_count())
+                return response
+        
+        # Observe the latency, status and queries of each request, shared by the workers if PROMETHEUS_MULTIPROC_DIR is set
+        app.before_request(metrics.start_request)
+        app.after_request(metrics.observe_request)
+        logger.info(f"Collecting metrics {'across the worker processes' if metrics.is_multiprocess() else 'in this process'}")
+        
+        # Init the vault search engine
+        search_engine = search.init(
+            db.engine,
+            app.config.get("VAULT_SEARCH_BACKEND", "auto"),
+            app.config.get("VAULT_SEARCH_INDEX_MAX_BYTES", 64 * 1024 * 1024),
+            app.config.get("VAULT_SEARCH_INDEX_TTL_SECONDS", 30)
+        )
+        logger.info(f"Initialized the '{search_engine.name}' vault search engine")
+        
         # Create the admin user if not in testing mode
         if not app.config.get("TESTING", False):
             email = app.config.get("ADMIN_EMAIL", "admin")
@@ -73,8 +140,34 @@ def create_app(config):
         app.register_blueprint(vault_bp, url_prefix="/vault")
         app.register_blueprint(account_bp, url_prefix="/account")
         app.register_blueprint(admin_control_bp, url_prefix="/admin")
+        app.register_blueprint(metrics_bp)
+        
+        # Mount the async read routes next to the sync ones, if enabled
+        if app.config.get("ASYNC_READS_ENABLED", False):
+            from app.util import async_db
+            async_url = async_db.to_async_url(app.config.get("ASYNC_DATABASE_URI") or app.config["SQLALCHEMY_DATABASE_URI"])
+            async_db.init(async_url, **db_pool.engine_options(
+                async_url,
+                app.config,
+                app.config.get("ASYNC_DB_POOL_SIZE", 10),
+                app.config.get("ASYNC_DB_MAX_OVERFLOW", 10)
+            ))
+            app.register_blueprint(async_read_bp, url_prefix="/async")
         logger.info("Registered blueprints")
         
+        # Register the CLI commands
+        from app.commands import outbox_cli, retention_cli, security_cli
+        app.cli.add_command(outbox_cli)
+        app.cli.add_command(retention_cli)
+        app.cli.add_command(security_cli)
+        
+        # Start the purge scheduler if enabled
+        purge_interval = app.config.get("RETENTION_PURGE_INTERVAL_SECONDS", 0)
+        if purge_interval > 0 and not app.config.get("TESTING", False):
+            from app.util import retention
+            retention.start_scheduler(app, purge_interval)
+            logger.info(f"Started the retention scheduler, purging every {purge_interval} seconds")
+        
         # Define Admin dashboard with ModelViews
         app_admin = Admin(app, name="VaultBerry Admin", template_mode="bootstrap3", index_view=AdminHomeView())
         app_admin.add_view(UserModelView(models.User, db.session, category="Tables"))
@@ -0,0 +1,5 @@
+from .outbox import outbox_cli
+from .retention import retention_cli
+from .security import security_cli
+
+__all__ = ["outbox_cli", "retention_cli", "security_cli"]
\ No newline at end of file
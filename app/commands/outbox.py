@@ -0,0 +1,30 @@
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app import db, logger
+from app.util import mail_outbox
+
+outbox_cli = AppGroup("outbox", help="Send the emails queued in the outbox.")
+
+@outbox_cli.command("send")
+def send():
+    """Send the due emails once."""
+    sent, failed = mail_outbox.send_pending_from_config()
+    click.echo(f"Sent {sent} emails, {failed} failed")
+
+@outbox_cli.command("worker")
+def worker():
+    """Keep sending the due emails, polling the outbox."""
+    poll_seconds = current_app.config.get("MAIL_OUTBOX_POLL_SECONDS", 10)
+    logger.info(f"Outbox worker started, polling every {poll_seconds} seconds")
+    while True:
+        try:
+            sent, failed = mail_outbox.send_pending_from_config()
+            if sent or failed:
+                logger.info(f"Outbox worker sent {sent} emails, {failed} failed")
+        except Exception as e:
+            logger.error(f"Outbox worker failed. Error: {e}", exc_info=True)
+        finally:
+            db.session.remove()
+        time.sleep(poll_seconds)
\ No newline at end of file
@@ -0,0 +1,12 @@
+import click
+from flask.cli import AppGroup
+from app.util import retention
+
+retention_cli = AppGroup("retention", help="Delete expired rows.")
+
+@retention_cli.command("purge")
+def purge():
+    """Delete the expired rows of every table purged by retention.purge_all."""
+    results = retention.purge_all()
+    for name, (deleted, seconds) in results.items():
+        click.echo(f"{name}: deleted {deleted} rows in {seconds:.3f}s")
\ No newline at end of file
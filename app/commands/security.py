@@ -0,0 +1,24 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app.util.security import calibration
+
+security_cli = AppGroup("security", help="Tune the security parameters.")
+
+@security_cli.command("calibrate")
+@click.option("--target-ms", default=250, show_default=True, help="Target duration of a password hash or key derivation on this host.")
+@click.option("--scram-target-ms", default=100, show_default=True, help="Target duration of the SCRAM key derivation, which clients repeat on every login.")
+@click.option("--hash", "hash_family", type=click.Choice(["scrypt", "pbkdf2"]), default="scrypt", show_default=True, help="The password hash family.")
+def calibrate(target_ms: int, scram_target_ms: int, hash_family: str):
+    """Benchmark this host and print the cost parameters that hit the target durations."""
+    password_hash_method = calibration.calibrate_password_hash(target_ms / 1000, hash_family)
+    kdf_iterations = calibration.calibrate_kdf(target_ms / 1000)
+    scram_iterations = calibration.calibrate_scram(scram_target_ms / 1000)
+    
+    click.echo("# Current")
+    for key in ("PASSWORD_HASH_METHOD", "KDF_ITERATIONS", "SCRAM_ITERATIONS"):
+        click.echo(f"# {key}={current_app.config.get(key)}")
+    click.echo("# Calibrated, add to the environment to apply to new secrets")
+    click.echo(f"PASSWORD_HASH_METHOD={password_hash_method}")
+    click.echo(f"KDF_ITERATIONS={kdf_iterations}")
+    click.echo(f"SCRAM_ITERATIONS={scram_iterations}")
\ No newline at end of file
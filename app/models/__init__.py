@@ -2,5 +2,10 @@ from .user import User
 from .secret import Secret
 from .one_time_password import OneTimePassword
 from .vault_entry import VaultEntry
+from .reencryption_job import ReencryptionJob
+from .reencryption_chunk import ReencryptionChunk
+from .vault_tombstone import VaultTombstone
+from .outbox_mail import OutboxMail
+from .used_handshake import UsedHandshake
 
-__all__ = ["User", "Secret", "OneTimePassword", "VaultEntry"]
\ No newline at end of file
+__all__ = ["User", "Secret", "OneTimePassword", "VaultEntry", "ReencryptionJob", "ReencryptionChunk", "VaultTombstone", "OutboxMail", "UsedHandshake"]
\ No newline at end of file
@@ -1,8 +1,8 @@
-from sqlalchemy import Integer, String, BigInteger, Boolean, ForeignKey, Enum
+from sqlalchemy import Integer, String, BigInteger, Boolean, ForeignKey, Enum, Index, select, update, and_, or_
 from sqlalchemy.orm import Mapped, mapped_column, MappedColumn, relationship
 from typing import TYPE_CHECKING
 from app import db
-from app.util import security, get_now_timestamp
+from app.util import security, retention, get_now_timestamp
 
  # TODO: Use for veification token
 if TYPE_CHECKING:
@@ -14,13 +14,20 @@ class OneTimePassword(db.Model):
     id: MappedColumn[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: MappedColumn[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     type: Mapped[str] = mapped_column(Enum("RECOVERY", "ACTIVATION", name="otp_type", native_enum=True))
-    otp: MappedColumn[str] = mapped_column(String(255))
+    otp_hash: MappedColumn[str] = mapped_column(String(64))  # Keyed hash, the OTP itself is only sent to the user
     created_at: MappedColumn[int] = mapped_column(BigInteger)
     expires_at: MappedColumn[int] = mapped_column(BigInteger)
     used: MappedColumn[bool] = mapped_column(Boolean, default=False)
     
     user: Mapped["User"] = relationship("User", back_populates="otps")
     
+    __table_args__ = (
+        # Cooldown checks look up the latest OTP of a given type
+        Index("ix_otps_user_id_type_created_at", "user_id", "type", "created_at"),
+        # Verification looks up the OTP by its hash
+        Index("ix_otps_user_id_otp_hash", "user_id", "otp_hash"),
+    )
+    
     def is_expired(self) -> bool:
         """
         Returns True if the OTP is expired, False otherwise.
@@ -28,7 +35,7 @@ class OneTimePassword(db.Model):
         return self.expires_at < get_now_timestamp()
     
     @classmethod
-    def get_cooldown_remaining_seconds_for_user(self, user_id: int, type: str, cooldown_seconds: int = 86400) -> int:
+    def get_cooldown_remaining_seconds_for_user(cls, user_id: int, type: str, cooldown_seconds: int = 86400) -> int:
         """Returns the remaining seconds if the cooldown is not expired, 0 otherwise.
         
         Args:
@@ -37,10 +44,12 @@ class OneTimePassword(db.Model):
             cooldown_seconds (int): The number of seconds until the cooldown expires.
         """
         now = get_now_timestamp()
-        last_otp: OneTimePassword = OneTimePassword.query.filter_by(user_id=user_id, type=type).order_by(OneTimePassword.created_at.desc()).first()
+        last_created_at = db.session.scalar(
+            select(cls.created_at).where(cls.user_id == user_id, cls.type == type).order_by(cls.created_at.desc()).limit(1)
+        )
         ref_time = now - cooldown_seconds
-        if last_otp and last_otp.created_at > ref_time:
-            return last_otp.created_at - ref_time
+        if last_created_at is not None and last_created_at > ref_time:
+            return last_created_at - ref_time
         return 0
     
     @classmethod
@@ -61,7 +70,7 @@ class OneTimePassword(db.Model):
         one_time_password = OneTimePassword(
             user_id=user_id,
             type="RECOVERY",
-            otp=otp,
+            otp_hash=security.otp_hasher.hash(otp),
             created_at=now,
             expires_at=expires_at
         )
@@ -86,9 +95,53 @@ class OneTimePassword(db.Model):
         one_time_password = OneTimePassword(
             user_id=user_id,
             type="ACTIVATION",
-            otp=otp,
+            otp_hash=security.otp_hasher.hash(otp),
             created_at=now,
             expires_at=expires_at
         )
         db.session.add(one_time_password)
-        return otp
\ No newline at end of file
+        return otp
+    
+    @classmethod
+    def consume(cls, user_id: int, otp: str, type: str | None = None) -> bool:
+        """Marks a valid OTP as used, in a single atomic statement.
+        
+        Concurrent requests with the same OTP can't both succeed, since only one of them
+        finds it unused.
+        
+        Args:
+            user_id (int): The ID of the user.
+            otp (str): The OTP to verify.
+            type (str | None): The type of OTP, or None for any type.
+            
+        Returns:
+            bool: True if the OTP was valid and is now used, False otherwise.
+        """
+        conditions = [
+            cls.user_id == user_id,
+            cls.otp_hash == security.otp_hasher.hash(otp),
+            cls.used.is_(False),
+            cls.expires_at > get_now_timestamp()
+        ]
+        if type is not None:
+            conditions.append(cls.type == type)
+        result = db.session.execute(
+            update(cls).where(*conditions).values(used=True).returning(cls.id),
+            execution_options={"synchronize_session": False}
+        )
+        return result.first() is not None
+    
+    @classmethod
+    def purge_expired(cls, retention_seconds: int = 86400, batch_size: int = 500) -> int:
+        """Deletes the used or expired OTPs created before the retention period, in batches.
+        
+        Args:
+            retention_seconds (int): The number of seconds used or expired OTPs are kept, which must cover the cooldowns.
+            batch_size (int): The number of OTPs deleted per transaction.
+            
+        Returns:
+            int: The number of deleted OTPs.
+        """
+        now = get_now_timestamp()
+        condition = and_(cls.created_at < now - retention_seconds, or_(cls.used.is_(True), cls.expires_at < now))
+        return retention.delete_in_batches(cls.__table__, cls.__table__.c.id, condition, batch_size)
\ No newline at end of file
@@ -0,0 +1,114 @@
+import json
+from flask_mail import Message
+from sqlalchemy import Integer, String, Text, BigInteger, Index, select, text, and_, or_
+from sqlalchemy.orm import mapped_column, MappedColumn
+from typing import List
+from app import db
+from app.util import retention, get_now_timestamp
+
+class OutboxMail(db.Model):
+    """An email waiting to be sent by the outbox sender.
+    
+    Mails are added in the same transaction as the data they refer to (e.g. the OTP they contain), so a
+    mail is only sent if that data was committed, and an SMTP outage only delays it. The body of a sent
+    mail is cleared, so OTPs don't outlive their delivery.
+    """
+    __tablename__ = "mail_outbox"
+    
+    id: MappedColumn[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    recipients: MappedColumn[str] = mapped_column(Text)  # JSON list of addresses
+    subject: MappedColumn[str] = mapped_column(String(255))
+    body: MappedColumn[str] = mapped_column(Text, nullable=True)
+    html: MappedColumn[str] = mapped_column(Text, nullable=True)
+    created_at: MappedColumn[int] = mapped_column(BigInteger)
+    attempts: MappedColumn[int] = mapped_column(Integer, default=0)
+    next_attempt_at: MappedColumn[int] = mapped_column(BigInteger)
+    sent_at: MappedColumn[int] = mapped_column(BigInteger, nullable=True)
+    last_error: MappedColumn[str] = mapped_column(Text, nullable=True)
+    
+    __table_args__ = (
+        # The sender polls the unsent mails that are due
+        Index("ix_mail_outbox_pending", "next_attempt_at", postgresql_where=text("sent_at IS NULL"), sqlite_where=text("sent_at IS NULL")),
+    )
+    
+    def to_message(self) -> Message:
+        return Message(self.subject, recipients=json.loads(self.recipients), body=self.body, html=self.html)
+    
+    def mark_sent(self):
+        self.sent_at = get_now_timestamp()
+        self.attempts += 1
+        self.body = None
+        self.html = None
+        self.last_error = None
+    
+    def mark_failed(self, error: str, backoff_seconds: int):
+        """Schedules the next attempt, doubling the backoff after every failed attempt.
+
+        Args:
+            error (str): The reason of the failure.
+            backoff_seconds (int): The delay before the first retry.
+        """
+        self.attempts += 1
+        self.next_attempt_at = get_now_timestamp() + backoff_seconds * 2 ** (self.attempts - 1)
+        self.last_error = error
+    
+    @classmethod
+    def enqueue(cls, recipients: List[str], subject: str, body: str, html: str | None = None) -> "OutboxMail":
+        """Adds a mail to the outbox. It is sent once the current transaction is committed.
+
+        Args:
+            recipients (List[str]): The addresses of the recipients.
+            subject (str): The subject.
+            body (str): The plain text body.
+            html (str | None): The HTML body.
+
+        Returns:
+            OutboxMail: The new mail.
+        """
+        now = get_now_timestamp()
+        outbox_mail = cls(
+            recipients=json.dumps(recipients),
+            subject=subject,
+            body=body,
+            html=html,
+            created_at=now,
+            attempts=0,
+            next_attempt_at=now
+        )
+        db.session.add(outbox_mail)
+        return outbox_mail
+    
+    @classmethod
+    def get_due(cls, limit: int, max_attempts: int) -> List["OutboxMail"]:
+        """Returns the oldest unsent mails that are due, locking them so concurrent senders skip them.
+
+        Args:
+            limit (int): The maximum number of mails.
+            max_attempts (int): Mails that failed this many times are given up on.
+        """
+        query = (
+            select(cls)
+            .where(cls.sent_at.is_(None), cls.next_attempt_at <= get_now_timestamp(), cls.attempts < max_attempts)
+            .order_by(cls.next_attempt_at, cls.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(db.session.scalars(query))
+    
+    @classmethod
+    def purge_done(cls, retention_seconds: int, max_attempts: int, batch_size: int = 500) -> int:
+        """Deletes the mails that were sent or given up on before the retention period, in batches.
+
+        Args:
+            retention_seconds (int): The number of seconds mails are kept after being created.
+            max_attempts (int): Mails that failed this many times were given up on.
+            batch_size (int): The number of mails deleted per transaction.
+
+        Returns:
+            int: The number of deleted mails.
+        """
+        condition = and_(
+            cls.created_at < get_now_timestamp() - retention_seconds,
+            or_(cls.sent_at.is_not(None), cls.attempts >= max_attempts)
+        )
+        return retention.delete_in_batches(cls.__table__, cls.__table__.c.id, condition, batch_size)
\ No newline at end of file
@@ -0,0 +1,50 @@
+import json
+from sqlalchemy import Integer, Text, ForeignKey, UniqueConstraint, select
+from sqlalchemy.orm import Mapped, mapped_column, MappedColumn, relationship
+from typing import TYPE_CHECKING, List
+from app import db
+
+if TYPE_CHECKING:
+    from .reencryption_job import ReencryptionJob
+
+class ReencryptionChunk(db.Model):
+    __tablename__ = "reencryption_chunks"
+    
+    id: MappedColumn[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job_id: MappedColumn[int] = mapped_column(Integer, ForeignKey("reencryption_jobs.id", ondelete="CASCADE"))
+    chunk_number: MappedColumn[int] = mapped_column(Integer)
+    entries: MappedColumn[str] = mapped_column(Text)  # JSON list of {"id", "encrypted_username", "encrypted_password"}
+    
+    job: Mapped["ReencryptionJob"] = relationship("ReencryptionJob", back_populates="chunks")
+    
+    __table_args__ = (
+        # Re-uploading a chunk replaces it
+        UniqueConstraint("job_id", "chunk_number", name="_job_chunk_uc"),
+    )
+    
+    @classmethod
+    def store(cls, job_id: int, chunk_number: int, entries: List[dict]):
+        """Stores a chunk of re-encrypted entries, replacing any previous upload with the same number.
+        A concurrent first upload of the same chunk makes the flush raise an IntegrityError.
+        
+        Args:
+            job_id (int): The ID of the job.
+            chunk_number (int): The number of the chunk.
+            entries (List[dict]): The re-encrypted entries.
+        """
+        payload = json.dumps(entries, separators=(",", ":"))
+        chunk: ReencryptionChunk = cls.query.filter_by(job_id=job_id, chunk_number=chunk_number).first()
+        if chunk is None:
+            db.session.add(cls(job_id=job_id, chunk_number=chunk_number, entries=payload))
+        else:
+            chunk.entries = payload
+    
+    @classmethod
+    def load_entries(cls, job_id: int) -> List[dict]:
+        """Returns the entries of all chunks of a job, in chunk order.
+        
+        Args:
+            job_id (int): The ID of the job.
+        """
+        payloads = db.session.scalars(select(cls.entries).where(cls.job_id == job_id).order_by(cls.chunk_number))
+        return [entry for payload in payloads for entry in json.loads(payload)]
@@ -0,0 +1,113 @@
+from sqlalchemy import Integer, BigInteger, ForeignKey, select, delete
+from sqlalchemy.orm import Mapped, mapped_column, MappedColumn, relationship
+from typing import TYPE_CHECKING, List
+from app import db
+from app.util import retention, get_now_timestamp
+
+if TYPE_CHECKING:
+    from .user import User
+    from .reencryption_chunk import ReencryptionChunk
+
+class ReencryptionJob(db.Model):
+    """A master password change that re-encrypts the whole vault.
+    
+    The client uploads the re-encrypted entries in numbered chunks (re-uploading a chunk replaces it),
+    then commits the job together with the new keychain and passwords in a single transaction.
+    """
+    __tablename__ = "reencryption_jobs"
+    
+    id: MappedColumn[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: MappedColumn[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    total_entries: MappedColumn[int] = mapped_column(Integer)
+    created_at: MappedColumn[int] = mapped_column(BigInteger)
+    expires_at: MappedColumn[int] = mapped_column(BigInteger)
+    
+    user: Mapped["User"] = relationship("User", back_populates="reencryption_jobs")
+    chunks: Mapped[List["ReencryptionChunk"]] = relationship("ReencryptionChunk", back_populates="job", cascade="all, delete")
+    
+    def is_expired(self) -> bool:
+        """
+        Returns True if the job is expired, False otherwise.
+        """
+        return self.expires_at < get_now_timestamp()
+    
+    def get_received_chunk_numbers(self) -> List[int]:
+        """
+        Returns the numbers of the chunks received so far, in ascending order.
+        """
+        from . import ReencryptionChunk
+        return list(db.session.scalars(
+            select(ReencryptionChunk.chunk_number).where(ReencryptionChunk.job_id == self.id).order_by(ReencryptionChunk.chunk_number)
+        ))
+    
+    def discard(self):
+        """
+        Deletes the job and all of its chunks without loading the chunks.
+        """
+        from . import ReencryptionChunk
+        db.session.execute(
+            delete(ReencryptionChunk).where(ReencryptionChunk.job_id == self.id),
+            execution_options={"synchronize_session": False}
+        )
+        db.session.delete(self)
+    
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "total_entries": self.total_entries,
+            "expires_at": self.expires_at,
+            "received_chunks": self.get_received_chunk_numbers()
+        }
+    
+    @classmethod
+    def open(cls, user_id: int, total_entries: int, expires_in_seconds: int = 3600) -> "ReencryptionJob":
+        """Opens a new job for the given user, discarding any previous one.
+        
+        Args:
+            user_id (int): The ID of the user.
+            total_entries (int): The number of vault entries that must be re-encrypted.
+            expires_in_seconds (int): The number of seconds until the job expires.
+            
+        Returns:
+            ReencryptionJob: The new job.
+        """
+        for previous_job in cls.query.filter_by(user_id=user_id).all():
+            previous_job.discard()
+        now = get_now_timestamp()
+        job = cls(user_id=user_id, total_entries=total_entries, created_at=now, expires_at=now + expires_in_seconds)
+        db.session.add(job)
+        db.session.flush()
+        return job
+    
+    @classmethod
+    def get_for_user(cls, user_id: int, job_id: int) -> "ReencryptionJob | None":
+        """Returns the job with the given ID if it belongs to the user and is not expired.
+        Expired jobs are deleted.
+        
+        Args:
+            user_id (int): The ID of the user.
+            job_id (int): The ID of the job.
+        """
+        job: ReencryptionJob = cls.query.filter_by(user_id=user_id, id=job_id).first()
+        if job is not None and job.is_expired():
+            job.discard()
+            db.session.commit()
+            return None
+        return job
+    
+    @classmethod
+    def purge_expired(cls, batch_size: int = 500) -> int:
+        """Deletes the expired jobs that were never committed or aborted, and their chunks, in batches.
+        
+        Args:
+            batch_size (int): The number of jobs or chunks deleted per transaction.
+            
+        Returns:
+            int: The number of deleted jobs.
+        """
+        from . import ReencryptionChunk
+        expired = cls.expires_at < get_now_timestamp()
+        chunks = ReencryptionChunk.__table__
+        # Not left to the foreign key cascade, which SQLite only applies with foreign key enforcement enabled
+        retention.delete_in_batches(chunks, chunks.c.id, chunks.c.job_id.in_(select(cls.id).where(expired)), batch_size)
+        return retention.delete_in_batches(cls.__table__, cls.__table__.c.id, expired, batch_size)
\ No newline at end of file
@@ -30,14 +30,27 @@ class Secret(db.Model):
             secret (bytes): The secret to encrypt and store
         """
         self.encrypted_secret = security.fernet.encrypt(secret)
+        security.secret_cache.invalidate((self.user_id, self.type))
+        
+    @staticmethod
+    def set_secrets(secrets: dict["Secret", bytes]):
+        """Encrypt and store several secrets.
+        
+        Args:
+            secrets (dict[Secret, bytes]): The secret to store in each Secret
+        """
+        for secret, value in secrets.items():
+            secret.set_secret(value)
         
     def get_secret(self) -> bytes:
-        """Decrypt and return the secret.
+        """Decrypt and return the secret. Served from the decrypted secret cache when possible.
         
         Returns:
             bytes: The decrypted secret
         """
-        return security.fernet.decrypt(self.encrypted_secret)
+        if self.user_id is None:
+            return security.fernet.decrypt(self.encrypted_secret)
+        return security.secret_cache.get_or_decrypt((self.user_id, self.type), self.encrypted_secret, security.fernet.decrypt)
     
     @classmethod
     def create_default_secrets(cls, user_id: int):
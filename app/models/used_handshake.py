@@ -0,0 +1,49 @@
+import hashlib
+from sqlalchemy import String, BigInteger, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import mapped_column, MappedColumn
+from app import db
+from app.util import retention, get_now_timestamp
+
+class UsedHandshake(db.Model):
+    """Marks a SCRAM handshake token as used, until the token itself expires.
+
+    Token handshakes are stateless, so without this any node would accept the same token again until
+    it expires. The table is shared by all workers and hosts, like the rest of the database.
+    """
+    __tablename__ = "used_handshakes"
+
+    nonce_hash: MappedColumn[str] = mapped_column(String(64), primary_key=True)  # SHA-256 of the server nonce
+    expires_at: MappedColumn[int] = mapped_column(BigInteger, index=True)
+
+    @classmethod
+    def consume(cls, s_nonce: str, expires_at: int) -> bool:
+        """Marks the handshake with the given server nonce as used, and commits.
+
+        Args:
+            s_nonce (str): The server nonce of the handshake.
+            expires_at (int): The UNIX timestamp at which the handshake token expires.
+
+        Returns:
+            bool: True if the handshake wasn't used before, False otherwise.
+        """
+        nonce_hash = hashlib.sha256(s_nonce.encode()).hexdigest()
+        try:
+            db.session.execute(insert(cls).values(nonce_hash=nonce_hash, expires_at=expires_at))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return False
+        return True
+
+    @classmethod
+    def purge_expired(cls, batch_size: int = 500) -> int:
+        """Deletes the marks of the expired handshakes, which can't be replayed anymore, in batches.
+
+        Args:
+            batch_size (int): The number of marks deleted per transaction.
+
+        Returns:
+            int: The number of deleted marks.
+        """
+        return retention.delete_in_batches(cls.__table__, cls.__table__.c.nonce_hash, cls.expires_at < get_now_timestamp(), batch_size)
\ No newline at end of file
@@ -1,20 +1,29 @@
-from sqlalchemy import Integer, String, Boolean, BigInteger, Enum
-from sqlalchemy.orm import Mapped, mapped_column, MappedColumn, relationship
+from sqlalchemy import Integer, String, Boolean, BigInteger, Enum, Index, func, select, event
+from sqlalchemy.orm import Mapped, mapped_column, MappedColumn, relationship, joinedload, load_only, make_transient_to_detached, Session
+from sqlalchemy.orm.attributes import set_committed_value
+from flask import g
 from flask_login import UserMixin
 from base64 import b64encode, b64decode, b32encode
 from typing import TYPE_CHECKING, List
 import pyotp
-import qrcode
-import io
 from app import db, scram, logger
-from app.util import security, get_now_timestamp
+from app.util import security, get_now_timestamp, user_cache, metrics
 
 if TYPE_CHECKING:
     from .secret import Secret
     from .one_time_password import OneTimePassword
     from .vault_entry import VaultEntry
+    from .reencryption_job import ReencryptionJob
+    from .vault_tombstone import VaultTombstone
 
 class User(db.Model, UserMixin):
+    """A user account.
+    
+    Hashes and keys made with outdated cost parameters are only upgraded where the server sees a password
+    and the account is kept: the recovery password hash at recovery login, and everything on a password
+    change (set_credentials). A SCRAM login never sends the password, so it upgrades nothing, and account
+    deletion checks the regular password without upgrading it.
+    """
     __tablename__ = "users"
 
     id: MappedColumn[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -22,7 +31,7 @@ class User(db.Model, UserMixin):
     is_activated: MappedColumn[bool] = mapped_column(Boolean, default=False)
     
     # Account Info
-    email: MappedColumn[str] = mapped_column(String(255), unique=True)
+    email: MappedColumn[str] = mapped_column(String(255))  # Unique ignoring case, see uq_users_email_lower
     first_name: MappedColumn[str] = mapped_column(String(255), nullable=True)
     last_name: MappedColumn[str] = mapped_column(String(255), nullable=True)
     created_at: MappedColumn[int] = mapped_column(BigInteger)
@@ -37,6 +46,8 @@ class User(db.Model, UserMixin):
     
     # Vault
     entries: Mapped[List["VaultEntry"]] = relationship("VaultEntry", back_populates="user", cascade="all, delete")
+    tombstones: Mapped[List["VaultTombstone"]] = relationship("VaultTombstone", back_populates="user", cascade="all, delete")
+    reencryption_jobs: Mapped[List["ReencryptionJob"]] = relationship("ReencryptionJob", back_populates="user", cascade="all, delete")
     
     
     def is_admin(self):
@@ -53,24 +64,18 @@ class User(db.Model, UserMixin):
             "created_at": self.created_at
         }
     
-    def verify_and_use_otp(self, otp: str) -> bool:
+    def verify_and_use_otp(self, otp: str, type: str | None = None) -> bool:
         """Verifies the OTP and marks it as used.
         
         Args:
             otp (str): The OTP to verify
+            type (str | None): The type of the OTP, or None for any type
             
         Returns:
             bool: True on success, False on failure
         """
-        # Find the otp
-        one_time_password: OneTimePassword = next((o for o in self.otps if o.used == False and o.otp == otp), None)
-        if not one_time_password:
-            return False
-        
-        # Mark the otp as used
-        one_time_password.used = True
-    
-        return not one_time_password.is_expired()
+        from . import OneTimePassword
+        return OneTimePassword.consume(self.id, otp, type)
     
 
     def set_scram_auth_info(self, salt: bytes, stored_key: bytes, server_key: bytes, iteration_count: int):
@@ -97,6 +102,51 @@ class User(db.Model, UserMixin):
         server_key_secret.set_secret(server_key)
         
         
+    def set_credentials(self, regular_password: str, recovery_password: str, vault_key: str, recovery_key: str, salt: str):
+        """Derives and stores everything that depends on the passwords: the password hash, the SCRAM auth info,
+        the recovery password hash and the vault keychain.
+        
+        The three derivations are independent and run concurrently in the crypto pool, so this takes about as long
+        as the slowest of them. Does not commit.
+
+        Args:
+            regular_password (str): The regular password
+            recovery_password (str): The recovery password
+            vault_key (str): The base64 encoded vault key
+            recovery_key (str): The base64 encoded recovery key
+            salt (str): The base64 encoded vault salt, generated by the client
+        """
+        # Start the derivations
+        regular_hash, recovery_hash, scram_auth_info = security.pool.results(
+            security.hasher.submit_hash(regular_password),
+            security.hasher.submit_hash(recovery_password),
+            metrics.time_future("scram_auth_info", security.pool.submit(security.make_scram_auth_info, regular_password, scram.name, scram.iteration_count))
+        )
+        scram_salt, stored_key, server_key, iteration_count = scram_auth_info
+        
+        # Find the secrets
+        secrets: dict[str, Secret] = {s.type: s for s in self.secrets}
+        for type in ("RECOVERY", "SCRAM_STORED", "SCRAM_SERVER", "VAULT_KEY", "VAULT_RECOVERY"):
+            if type not in secrets:
+                raise Exception(f"Missing {type} secret")
+        
+        # Store everything
+        self.hashed_password = regular_hash
+        vault_salt = b64decode(salt)
+        for type in ("SCRAM_STORED", "SCRAM_SERVER"):
+            secrets[type].salt = scram_salt
+            secrets[type].iteration_count = iteration_count
+        for type in ("VAULT_KEY", "VAULT_RECOVERY"):
+            secrets[type].salt = vault_salt
+        from . import Secret
+        Secret.set_secrets({
+            secrets["RECOVERY"]: recovery_hash.encode(),
+            secrets["SCRAM_STORED"]: stored_key,
+            secrets["SCRAM_SERVER"]: server_key,
+            secrets["VAULT_KEY"]: b64decode(vault_key),
+            secrets["VAULT_RECOVERY"]: b64decode(recovery_key)
+        })
+    
     def set_recovery_password(self, password: str):
         """
         Hashes, encrypts and stores the recovery password.
@@ -109,20 +159,31 @@ class User(db.Model, UserMixin):
         
     def check_recovery_password(self, password: str):
         """
-        Checks the recovery password.
+        Checks the recovery password, upgrading its hash if it was made with outdated parameters.
         """
         recovery_secret: Secret = next((s for s in self.secrets if s.type == "RECOVERY"), None)
         if recovery_secret is None:
             raise Exception("Missing recovery secret")
         hashed_password = recovery_secret.get_secret().decode()
-        return security.hasher.check(hashed_password, password)
+        if not security.hasher.check(hashed_password, password):
+            return False
+        if security.hasher.needs_rehash(hashed_password):
+            self.set_recovery_password(password)
+        return True
+    
+    def check_password(self, password: str):
+        """
+        Checks the regular password. Its hash is only upgraded on the next password change, since the
+        only check (account deletion) removes it anyway.
+        """
+        return security.hasher.check(self.hashed_password, password)
         
         
-    def generate_totp_secret(self) -> tuple[str, str]:
+    def generate_totp_secret(self) -> str:
         """Generates, derives, encrypts, and stores a new TOTP secret.
 
         Returns:
-            (str, str): The Provisioning URI as a string and as a QR code
+            str: The Provisioning URI
         """
         
         # Generate TOTP secret
@@ -137,21 +198,27 @@ class User(db.Model, UserMixin):
         if totp_secret is None:
             raise Exception("Missing TOTP secret")
         totp_secret.salt = salt
+        totp_secret.iteration_count = security.kdf.iterations
         totp_secret.set_secret(derived_key)
         
-        # Generate the provisioning URI
+        return self._make_provisioning_uri(derived_key)
+    
+    def get_totp_provisioning_uri(self) -> str:
+        """Decrypts the TOTP secret and returns its provisioning URI.
+
+        Returns:
+            str: The Provisioning URI
+        """
+        totp_secret: Secret = next((s for s in self.secrets if s.type == "TOTP"), None)
+        if totp_secret is None:
+            raise Exception("Missing TOTP secret")
+        return self._make_provisioning_uri(totp_secret.get_secret())
+    
+    def _make_provisioning_uri(self, derived_key: bytes) -> str:
         encoded_derived_key = b32encode(derived_key).decode("utf-8").rstrip("=")
-        provisioning_uri = pyotp.totp.TOTP(encoded_derived_key).provisioning_uri(
+        return pyotp.totp.TOTP(encoded_derived_key).provisioning_uri(
             name=self.email, issuer_name="VaultBerry"
         )
-
-        # Generate the QR code
-        qr = qrcode.make(provisioning_uri)
-        buffered = io.BytesIO()
-        qr.save(buffered)
-        img_str = b64encode(buffered.getvalue()).decode()
-        
-        return provisioning_uri, img_str
     
     def verify_totp_code(self, code: str) -> bool:
         """Verifies a totp code.
@@ -234,7 +301,7 @@ class User(db.Model, UserMixin):
         """
         try:
             # Check if an admin user with the given email already exists
-            admin_user = db.session.query(cls).filter_by(role="ADMIN", email=email).first()
+            admin_user = db.session.query(cls).filter(cls.role == "ADMIN", func.lower(cls.email) == email.lower()).first()
             if admin_user:
                 logger.info(f"Admin with email '{email}' already exists")
                 return admin_user
@@ -253,7 +320,8 @@ class User(db.Model, UserMixin):
             
             # Generate and store scram auth info for regular password
             from . import Secret
-            salt, stored_key, server_key, iteration_count = scram.make_auth_info(password)
+            with metrics.timer("scram_auth_info"):
+                salt, stored_key, server_key, iteration_count = security.pool.run(security.make_scram_auth_info, password, scram.name, scram.iteration_count)
             stored_key_secret = Secret(user_id=admin_user.id, type="SCRAM_STORED", salt=salt, iteration_count=iteration_count)
             stored_key_secret.set_secret(stored_key)
             db.session.add(stored_key_secret)
@@ -270,13 +338,108 @@ class User(db.Model, UserMixin):
             logger.error(f"Error creating admin user: {e}")
             return None
         
+    @classmethod
+    def get_by_email(cls, email: str | None, with_secrets: bool = False) -> "User | None":
+        """Finds a user by email, ignoring case. Uses the uq_users_email_lower index.
+
+        Args:
+            email (str | None): The email of the user
+            with_secrets (bool): Load the user's secrets in the same query
+
+        Returns:
+            User: The user, or None if no user with this email exists
+        """
+        if email is None:
+            return None
+        query = cls.query.filter(func.lower(cls.email) == email.lower())
+        if with_secrets:
+            query = query.options(joinedload(cls.secrets))
+        return query.first()
+    
+    @classmethod
+    def resolve_by_email(cls, email: str | None) -> "User | None":
+        """Finds a user by email along with their secrets, at most once per request.
+        
+        The result is remembered in the request context, so the routes and the SCRAM
+        auth callback share the same user instead of querying it again.
+
+        Args:
+            email (str | None): The email of the user
+
+        Returns:
+            User: The user, or None if no user with this email exists
+        """
+        if email is None:
+            return None
+        users: dict[str, User | None] = g.setdefault("users_by_email", {})
+        key = email.lower()
+        if key not in users:
+            users[key] = cls.get_by_email(email, with_secrets=True)
+        return users[key]
+        
+    # The columns loaded for the auth check of every request, and cached
+    auth_columns = ("id", "role", "is_activated", "email", "mfa_enabled")
+    
+    @classmethod
+    def load_for_request(cls, user_id: int, attributes: tuple[str, ...] = ()) -> "User | None":
+        """Loads the logged in user with only the auth columns, plus the attributes the route needs.
+        
+        The auth columns are served from the per-worker user cache when possible. Other columns
+        are loaded on access. Relationships in the attributes are joined to the user query, or
+        loaded with one query each on a cache hit.
+
+        Args:
+            user_id (int): The ID of the user
+            attributes (tuple[str, ...]): The relationship and column names to load along with the user
+
+        Returns:
+            User: The user, or None if no user with this ID exists
+        """
+        relationships = [name for name in attributes if name in cls.__mapper__.relationships]
+        columns = [name for name in attributes if name not in cls.__mapper__.relationships]
+        
+        # Serve the auth columns from the cache, then load the relationships directly
+        cached = user_cache.get(user_id) if not columns else None
+        if cached is not None:
+            user = cls(**cached)
+            make_transient_to_detached(user)
+            user = db.session.merge(user, load=False)
+            for name in relationships:
+                target = cls.__mapper__.relationships[name].mapper.class_
+                set_committed_value(user, name, list(db.session.scalars(select(target).where(target.user_id == user_id))))
+            return user
+        
+        options = [load_only(*(getattr(cls, name) for name in (*cls.auth_columns, *columns)))]
+        options += [joinedload(getattr(cls, name)) for name in relationships]
+        user = db.session.get(cls, user_id, options=options)
+        if user is not None:
+            user_cache.put(user_id, {name: getattr(user, name) for name in cls.auth_columns})
+        return user
+        
     @staticmethod
     def get_auth_information(email: str) -> (tuple[bytes, bytes, bytes, int] | None):
-        user: User = User.query.filter_by(email=email).first()
+        user: User = User.resolve_by_email(email)
         if not user:
             raise Exception("No user with this email exists")
         stored_key_secret: Secret = next((s for s in user.secrets if s.type == "SCRAM_STORED"), None)
         server_key_secret: Secret = next((s for s in user.secrets if s.type == "SCRAM_SERVER"), None)
         if not stored_key_secret or not server_key_secret:
             raise Exception("Missing scram secret")
-        return stored_key_secret.salt, stored_key_secret.get_secret(), server_key_secret.get_secret(), stored_key_secret.iteration_count
\ No newline at end of file
+        return stored_key_secret.salt, stored_key_secret.get_secret(), server_key_secret.get_secret(), stored_key_secret.iteration_count
+
+
+# Emails are unique ignoring case, which also serves the lookups (see User.get_by_email)
+Index("uq_users_email_lower", func.lower(User.email), unique=True)
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Session, flush_context):
+    changed_user_ids = session.info.setdefault("changed_user_ids", set())
+    changed_user_ids.update(obj.id for obj in (*session.dirty, *session.deleted) if isinstance(obj, User))
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session):
+    user_cache.invalidate(session.info.pop("changed_user_ids", ()))
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session: Session):
+    session.info.pop("changed_user_ids", None)
\ No newline at end of file
@@ -1,8 +1,9 @@
-from sqlalchemy import Integer, String, Text, ForeignKey, UniqueConstraint, BigInteger, LargeBinary
-from sqlalchemy.orm import Mapped, mapped_column, MappedColumn, relationship
+from sqlalchemy import Integer, String, Text, ForeignKey, UniqueConstraint, Index, BigInteger, LargeBinary, DDL, event, select, insert, update, delete
+from sqlalchemy.orm import Mapped, mapped_column, MappedColumn, relationship, Session
 from base64 import b64encode, b64decode
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterable, List
 from app import db
+from app.util import get_now_timestamp
 
 if TYPE_CHECKING:
     from .user import User
@@ -26,6 +27,14 @@ class VaultEntry(db.Model):
     __table_args__ = (
         # An individual user can't have multiple entries with the same title
         UniqueConstraint("user_id", "title", name="_user_title_uc"),
+        # Single entry lookups and keyset pagination
+        Index("ix_entries_user_id_id", "user_id", "id"),
+        # Delta sync looks up entries modified after a cursor
+        Index("ix_entries_user_id_last_modified", "user_id", "last_modified"),
+        # Substring search on Postgres (see app.util.search.TrigramSearchEngine)
+        Index("ix_entries_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_entries_url_trgm", "url", postgresql_using="gin", postgresql_ops={"url": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_entries_notes_trgm", "notes", postgresql_using="gin", postgresql_ops={"notes": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
     )
 
     # Dictionary containing the full entry
@@ -40,6 +49,14 @@ class VaultEntry(db.Model):
             "notes": self.notes
         }
         
+    # Dictionary containing the full entry, its ID and modification time
+    def to_sync_dict(self):
+        return {
+            "id": self.id,
+            "last_modified": self.last_modified,
+            **self.to_detailed_dict()
+        }
+        
     # Dictionary containing the entry preview
     def to_preview_dict(self):
         return {
@@ -57,4 +74,127 @@ class VaultEntry(db.Model):
         if username is not None:
             self.encrypted_username = b64decode(username)
         if password is not None:
-            self.encrypted_password = b64decode(password)
\ No newline at end of file
+            self.encrypted_password = b64decode(password)
+            
+    @staticmethod
+    def _column_values(data: dict, partial: bool = False) -> dict:
+        """Converts an entry dictionary, as sent by the client, to column values.
+        
+        Args:
+            data (dict): The entry dictionary
+            partial (bool): If True, only the fields present in the dictionary are returned
+            
+        Returns:
+            dict: The column values
+        """
+        values = {}
+        for field in ("title", "url", "notes"):
+            if not partial or field in data:
+                values[field] = data.get(field)
+        for field in ("encrypted_username", "encrypted_password"):
+            encoded = data.get(field)
+            if encoded is not None:
+                values[field] = b64decode(encoded)
+            elif not partial:
+                values[field] = None
+        return values
+    
+    @classmethod
+    def get_page(cls, user_id: int, limit: int, after: int | None = None, preview: bool = False, session: Session | None = None) -> tuple[List[dict], int | None]:
+        """Returns one page of the user's entries using keyset pagination on (user_id, id).
+        
+        Args:
+            user_id (int): The ID of the user
+            limit (int): The maximum number of entries in the page
+            after (int | None): The cursor returned with the previous page, None for the first page
+            preview (bool): If True, only the preview columns are loaded
+            session (Session | None): The session to query with, db.session if None
+            
+        Returns:
+            (List[dict], int | None): The entry dictionaries and the cursor of the next page (None on the last page)
+        """
+        columns = (cls.id, cls.title) if preview else (cls,)
+        query = select(*columns).where(cls.user_id == user_id)
+        if after is not None:
+            query = query.where(cls.id > after)
+        rows = (session or db.session).execute(query.order_by(cls.id).limit(limit + 1)).all()
+        
+        # The extra row only tells whether there is a next page
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        if preview:
+            entries = [{"id": row.id, "title": row.title} for row in rows]
+            last_id = rows[-1].id if rows else None
+        else:
+            entries = [row[0].to_detailed_dict() for row in rows]
+            last_id = rows[-1][0].id if rows else None
+        return entries, (last_id if has_next else None)
+    
+    @classmethod
+    def get_owned_ids(cls, user_id: int, ids: Iterable[int]) -> set[int]:
+        """Returns the subset of the given entry IDs that belong to the user.
+        
+        Args:
+            user_id (int): The ID of the user
+            ids (Iterable[int]): The entry IDs to check
+        """
+        ids = list(ids)
+        if not ids:
+            return set()
+        return set(db.session.scalars(select(cls.id).where(cls.user_id == user_id, cls.id.in_(ids))))
+    
+    @classmethod
+    def bulk_insert(cls, user_id: int, entries: List[dict]) -> List[int]:
+        """Inserts multiple entries using a single INSERT statement.
+        
+        Args:
+            user_id (int): The ID of the user who owns the entries
+            entries (List[dict]): The entry dictionaries, as sent by the client
+            
+        Returns:
+            List[int]: The IDs of the new entries, in the same order as the input
+        """
+        if not entries:
+            return []
+        now = get_now_timestamp()
+        rows = [{"user_id": user_id, "last_modified": now, **cls._column_values(entry)} for entry in entries]
+        result = db.session.execute(insert(cls).returning(cls.id, sort_by_parameter_order=True), rows)
+        return list(result.scalars())
+    
+    @classmethod
+    def bulk_update(cls, entries: List[dict]):
+        """Updates multiple entries by primary key using executemany UPDATE statements.
+        Ownership of the entries must be checked beforehand (see get_owned_ids).
+        
+        Args:
+            entries (List[dict]): The entry dictionaries, as sent by the client. Each one must contain the "id"
+        """
+        if not entries:
+            return
+        now = get_now_timestamp()
+        rows = [{"id": entry["id"], "last_modified": now, **cls._column_values(entry, partial=True)} for entry in entries]
+        db.session.execute(update(cls), rows)
+    
+    @classmethod
+    def bulk_delete(cls, user_id: int, ids: Iterable[int]):
+        """Deletes multiple entries of a user using a single DELETE statement and records their tombstones.
+        
+        Args:
+            user_id (int): The ID of the user who owns the entries
+            ids (Iterable[int]): The IDs of the entries to delete
+        """
+        ids = list(ids)
+        if not ids:
+            return
+        from . import VaultTombstone
+        db.session.execute(
+            delete(cls).where(cls.user_id == user_id, cls.id.in_(ids)),
+            execution_options={"synchronize_session": False}
+        )
+        VaultTombstone.record(user_id, ids)
+
+
+# The trigram indexes need the pg_trgm extension
+event.listen(VaultEntry.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+# The SQLite full-text index references the entries table (see app.util.search.FtsSearchEngine)
+event.listen(VaultEntry.__table__, "before_drop", DDL("DROP TABLE IF EXISTS entries_fts").execute_if(dialect="sqlite"))
\ No newline at end of file
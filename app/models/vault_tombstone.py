@@ -0,0 +1,73 @@
+from flask import current_app
+from sqlalchemy import Integer, BigInteger, ForeignKey, Index, select, insert, delete, exists
+from sqlalchemy.orm import Mapped, mapped_column, MappedColumn, relationship
+from typing import TYPE_CHECKING, Iterable, List
+from app import db
+from app.util import retention, get_now_timestamp
+
+if TYPE_CHECKING:
+    from .user import User
+
+class VaultTombstone(db.Model):
+    """Marks a deleted vault entry so that clients can remove it during a delta sync."""
+    __tablename__ = "vault_tombstones"
+    
+    user_id: MappedColumn[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    entry_id: MappedColumn[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    deleted_at: MappedColumn[int] = mapped_column(BigInteger)
+    
+    user: Mapped["User"] = relationship("User", back_populates="tombstones")
+    
+    __table_args__ = (
+        Index("ix_vault_tombstones_user_id_deleted_at", "user_id", "deleted_at"),
+    )
+    
+    @classmethod
+    def record(cls, user_id: int, entry_ids: Iterable[int]):
+        """Records tombstones for deleted entries and purges the user's expired tombstones.
+        
+        Args:
+            user_id (int): The ID of the user who owned the entries.
+            entry_ids (Iterable[int]): The IDs of the deleted entries.
+        """
+        entry_ids = list(entry_ids)
+        if not entry_ids:
+            return
+        now = get_now_timestamp()
+        retention_seconds = current_app.config.get("VAULT_TOMBSTONE_RETENTION_SECONDS", 30*24*60*60)
+        
+        # Replace tombstones left by entries that reused the same IDs, and drop the expired ones
+        db.session.execute(
+            delete(cls).where(cls.user_id == user_id, cls.entry_id.in_(entry_ids) | (cls.deleted_at < now - retention_seconds)),
+            execution_options={"synchronize_session": False}
+        )
+        db.session.execute(insert(cls), [{"user_id": user_id, "entry_id": entry_id, "deleted_at": now} for entry_id in entry_ids])
+    
+    @classmethod
+    def get_deleted_ids_since(cls, user_id: int, since: int) -> List[int]:
+        """Returns the IDs of the entries deleted at or after the given timestamp.
+        IDs that belong to existing entries again (reused IDs) are left out.
+        
+        Args:
+            user_id (int): The ID of the user.
+            since (int): The UNIX timestamp.
+        """
+        from . import VaultEntry
+        entry_exists = exists().where(VaultEntry.user_id == cls.user_id, VaultEntry.id == cls.entry_id)
+        return list(db.session.scalars(
+            select(cls.entry_id).where(cls.user_id == user_id, cls.deleted_at >= since, ~entry_exists).order_by(cls.entry_id)
+        ))
+    
+    @classmethod
+    def purge_expired(cls, retention_seconds: int, batch_size: int = 500) -> int:
+        """Deletes all tombstones older than the retention period, in batches of users.
+        
+        Args:
+            retention_seconds (int): The number of seconds tombstones are kept for.
+            batch_size (int): The number of tombstones selected per transaction, along with the other expired tombstones of their users.
+            
+        Returns:
+            int: The number of deleted tombstones.
+        """
+        condition = cls.deleted_at < get_now_timestamp() - retention_seconds
+        return retention.delete_in_batches(cls.__table__, cls.__table__.c.user_id, condition, batch_size)
\ No newline at end of file
@@ -2,5 +2,7 @@ from .vault import vault_bp
 from .auth import auth_bp
 from .account import account_bp
 from .admin_control import admin_control_bp
+from .async_read import async_read_bp
+from .metrics import metrics_bp
 
-__all__ = ["vault_bp", "auth_bp", "account_bp", "admin_control_bp"]
\ No newline at end of file
+__all__ = ["vault_bp", "auth_bp", "account_bp", "admin_control_bp", "async_read_bp", "metrics_bp"]
\ No newline at end of file
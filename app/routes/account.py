@@ -1,13 +1,25 @@
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, Response, jsonify, request, current_app
 from flask_login import current_user, login_required
-from app.models import User
-from app.util import http, security
-from app import db, scram, logger
+from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
+from base64 import b64decode
+import binascii
+from app.models import User, VaultEntry, ReencryptionJob, ReencryptionChunk
+from app.util import http, search, eager_load, totp_qrcode, rate_limit
+from app import db, logger
 
 account_bp = Blueprint("account", __name__)
 
+def _set_credentials(user: User, passwords: dict, keychain: dict):
+    """Updates the password hash, the vault keychain, the SCRAM auth info and the recovery password of the user.
+    Does not commit.
+    """
+    user.set_credentials(passwords["regular_password"], passwords["recovery_password"], keychain["vault_key"], keychain["recovery_key"], keychain["salt"])
+    logger.debug(f"Credentials updated for user ID: {user.id}.")
+
 @account_bp.route("", methods=["GET"])
 @login_required
+@eager_load("first_name", "last_name", "created_at")
 def get_account_info():
     user: User = current_user
     logger.info(f"Attempting to retrieve account information for user ID: {user.id}")
@@ -30,7 +42,7 @@ def update_account_info():
         account_data = data["account"]
         
         # Check if email is available
-        existing_user: User = User.query.filter_by(email=account_data["email"]).first()
+        existing_user: User = User.get_by_email(account_data["email"])
         if existing_user is not None and existing_user.id != user.id:
             logger.warning(f"Account update failed for user ID: {user.id}. Email '{account_data['email']}' is already in use by another user.")
             raise http.RouteError("Email already in use", http.ErrorCode.CONFLICT)
@@ -47,7 +59,12 @@ def update_account_info():
             user.email = new_email
         user.first_name = account_data.get("first_name", user.first_name)
         user.last_name = account_data.get("last_name", user.last_name)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            logger.warning(f"Account update failed for user ID: {user.id}. Email '{new_email}' was taken concurrently: {e.orig}")
+            raise http.RouteError("Email already in use", http.ErrorCode.CONFLICT)
         logger.info(f"Account information successfully updated for user ID: {user.id}.")
         return jsonify({"message": "Account info updated successfully"}), http.SuccessCode.OK.value
     except http.RouteError as e:
@@ -59,7 +76,9 @@ def update_account_info():
         return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
 
 @account_bp.route("/delete", methods=["POST"])
+@rate_limit.limit("account_delete", rate_limit.session_user_id)
 @login_required
+@eager_load("hashed_password")
 def delete_account():
     user: User = current_user
     logger.info(f"Attempting to delete account for user ID: {user.id}")
@@ -72,7 +91,7 @@ def delete_account():
         # Check password hash
         data = request.get_json()
         password = data["password"] # Do not log the password
-        if not security.hasher.check(user.hashed_password, password):
+        if not user.check_password(password):
             logger.warning(f"Account deletion failed for user ID: {user.id}. Incorrect password provided.")
             raise http.RouteError("Incorrect password", http.ErrorCode.UNAUTHORIZED)
 
@@ -80,6 +99,7 @@ def delete_account():
         user_id = user.id # Capture user ID before deletion
         db.session.delete(current_user)
         db.session.commit()
+        search.engine.invalidate(user_id)
         logger.info(f"Account successfully deleted for user ID: {user_id}.")
         return jsonify({"message": "Account deleted successfully"}), http.SuccessCode.OK.value
     except http.RouteError as e:
@@ -92,6 +112,7 @@ def delete_account():
 
 @account_bp.route("/password", methods=["PATCH"])
 @login_required
+@eager_load("secrets")
 def change_password():
     user: User = current_user
     logger.info(f"Attempting to change password for user ID: {user.id}")
@@ -101,44 +122,174 @@ def change_password():
         keychain = data["keychain"] # Do not log keychain details
         reencrypt = data["re_encrypt"]
         
+        # Password changes that re-encrypt the vault must go through a re-encryption job
         if reencrypt:
-            # Save the number of vault entries left to patch (initially the total)
-            session[f"{user.id}_entries_left"] = len(user.entries)
-            logger.info(f"Initialized re-encryption process for user ID: {user.id}. Number of entries: {len(user.entries)}")
-        else:
-            # Save 0 to signal no reencryption 
-            session[f"{user.id}_entries_left"] = 0
-            logger.info(f"No re-encryption initiated for user ID: {user.id}.")
+            logger.warning(f"Password change failed for user ID: {user.id}. Re-encryption requested without a re-encryption job.")
+            raise http.RouteError("Re-encrypting the vault requires a re-encryption job (/account/password/jobs)", http.ErrorCode.BAD_REQUEST)
+        
+        # Update the keychain and the passwords
+        _set_credentials(user, passwords, keychain)
+        db.session.commit()
+        logger.info(f"Password changed successfully for user ID: {user.id} (no re-encryption needed).")
+        return jsonify({"message": "Password changed successfully"}), http.SuccessCode.OK.value
+    except http.RouteError as e:
+        logger.warning(f"Password change failed for user ID: {user.id}. Error: {e.error_code.name} - {str(e)}")
+        return jsonify({"error": str(e)}), e.error_code.value
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"An unexpected error occurred during password change for user ID: {user.id}. Error: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
+
+@account_bp.route("/password/jobs", methods=["POST"])
+@login_required
+def open_reencryption_job():
+    user: User = current_user
+    logger.info(f"Attempting to open a re-encryption job for user ID: {user.id}")
+    try:
+        # Snapshot the number of entries that must be re-encrypted
+        total_entries = db.session.scalar(select(func.count()).select_from(VaultEntry).where(VaultEntry.user_id == user.id))
+        expires_in_seconds = current_app.config.get("REENCRYPTION_JOB_TTL_SECONDS", 3600)
+        job = ReencryptionJob.open(user.id, total_entries, expires_in_seconds)
+        db.session.commit()
+        logger.info(f"Re-encryption job ID: {job.id} opened for user ID: {user.id}. Number of entries: {total_entries}")
+        return jsonify(job.to_dict()), http.SuccessCode.CREATED.value
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"An unexpected error occurred while opening a re-encryption job for user ID: {user.id}. Error: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
+
+@account_bp.route("/password/jobs/<int:job_id>", methods=["GET"])
+@login_required
+def get_reencryption_job(job_id: int):
+    user: User = current_user
+    logger.info(f"Attempting to retrieve re-encryption job ID: {job_id} for user ID: {user.id}")
+    try:
+        job = ReencryptionJob.get_for_user(user.id, job_id)
+        if job is None:
+            raise http.RouteError("Re-encryption job not found or expired", http.ErrorCode.NOT_FOUND)
+        return jsonify(job.to_dict()), http.SuccessCode.OK.value
+    except http.RouteError as e:
+        logger.warning(f"Re-encryption job retrieval failed for job ID: {job_id} for user ID: {user.id}. Error: {e.error_code.name} - {str(e)}")
+        return jsonify({"error": str(e)}), e.error_code.value
+    except Exception as e:
+        logger.error(f"An unexpected error occurred while retrieving re-encryption job ID: {job_id} for user ID: {user.id}. Error: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
+
+@account_bp.route("/password/jobs/<int:job_id>/chunks/<int:chunk_number>", methods=["PUT"])
+@login_required
+def upload_reencryption_chunk(job_id: int, chunk_number: int):
+    user: User = current_user
+    logger.info(f"Attempting to upload chunk {chunk_number} of re-encryption job ID: {job_id} for user ID: {user.id}")
+    try:
+        data = request.get_json()
+        entries = data["entries"] # Do not log the entries
         
-        # Update the vault key secret
-        user.set_vault_keychain(keychain["vault_key"], keychain["recovery_key"], keychain["salt"])
-        logger.debug(f"Vault keychain updated for user ID: {user.id}.")
+        job = ReencryptionJob.get_for_user(user.id, job_id)
+        if job is None:
+            raise http.RouteError("Re-encryption job not found or expired", http.ErrorCode.NOT_FOUND)
         
-        # Update the SCRAM auth info
-        salt, stored_key, server_key, iteration_count = scram.make_auth_info(passwords["regular_password"])
-        user.set_scram_auth_info(salt, stored_key, server_key, iteration_count)
-        logger.debug(f"SCRAM authentication information updated for user ID: {user.id}.")
+        # Validate the chunk
+        max_entries = current_app.config.get("REENCRYPTION_MAX_CHUNK_ENTRIES", 1000)
+        if len(entries) > max_entries:
+            raise http.RouteError(f"Too many entries in chunk, the maximum is {max_entries}", http.ErrorCode.BAD_REQUEST)
+        chunk_entries = []
+        for entry in entries:
+            if not isinstance(entry.get("id"), int):
+                raise http.RouteError("Every entry must have an ID", http.ErrorCode.BAD_REQUEST)
+            chunk_entry = {"id": entry["id"]}
+            for field in ("encrypted_username", "encrypted_password"):
+                if entry.get(field) is not None:
+                    try:
+                        b64decode(entry[field], validate=True)
+                    except (binascii.Error, ValueError):
+                        raise http.RouteError(f"Entry ID {entry['id']}: {field} is not valid base64", http.ErrorCode.BAD_REQUEST)
+                    chunk_entry[field] = entry[field]
+            chunk_entries.append(chunk_entry)
         
-        # Update reovery password
-        user.set_recovery_password(passwords["recovery_password"])
-        logger.debug(f"Recovery password updated for user ID: {user.id}.")
-
-        # Commit the changes if not reencrypting
-        if not reencrypt:
+        # Store the chunk, a concurrent upload of the same chunk can insert it first
+        try:
+            ReencryptionChunk.store(job.id, chunk_number, chunk_entries)
             db.session.commit()
-            logger.info(f"Password changed successfully for user ID: {user.id} (no re-encryption needed).")
-        else:
-            db.session.flush()
-            logger.info(f"Password changed successfully for user ID: {user.id}. Database flushed for re-encryption.")
-            
+        except IntegrityError as e:
+            db.session.rollback()
+            logger.warning(f"Chunk {chunk_number} of re-encryption job ID: {job_id} was uploaded concurrently: {e.orig}")
+            raise http.RouteError(f"Chunk {chunk_number} is already being uploaded, please retry", http.ErrorCode.CONFLICT)
+        logger.info(f"Chunk {chunk_number} ({len(chunk_entries)} entries) of re-encryption job ID: {job_id} stored for user ID: {user.id}")
+        return jsonify(job.to_dict()), http.SuccessCode.OK.value
+    except http.RouteError as e:
+        logger.warning(f"Re-encryption chunk upload failed for job ID: {job_id} for user ID: {user.id}. Error: {e.error_code.name} - {str(e)}")
+        return jsonify({"error": str(e)}), e.error_code.value
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"An unexpected error occurred during re-encryption chunk upload for job ID: {job_id} for user ID: {user.id}. Error: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
+
+@account_bp.route("/password/jobs/<int:job_id>/commit", methods=["POST"])
+@login_required
+@eager_load("secrets")
+def commit_reencryption_job(job_id: int):
+    user: User = current_user
+    logger.info(f"Attempting to commit re-encryption job ID: {job_id} for user ID: {user.id}")
+    try:
+        data = request.get_json()
+        passwords = data["passwords"] # Do not log password details
+        keychain = data["keychain"] # Do not log keychain details
+        
+        job = ReencryptionJob.get_for_user(user.id, job_id)
+        if job is None:
+            raise http.RouteError("Re-encryption job not found or expired", http.ErrorCode.NOT_FOUND)
+        
+        # Every entry of the vault must have been re-encrypted exactly once
+        entries = ReencryptionChunk.load_entries(job.id)
+        uploaded_ids = [entry["id"] for entry in entries]
+        if len(uploaded_ids) != len(set(uploaded_ids)):
+            raise http.RouteError("Some entries were uploaded more than once", http.ErrorCode.BAD_REQUEST)
+        vault_ids = set(db.session.scalars(select(VaultEntry.id).where(VaultEntry.user_id == user.id)))
+        if set(uploaded_ids) != vault_ids:
+            missing, unknown = len(vault_ids - set(uploaded_ids)), len(set(uploaded_ids) - vault_ids)
+            raise http.RouteError(f"The uploaded entries do not match the vault ({missing} missing, {unknown} unknown)", http.ErrorCode.CONFLICT)
+        
+        # Apply everything in one transaction
+        VaultEntry.bulk_update(entries)
+        _set_credentials(user, passwords, keychain)
+        job.discard()
+        db.session.commit()
+        search.engine.invalidate(user.id)
+        logger.info(f"Re-encryption job ID: {job_id} committed for user ID: {user.id}. Re-encrypted entries: {len(entries)}")
         return jsonify({"message": "Password changed successfully"}), http.SuccessCode.OK.value
+    except http.RouteError as e:
+        db.session.rollback()
+        logger.warning(f"Re-encryption job commit failed for job ID: {job_id} for user ID: {user.id}. Error: {e.error_code.name} - {str(e)}")
+        return jsonify({"error": str(e)}), e.error_code.value
     except Exception as e:
         db.session.rollback()
-        logger.error(f"An unexpected error occurred during password change for user ID: {user.id}. Error: {e}", exc_info=True)
+        logger.error(f"An unexpected error occurred during re-encryption job commit for job ID: {job_id} for user ID: {user.id}. Error: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
+
+@account_bp.route("/password/jobs/<int:job_id>", methods=["DELETE"])
+@login_required
+def abort_reencryption_job(job_id: int):
+    user: User = current_user
+    logger.info(f"Attempting to abort re-encryption job ID: {job_id} for user ID: {user.id}")
+    try:
+        job = ReencryptionJob.get_for_user(user.id, job_id)
+        if job is None:
+            raise http.RouteError("Re-encryption job not found or expired", http.ErrorCode.NOT_FOUND)
+        job.discard()
+        db.session.commit()
+        logger.info(f"Re-encryption job ID: {job_id} aborted for user ID: {user.id}")
+        return jsonify({"message": "Re-encryption job aborted"}), http.SuccessCode.OK.value
+    except http.RouteError as e:
+        logger.warning(f"Re-encryption job abort failed for job ID: {job_id} for user ID: {user.id}. Error: {e.error_code.name} - {str(e)}")
+        return jsonify({"error": str(e)}), e.error_code.value
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"An unexpected error occurred while aborting re-encryption job ID: {job_id} for user ID: {user.id}. Error: {e}", exc_info=True)
         return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
 
 @account_bp.route("/2fa/setup", methods=["POST"])
 @login_required
+@eager_load("secrets")
 def setup_2fa():
     user: User = current_user
     logger.info(f"Attempting to set up 2FA for user ID: {user.id}")
@@ -148,11 +299,11 @@ def setup_2fa():
             logger.warning(f"2FA setup failed for user ID: {user.id}. 2FA is already set up.")
             raise http.RouteError("2FA already set up", http.ErrorCode.BAD_REQUEST)
 
-        # Generate and save a new TOTP secret
-        provisioning_uri, img_str = user.generate_totp_secret()
+        # Generate and save a new TOTP secret. The QR code is rendered on demand by /2fa/qrcode
+        provisioning_uri = user.generate_totp_secret()
         db.session.commit()
         logger.info(f"2FA setup successful for user ID: {user.id}. Provisioning URI generated.")
-        return jsonify({"provisioning_uri": provisioning_uri, "qrcode": img_str}), http.SuccessCode.OK.value
+        return jsonify({"provisioning_uri": provisioning_uri}), http.SuccessCode.OK.value
     except http.RouteError as e:
         logger.warning(f"2FA setup failed for user ID: {user.id}. Error: {e.error_code.name} - {str(e)}")
         return jsonify({"error": str(e)}), e.error_code.value
@@ -161,9 +312,42 @@ def setup_2fa():
         logger.error(f"An unexpected error occurred during 2FA setup for user ID: {user.id}. Error: {e}", exc_info=True)
         return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
     
+@account_bp.route("/2fa/qrcode", methods=["GET"])
+@login_required
+@eager_load("secrets")
+def get_2fa_qrcode():
+    user: User = current_user
+    logger.info(f"Attempting to render the 2FA QR code for user ID: {user.id}")
+    try:
+        format = request.args.get("format", "svg")
+        if format not in totp_qrcode.FORMATS:
+            raise http.RouteError(f"Invalid format, expected one of: {', '.join(totp_qrcode.FORMATS)}", http.ErrorCode.BAD_REQUEST)
+        
+        # The QR code is only available until the secret is activated
+        if user.mfa_enabled:
+            logger.warning(f"2FA QR code rendering failed for user ID: {user.id}. 2FA is already activated.")
+            raise http.RouteError("2FA already activated", http.ErrorCode.BAD_REQUEST)
+        totp_secret = next((s for s in user.secrets if s.type == "TOTP"), None)
+        if totp_secret is None or totp_secret.encrypted_secret is None:
+            logger.warning(f"2FA QR code rendering failed for user ID: {user.id}. 2FA is not set up.")
+            raise http.RouteError("2FA not set up", http.ErrorCode.NOT_FOUND)
+        
+        # Render the QR code, or reuse the one rendered for the same secret
+        qrcode = totp_qrcode.get(user.id, format, totp_secret.encrypted_secret, user.get_totp_provisioning_uri)
+        logger.info(f"2FA QR code ({format}) rendered for user ID: {user.id}.")
+        response = Response(qrcode, mimetype=totp_qrcode.FORMATS[format])
+        response.headers["Cache-Control"] = "no-store"
+        return response, http.SuccessCode.OK.value
+    except http.RouteError as e:
+        logger.warning(f"2FA QR code rendering failed for user ID: {user.id}. Error: {e.error_code.name} - {str(e)}")
+        return jsonify({"error": str(e)}), e.error_code.value
+    except Exception as e:
+        logger.error(f"An unexpected error occurred while rendering the 2FA QR code for user ID: {user.id}. Error: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
     
 @account_bp.route("/2fa/activate", methods=["POST"])
 @login_required
+@eager_load("secrets")
 def activate_2fa():
     user: User = current_user
     logger.info(f"Attempting to activate 2FA for user ID: {user.id}")
@@ -185,6 +369,7 @@ def activate_2fa():
         user.mfa_enabled = True
         
         db.session.commit()
+        totp_qrcode.invalidate(user.id)
         logger.info(f"2FA successfully activated for user ID: {user.id}.")
         return jsonify({"message": "2FA activated successfully"}), http.SuccessCode.OK.value
     except http.RouteError as e:
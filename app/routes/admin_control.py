@@ -21,7 +21,7 @@ def admin_login():
         logger.info(f"Admin login attempt for email: {email}")
         try:
             # Find the user by email
-            existing_user: User = User.query.filter_by(email=email).first()
+            existing_user: User = User.get_by_email(email)
             
             if existing_user is None:
                 logger.warning(f"Admin login failed for email: {email} - User not found.")
@@ -0,0 +1,145 @@
+from flask import Blueprint, jsonify, request, current_app
+from flask_login import current_user, login_required
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from app.models import User, VaultEntry
+from app.util import http, search, async_db
+from app import logger
+from .vault import _get_page_args
+
+# Async variants of the read-heavy vault and account routes, mounted under /async when ASYNC_READS_ENABLED is set.
+# Their queries run on the async engine of the worker (async_db) instead of the request thread
+async_read_bp = Blueprint("async_read", __name__)
+
+@async_read_bp.route("/vault/details", methods=["GET"])
+@login_required
+async def get_all_vault_entry_details():
+    user: User = current_user
+    user_id = user.id
+    logger.info(f"Attempting to retrieve all vault entry details (async) for user ID: {user_id}")
+    try:
+        # Fetch one page of entry details if requested
+        page_args = _get_page_args()
+        if page_args is not None:
+            entries, next_cursor = await async_db.run(lambda session: session.run_sync(lambda s: VaultEntry.get_page(user_id, *page_args, session=s)))
+            logger.info(f"Successfully retrieved a page of {len(entries)} vault entry details (async) for user ID: {user_id}")
+            return jsonify({"entries": entries, "next_cursor": next_cursor}), http.SuccessCode.OK.value
+        
+        # Fetch all entry details for the current user
+        async def get_entries(session: AsyncSession) -> List[dict]:
+            result = await session.scalars(select(VaultEntry).where(VaultEntry.user_id == user_id).order_by(VaultEntry.id))
+            return [entry.to_detailed_dict() for entry in result]
+        entries = await async_db.run(get_entries)
+        logger.info(f"Successfully retrieved {len(entries)} vault entry details (async) for user ID: {user_id}")
+        return jsonify(entries), http.SuccessCode.OK.value
+    except http.RouteError as e:
+        logger.warning(f"Vault entry details retrieval (async) failed for user ID: {user_id}. Error: {e.error_code.name} - {str(e)}")
+        return jsonify({"error": str(e)}), e.error_code.value
+    except Exception as e:
+        logger.error(f"An unexpected error occurred while retrieving all vault entry details (async) for user ID: {user_id}. Error: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
+
+@async_read_bp.route("/vault/previews", methods=["GET"])
+@login_required
+async def get_all_vault_entry_previews():
+    user: User = current_user
+    user_id = user.id
+    logger.info(f"Attempting to retrieve all vault entry previews (async) for user ID: {user_id}")
+    try:
+        # Fetch one page of entry previews if requested
+        page_args = _get_page_args()
+        if page_args is not None:
+            previews, next_cursor = await async_db.run(lambda session: session.run_sync(lambda s: VaultEntry.get_page(user_id, *page_args, preview=True, session=s)))
+            logger.info(f"Successfully retrieved a page of {len(previews)} vault entry previews (async) for user ID: {user_id}")
+            return jsonify({"entries": previews, "next_cursor": next_cursor}), http.SuccessCode.OK.value
+        
+        # Fetch all the entry previews for the current user, only loading the preview columns
+        async def get_previews(session: AsyncSession) -> List[dict]:
+            result = await session.execute(select(VaultEntry.id, VaultEntry.title).where(VaultEntry.user_id == user_id).order_by(VaultEntry.id))
+            return [{"id": row.id, "title": row.title} for row in result]
+        previews = await async_db.run(get_previews)
+        logger.info(f"Successfully retrieved {len(previews)} vault entry previews (async) for user ID: {user_id}")
+        return jsonify(previews), http.SuccessCode.OK.value
+    except http.RouteError as e:
+        logger.warning(f"Vault entry previews retrieval (async) failed for user ID: {user_id}. Error: {e.error_code.name} - {str(e)}")
+        return jsonify({"error": str(e)}), e.error_code.value
+    except Exception as e:
+        logger.error(f"An unexpected error occurred while retrieving all vault entry previews (async) for user ID: {user_id}. Error: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
+
+@async_read_bp.route("/vault/details/<int:id>", methods=["GET"])
+@login_required
+async def get_vault_entry_details(id: int):
+    user: User = current_user
+    user_id = user.id
+    logger.info(f"Attempting to retrieve vault entry details (async) for entry ID: {id} for user ID: {user_id}")
+    try:
+        # Find the entry
+        entry: VaultEntry = await async_db.run(lambda session: session.scalar(select(VaultEntry).where(VaultEntry.user_id == user_id, VaultEntry.id == id)))
+        
+        # Check if the entry exists
+        if entry is None:
+            logger.warning(f"Vault entry details retrieval (async) failed: Entry ID {id} not found for user ID: {user_id}")
+            raise http.RouteError("Entry not found", http.ErrorCode.NOT_FOUND)
+        
+        # Return the entry
+        logger.info(f"Successfully retrieved vault entry details (async) for entry ID: {id} for user ID: {user_id}")
+        return jsonify(entry.to_detailed_dict()), http.SuccessCode.OK.value
+    except http.RouteError as e:
+        logger.warning(f"Vault entry details retrieval (async) failed for entry ID: {id} for user ID: {user_id}. Error: {e.error_code.name} - {str(e)}")
+        return jsonify({"error": str(e)}), e.error_code.value
+    except Exception as e:
+        logger.error(f"An unexpected error occurred while retrieving vault entry details (async) for entry ID: {id} for user ID: {user_id}. Error: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
+
+@async_read_bp.route("/vault/search", methods=["POST"])
+@login_required
+async def search_vault_entries():
+    user: User = current_user
+    user_id = user.id
+    try:
+        data = request.get_json()
+        keywords = data["keywords"]
+        logger.info(f"Attempting to search vault entries (async) for user ID: {user_id} with keywords: {keywords}")
+        
+        # Check if keywords were provided
+        if not keywords:
+            logger.warning(f"Vault search (async) failed for user ID: {user_id}: No keywords provided.")
+            raise http.RouteError("No keywords provided", http.ErrorCode.BAD_REQUEST)
+        
+        # Check the result limit
+        max_results = current_app.config.get("VAULT_SEARCH_MAX_RESULTS", 1000)
+        limit = data.get("limit", max_results)
+        if not isinstance(limit, int) or limit < 1:
+            logger.warning(f"Vault search (async) failed for user ID: {user_id}: Invalid limit.")
+            raise http.RouteError("Invalid limit", http.ErrorCode.BAD_REQUEST)
+        
+        # Query vault entries with the configured search engine, best matches first
+        entries: List[dict] = await async_db.run(lambda session: session.run_sync(lambda s: search.engine.search(user_id, keywords, min(limit, max_results), session=s)))
+        logger.info(f"Successfully found {len(entries)} vault entries (async) matching keywords for user ID: {user_id}.")
+        return jsonify(entries), http.SuccessCode.OK.value
+    except http.RouteError as e:
+        logger.warning(f"Vault search (async) failed for user ID: {user_id}. Error: {e.error_code.name} - {str(e)}")
+        return jsonify({"error": str(e)}), e.error_code.value
+    except Exception as e:
+        logger.error(f"An unexpected error occurred during vault search (async) for user ID: {user_id}. Error: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
+
+@async_read_bp.route("/account", methods=["GET"])
+@login_required
+async def get_account_info():
+    user: User = current_user
+    user_id = user.id
+    logger.info(f"Attempting to retrieve account information (async) for user ID: {user_id}")
+    try:
+        # Only load the account columns, the logged in user was loaded with the auth columns
+        async def get_account_data(session: AsyncSession) -> dict:
+            result = await session.execute(select(User.email, User.first_name, User.last_name, User.created_at).where(User.id == user_id))
+            return dict(result.one()._mapping)
+        account_data = await async_db.run(get_account_data)
+        logger.info(f"Account information successfully retrieved (async) for user ID: {user_id}")
+        return jsonify(account_data), http.SuccessCode.OK.value
+    except Exception as e:
+        logger.error(f"Error retrieving account information (async) for user ID: {user_id}. Error: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
\ No newline at end of file
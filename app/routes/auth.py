@@ -1,18 +1,17 @@
-from flask import Blueprint, jsonify, request, session, current_app, url_for
+from flask import Blueprint, jsonify, request, current_app, url_for
 from flask_login import login_user, logout_user, login_required, current_user
-from flask_mail import Message
-import pickle
 from scramp import ScramException
-from app.models import User, Secret, OneTimePassword
-from app.util import security, time, http
-from app import logger, db, login_manager, mail, scram
+from sqlalchemy.exc import IntegrityError
+from app.models import User, Secret, OneTimePassword, OutboxMail
+from app.util import time, http, handshake, mail_outbox, get_eager_load, rate_limit, read_replica, metrics
+from app import logger, db, login_manager, scram
 
 auth_bp = Blueprint("auth", __name__)
 
 @login_manager.user_loader
 def load_user(user_id):
     logger.debug(f"Attempting to load user with ID: {user_id}")
-    user = db.session.get(User, int(user_id))
+    user = User.load_for_request(int(user_id), get_eager_load())
     if user:
         logger.info(f"User with ID: {user_id} loaded successfully.")
     else:
@@ -31,7 +30,7 @@ def register():
         logger.info(f"Registration attempt for email: {account_info['email']}")
 
         # Check if the user already exists
-        existing_user = User.query.filter_by(email=account_info["email"]).first()
+        existing_user = User.get_by_email(account_info["email"])
         if existing_user:
             logger.warning(f"Registration failed: Email already in use for email: {account_info['email']}")
             raise http.RouteError("Email already in use", http.ErrorCode.CONFLICT)
@@ -41,28 +40,26 @@ def register():
             email=account_info["email"],
             first_name=account_info.get("first_name"),
             last_name=account_info.get("last_name"),
-            created_at=time.get_now_timestamp(),
-            hashed_password=security.hasher.hash(passwords["regular_password"])
+            created_at=time.get_now_timestamp()
         )
         if no_activation_required:
             new_user.is_activated = True
             logger.info(f"User activation skipped for email: {account_info['email']} (no_activation_required is True)")
 
+        # A concurrent registration can take the email after the check
         db.session.add(new_user)
-        db.session.flush()
+        try:
+            db.session.flush()
+        except IntegrityError as e:
+            db.session.rollback()
+            logger.warning(f"Registration failed: Email already in use for email: {account_info['email']}: {e.orig}")
+            raise http.RouteError("Email already in use", http.ErrorCode.CONFLICT)
         
         # Create the default empty secrets for the new user
         Secret.create_default_secrets(new_user.id)
         
-        # Store the revoery passcode
-        new_user.set_recovery_password(passwords["recovery_password"])
-        
-        # Store the vault key and salt
-        new_user.set_vault_keychain(keychain["vault_key"], keychain["recovery_key"], keychain["salt"])
-        
-        # Generate and store the SCRAM auth info as secrets
-        salt, stored_key, server_key, iteration_count = scram.make_auth_info(passwords["regular_password"])
-        new_user.set_scram_auth_info(salt, stored_key, server_key, iteration_count)
+        # Derive and store the password hash, the recovery password, the SCRAM auth info and the vault keychain
+        new_user.set_credentials(passwords["regular_password"], passwords["recovery_password"], keychain["vault_key"], keychain["recovery_key"], keychain["salt"])
         
         # Commit changes
         db.session.commit()
@@ -77,25 +74,24 @@ def register():
         return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
     
 @auth_bp.route("/activation/send", methods=["POST"])
+@rate_limit.limit("activation_email", rate_limit.args_email)
 def activation_send():
     try:
         email = request.args.get("email")
         logger.info(f"Attempting to send activation email for: {email}")
         
         # Find user by email
-        user: User = User.query.filter_by(email=email).first()
+        user: User = User.get_by_email(email)
         if not user:
             logger.warning(f"Activation email failed: User not found for email: {email}")
             raise http.RouteError("User not found", http.ErrorCode.NOT_FOUND)
         
-        # Check if cooldown expired
-        time_remaining = OneTimePassword.get_cooldown_remaining_seconds_for_user(user.id, "ACTIVATION", 30*60)
-        if time_remaining > 0:
-            error_message = f"Am activation email has already been sent.\n"
-            error_message += f"Please try again in {int(time_remaining/60//60)} hours, "
-            error_message += f"{int((time_remaining/60)%60)} minutes, and {int(time_remaining%60)} seconds."
-            logger.warning(f"Activation email failed: Cooldown active for user ID: {user.id}. Time remaining: {time_remaining}s")
-            raise http.RouteError(error_message, http.ErrorCode.BAD_REQUEST)
+        # Per-worker buckets let an account send one email per worker, so also check the last one sent
+        if rate_limit.is_per_worker():
+            time_remaining = OneTimePassword.get_cooldown_remaining_seconds_for_user(user.id, "ACTIVATION", rate_limit.get_interval_seconds("activation_email", "account"))
+            if time_remaining > 0:
+                logger.warning(f"Activation email failed: Cooldown active for user ID: {user.id}. Time remaining: {time_remaining}s")
+                raise rate_limit.RateLimited(time_remaining)
         
         # New: Generate verification token and send email
         token = OneTimePassword.create_email_verification_otp(user.id)
@@ -103,15 +99,20 @@ def activation_send():
         # Construct the verification URL using the base URL from config
         verification_link = f"{current_app.config['BASE_URL']}{url_for('auth.activate', id=user.id, token=token, _external=False)}"
 
-        # Send the link via email
-        msg = Message("Verify Your Email Address", recipients=[user.email])
-        msg.body = f"Please click the following link to verify your email: {verification_link}"
-        msg.html = f"<p>Please click the following link to verify your email: <a href='{verification_link}'>{verification_link}</a></p>"
-        mail.send(msg)
+        # Queue the link for sending in the same transaction as the token
+        OutboxMail.enqueue(
+            [user.email],
+            "Verify Your Email Address",
+            f"Please click the following link to verify your email: {verification_link}",
+            f"<p>Please click the following link to verify your email: <a href='{verification_link}'>{verification_link}</a></p>"
+        )
         
         db.session.commit()
-        logger.info(f"Verification email sent successfully to user ID: {user.id}")
+        mail_outbox.notify()
+        logger.info(f"Verification email queued successfully for user ID: {user.id}")
         return jsonify({"message": "Verification email sent successfully"}), http.SuccessCode.OK.value
+    except rate_limit.RateLimited as e:
+        return jsonify({"error": str(e)}), e.error_code.value, {"Retry-After": str(e.retry_after)}
     except http.RouteError as e:
         return jsonify({"error": str(e)}), e.error_code.value     
     except Exception as e:
@@ -120,6 +121,7 @@ def activation_send():
         return jsonify({"error": "An unexpected error occurred while sending the email"}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
     
 @auth_bp.route("/activation/<int:id>/<token>", methods=["GET"])
+@read_replica.use_primary
 def activate(id: int, token: str):
     try:
         logger.info(f"Attempting to activate user with ID: {id}")
@@ -130,7 +132,7 @@ def activate(id: int, token: str):
             raise http.RouteError("User not found", http.ErrorCode.BAD_REQUEST)
         
         # Check if the token is valid and not expired
-        if user.verify_and_use_otp(token):
+        if user.verify_and_use_otp(token, "ACTIVATION"):
             user.is_activated = True
             db.session.commit()
             logger.info(f"User with ID: {id} email verified and activated successfully.")
@@ -148,6 +150,8 @@ def activate(id: int, token: str):
         return jsonify({"error": "An unexpected error occurred during email verification"}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
 
 @auth_bp.route("/login/step1", methods=["POST"])
+@read_replica.use_replica
+@rate_limit.limit("login", rate_limit.json_email)
 def login_step1():
     try:
         data = request.get_json()
@@ -157,8 +161,8 @@ def login_step1():
 
         logger.info(f"Login Step 1 initiated for email: {email}")
 
-        # Find the user
-        user: User = User.query.filter_by(email=email).first()
+        # Find the user, along with the secrets used by the SCRAM server
+        user: User = User.resolve_by_email(email)
         if not user:
             logger.warning(f"Login Step 1 failed: User not found for email: {email}")
             raise http.RouteError("User not found", http.ErrorCode.NOT_FOUND)
@@ -186,19 +190,18 @@ def login_step1():
                 raise http.RouteError("Invalid TOTP token", http.ErrorCode.UNAUTHORIZED)
             logger.info(f"TOTP code successfully verified for user: {email}")
         
-        # Create the SCRAM server
-        scram_server = scram.make_server(User.get_auth_information)
-        
-        # Get server first message
-        scram_server.set_client_first(client_first_message)
-        server_first_message = scram_server.get_server_first()
+        # Create the SCRAM server and get its first message
+        with metrics.timer("scram_server_first"):
+            scram_server = scram.make_server(User.get_auth_information)
+            scram_server.set_client_first(client_first_message)
+            server_first_message = scram_server.get_server_first()
         
-        # Store the server in the session
-        session[f"{user.id}_scram_server"] = pickle.dumps(scram_server)
-        logger.info(f"Login Step 1 successful for email: {email}. SCRAM server stored in session.")
+        # Store the handshake state
+        handshake_id = handshake.store.save(handshake.HandshakeState(email=email, client_first=client_first_message, s_nonce=scram_server.s_nonce))
+        logger.info(f"Login Step 1 successful for email: {email}. Handshake state stored.")
         
-        # Return the server's first message
-        return jsonify({"server_message": server_first_message}), http.SuccessCode.OK.value
+        # Return the server's first message and the handshake ID
+        return jsonify({"server_message": server_first_message, "handshake_id": handshake_id}), http.SuccessCode.OK.value
     except http.RouteError as e:
         logger.warning(f"Login Step 1 failed for email: {email}. Error: {e.error_code.name} - {str(e)}")
         return jsonify({"error": str(e)}), e.error_code.value
@@ -207,16 +210,24 @@ def login_step1():
         return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
 
 @auth_bp.route("/login/step2", methods=["POST"])
+@rate_limit.limit("login", rate_limit.json_email)
 def login_step2():
     try:    
         data = request.get_json()
         email = data["email"]
         client_final_message = data["client_message"]
+        handshake_id = data.get("handshake_id")
         
         logger.info(f"Login Step 2 initiated for email: {email}")
         
-        # Find the user
-        user: User = User.query.filter_by(email=email).first()
+        # Grab the handshake state, first since using up a token commits
+        state = handshake.store.load(handshake_id) if handshake_id else None
+        if state is None or state.email.lower() != email.lower():
+            logger.warning(f"Login Step 2 failed: Handshake state not found, expired or already used for email: {email}")
+            raise http.RouteError("Handshake not found or expired. Please restart login.", http.ErrorCode.BAD_REQUEST)
+        
+        # Find the user, along with the secrets used by the SCRAM server
+        user: User = User.resolve_by_email(email)
         if user is None:
             logger.warning(f"Login Step 2 failed: User not found for email: {email}")
             raise http.RouteError("User not found", http.ErrorCode.NOT_FOUND)
@@ -226,14 +237,17 @@ def login_step2():
             logger.warning(f"Login Step 2 failed: Admin login attempted for email: {email}")
             raise http.RouteError("Cannot log in as admin", http.ErrorCode.FORBIDDEN)
         
-        # Grab the server from the session
-        scram_server = pickle.loads(session[f"{user.id}_scram_server"])
-        del session[f"{user.id}_scram_server"]
-        logger.debug(f"SCRAM server retrieved from session for user ID: {user.id}")
+        # Replay step 1 to rebuild the SCRAM server
+        with metrics.timer("scram_server_first"):
+            scram_server = scram.make_server(User.get_auth_information, s_nonce=state.s_nonce)
+            scram_server.set_client_first(state.client_first)
+            scram_server.get_server_first()
+        logger.debug(f"SCRAM server rebuilt from the handshake state for user ID: {user.id}")
         
         # Get the server's final message
-        scram_server.set_client_final(client_final_message)
-        server_final_message = scram_server.get_server_final() 
+        with metrics.timer("scram_server_final"):
+            scram_server.set_client_final(client_final_message)
+            server_final_message = scram_server.get_server_final() 
 
         # Login the user
         login_user(user)
@@ -247,9 +261,6 @@ def login_step2():
     except ScramException as e:
         logger.warning(f"Login Step 2 failed due to SCRAM error for email: {email}. Error: {e}")
         return jsonify({"error": str(e)}), http.ErrorCode.UNAUTHORIZED.value
-    except KeyError:
-        logger.error(f"Login Step 2 failed: SCRAM server not found in session for email: {email}. This could indicate a session issue or out-of-order steps.")
-        return jsonify({"error": "SCRAM server not found in session. Please restart login."}), http.ErrorCode.BAD_REQUEST.value
     except Exception as e:
         logger.error(f"An unexpected error occurred during Login Step 2 for email: {email}. Error: {e}", exc_info=True)
         return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
@@ -269,38 +280,37 @@ def logout():
         return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
     
 @auth_bp.route("/recovery/send", methods=["POST"])
+@rate_limit.limit("recovery_email", rate_limit.args_email)
 def reovery_send():
     try:
         email = request.args.get("email")
         logger.info(f"Attempting to send recovery OTP for email: {email}")
 
         # Find user by email
-        user: User = User.query.filter_by(email=email).first()
+        user: User = User.get_by_email(email)
         if not user:
             logger.warning(f"Recovery OTP send failed: User not found for email: {email}")
             raise http.RouteError("User not found", http.ErrorCode.NOT_FOUND)
 
-        # Check if cooldown expired
-        time_remaining = OneTimePassword.get_cooldown_remaining_seconds_for_user(user.id, "RECOVERY", 24*60*60)
-        if time_remaining > 0:
-            error_message = f"A recovery email has already been sent.\n"
-            error_message += f"Please try again in {int(time_remaining/60//60)} hours, "
-            error_message += f"{int((time_remaining/60)%60)} minutes, and {int(time_remaining%60)} seconds."
-            logger.warning(f"Recovery OTP send failed: Cooldown active for user ID: {user.id}. Time remaining: {time_remaining}s")
-            raise http.RouteError(error_message, http.ErrorCode.BAD_REQUEST)
+        # Per-worker buckets let an account send one email per worker, so also check the last one sent
+        if rate_limit.is_per_worker():
+            time_remaining = OneTimePassword.get_cooldown_remaining_seconds_for_user(user.id, "RECOVERY", rate_limit.get_interval_seconds("recovery_email", "account"))
+            if time_remaining > 0:
+                logger.warning(f"Recovery OTP send failed: Cooldown active for user ID: {user.id}. Time remaining: {time_remaining}s")
+                raise rate_limit.RateLimited(time_remaining)
 
         # Generate a new OTP
         otp = OneTimePassword.create_recovery_otp(user.id, 5*60)
 
-        # Send an email containing the OTP to the user
-        msg = Message("Your Recovery OTP", recipients=[email])
-        msg.body = f"Your OTP is: {otp}"
-        msg.html = f"<p>Your OTP is: <strong>{otp}</strong></p>"
-        mail.send(msg)
+        # Queue an email containing the OTP in the same transaction as the OTP
+        OutboxMail.enqueue([email], "Your Recovery OTP", f"Your OTP is: {otp}", f"<p>Your OTP is: <strong>{otp}</strong></p>")
 
         db.session.commit()
-        logger.info(f"Recovery OTP sent successfully to user ID: {user.id}")
+        mail_outbox.notify()
+        logger.info(f"Recovery OTP queued successfully for user ID: {user.id}")
         return jsonify({"message": "OTP sent successfully"}), http.SuccessCode.OK.value
+    except rate_limit.RateLimited as e:
+        return jsonify({"error": str(e)}), e.error_code.value, {"Retry-After": str(e.retry_after)}
     except http.RouteError as e:
         logger.warning(f"Recovery OTP send failed for email: {email}. Error: {e.error_code.name} - {str(e)}")
         return jsonify({"error": str(e)}), e.error_code.value
@@ -310,6 +320,7 @@ def reovery_send():
         return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
 
 @auth_bp.route("/recovery/login", methods=["POST"])
+@rate_limit.limit("recovery_login", rate_limit.json_email)
 def recovery_login():
     try:
         data = request.get_json()
@@ -320,7 +331,7 @@ def recovery_login():
         logger.info(f"Recovery login attempt for email: {email}")
         
         # Find the user by email
-        user: User = User.query.filter_by(email=email).first()
+        user: User = User.get_by_email(email)
         if not user:
             logger.warning(f"Recovery login failed: User not found for email: {email}")
             raise http.RouteError("User not found", http.ErrorCode.NOT_FOUND)
@@ -336,7 +347,7 @@ def recovery_login():
             raise http.RouteError("Invalid recovery password", http.ErrorCode.UNAUTHORIZED)
 
         # Check OTP
-        if user.verify_and_use_otp(otp):
+        if user.verify_and_use_otp(otp, "RECOVERY"):
             if login_user(user):
                 db.session.commit()
                 logger.info(f"Recovery login successful for user: {email}. User logged in and session committed.")
@@ -0,0 +1,23 @@
+import hmac
+from flask import Blueprint, Response, current_app, request
+from app.util import admin_required, metrics
+from app import logger
+
+metrics_bp = Blueprint("metrics", __name__)
+
+def _export() -> Response:
+    data, content_type = metrics.export()
+    return Response(data, content_type=content_type)
+
+@admin_required
+def _export_for_admin() -> Response:
+    return _export()
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def get_metrics():
+    # Scrapers can't log in, they may send the token instead
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and hmac.compare_digest(request.headers.get("Authorization", "").encode(), f"Bearer {token}".encode()):
+        return _export()
+    logger.debug("Metrics requested without the scrape token, checking for an admin session.")
+    return _export_for_admin()
\ No newline at end of file
@@ -1,23 +1,49 @@
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, jsonify, request, current_app
 from flask_login import current_user, login_required
-from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from typing import List
-from app.models import User, VaultEntry
-from app.util import http, time
+from app.models import User, VaultEntry, VaultTombstone
+from app.util import http, time, search, read_replica
 from app import db, logger
 
 vault_bp = Blueprint("vault", __name__)
 
+def _get_page_args() -> tuple[int, int | None] | None:
+    """Parses the keyset pagination query arguments.
+
+    Returns:
+        (int, int | None) | None: The page limit and cursor, or None if the request is not paginated
+    """
+    if "limit" not in request.args and "after" not in request.args:
+        return None
+    default_limit = current_app.config.get("VAULT_PAGE_DEFAULT_LIMIT", 100)
+    max_limit = current_app.config.get("VAULT_PAGE_MAX_LIMIT", 500)
+    limit = request.args.get("limit", default_limit, type=int)
+    after = request.args.get("after", type=int)
+    if limit is None or limit < 1 or ("after" in request.args and after is None):
+        raise http.RouteError("Invalid pagination arguments", http.ErrorCode.BAD_REQUEST)
+    return min(limit, max_limit), after
+
 @vault_bp.route("/details", methods=["GET"])
 @login_required
 def get_all_vault_entry_details():
     user: User = current_user
     logger.info(f"Attempting to retrieve all vault entry details for user ID: {user.id}")
     try:
+        # Fetch one page of entry details if requested
+        page_args = _get_page_args()
+        if page_args is not None:
+            entries, next_cursor = VaultEntry.get_page(user.id, *page_args)
+            logger.info(f"Successfully retrieved a page of {len(entries)} vault entry details for user ID: {user.id}")
+            return jsonify({"entries": entries, "next_cursor": next_cursor}), http.SuccessCode.OK.value
+        
         # Fetch all entry details for the current user
         entries = [entry.to_detailed_dict() for entry in user.entries]
         logger.info(f"Successfully retrieved {len(entries)} vault entry details for user ID: {user.id}")
         return jsonify(entries), http.SuccessCode.OK.value
+    except http.RouteError as e:
+        logger.warning(f"Vault entry details retrieval failed for user ID: {user.id}. Error: {e.error_code.name} - {str(e)}")
+        return jsonify({"error": str(e)}), e.error_code.value
     except Exception as e:
         logger.error(f"An unexpected error occurred while retrieving all vault entry details for user ID: {user.id}. Error: {e}", exc_info=True)
         return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
@@ -29,10 +55,20 @@ def get_all_vault_entry_previews():
     user: User = current_user
     logger.info(f"Attempting to retrieve all vault entry previews for user ID: {user.id}")
     try:
+        # Fetch one page of entry previews if requested
+        page_args = _get_page_args()
+        if page_args is not None:
+            previews, next_cursor = VaultEntry.get_page(user.id, *page_args, preview=True)
+            logger.info(f"Successfully retrieved a page of {len(previews)} vault entry previews for user ID: {user.id}")
+            return jsonify({"entries": previews, "next_cursor": next_cursor}), http.SuccessCode.OK.value
+        
         # Fetch all the entry previews for the current user
         previews = [entry.to_preview_dict() for entry in user.entries]
         logger.info(f"Successfully retrieved {len(previews)} vault entry previews for user ID: {user.id}")
         return jsonify(previews), http.SuccessCode.OK.value
+    except http.RouteError as e:
+        logger.warning(f"Vault entry previews retrieval failed for user ID: {user.id}. Error: {e.error_code.name} - {str(e)}")
+        return jsonify({"error": str(e)}), e.error_code.value
     except Exception as e:
         logger.error(f"An unexpected error occurred while retrieving all vault entry previews for user ID: {user.id}. Error: {e}", exc_info=True)
         return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
@@ -62,12 +98,56 @@ def get_vault_entry_details(id: int):
         logger.error(f"An unexpected error occurred while retrieving vault entry details for entry ID: {id} for user ID: {user.id}. Error: {e}", exc_info=True)
         return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
 
+@vault_bp.route("/changes", methods=["GET"])
+@read_replica.use_primary
+@login_required
+def get_vault_changes():
+    """
+    Returns the entries created or modified, and the IDs of the entries deleted, since the given cursor.
+    Without a cursor, or with one older than the tombstone retention period, the whole vault is returned
+    and "full_resync" is set so that the client replaces its local copy.
+    """
+    user: User = current_user
+    logger.info(f"Attempting to retrieve vault changes for user ID: {user.id}")
+    try:
+        since = request.args.get("since", type=int)
+        if "since" in request.args and since is None:
+            raise http.RouteError("Invalid cursor", http.ErrorCode.BAD_REQUEST)
+        
+        # The returned cursor lags behind the clock to include writes that were still committing
+        now = time.get_now_timestamp()
+        cursor = now - current_app.config.get("VAULT_SYNC_CURSOR_LAG_SECONDS", 5)
+        retention_seconds = current_app.config.get("VAULT_TOMBSTONE_RETENTION_SECONDS", 30*24*60*60)
+        full_resync = since is None or since < now - retention_seconds
+        
+        query = VaultEntry.query.filter_by(user_id=user.id)
+        if full_resync:
+            deleted_ids = []
+        else:
+            query = query.filter(VaultEntry.last_modified >= since)
+            deleted_ids = VaultTombstone.get_deleted_ids_since(user.id, since)
+        entries = [entry.to_sync_dict() for entry in query.order_by(VaultEntry.id)]
+        
+        logger.info(f"Successfully retrieved vault changes for user ID: {user.id}. Changed: {len(entries)}, deleted: {len(deleted_ids)}, full resync: {full_resync}")
+        return jsonify({
+            "entries": entries,
+            "deleted": deleted_ids,
+            "cursor": cursor,
+            "full_resync": full_resync
+        }), http.SuccessCode.OK.value
+    except http.RouteError as e:
+        logger.warning(f"Vault changes retrieval failed for user ID: {user.id}. Error: {e.error_code.name} - {str(e)}")
+        return jsonify({"error": str(e)}), e.error_code.value
+    except Exception as e:
+        logger.error(f"An unexpected error occurred while retrieving vault changes for user ID: {user.id}. Error: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
+
 @vault_bp.route("/search", methods=["POST"])
 @login_required
 def search_vault_entries():
     """
     Retrieves vault entries for a specific user that match any of the keywords
-    in the title, url, or notes.
+    in the title, url, or notes, ranked by the configured search engine.
     """
     user: User = current_user
     try:
@@ -80,19 +160,17 @@ def search_vault_entries():
             logger.warning(f"Vault search failed for user ID: {user.id}: No keywords provided.")
             raise http.RouteError("No keywords provided", http.ErrorCode.BAD_REQUEST)
         
-        # Compute search conditions
-        search_conditions = []
-        for keyword in keywords:
-            search_term = f"%{keyword}%"
-            search_conditions.append(VaultEntry.title.ilike(search_term))
-            search_conditions.append(VaultEntry.url.ilike(search_term))
-            search_conditions.append(VaultEntry.notes.ilike(search_term))
-        combined_conditions = or_(*search_conditions)
-        
-        # Query vault entries
-        entries: List[VaultEntry] = VaultEntry.query.filter_by(user_id=user.id).filter(combined_conditions).all()
+        # Check the result limit
+        max_results = current_app.config.get("VAULT_SEARCH_MAX_RESULTS", 1000)
+        limit = data.get("limit", max_results)
+        if not isinstance(limit, int) or limit < 1:
+            logger.warning(f"Vault search failed for user ID: {user.id}: Invalid limit.")
+            raise http.RouteError("Invalid limit", http.ErrorCode.BAD_REQUEST)
+        
+        # Query vault entries, best matches first
+        entries: List[dict] = search.engine.search(user.id, keywords, min(limit, max_results))
         logger.info(f"Successfully found {len(entries)} vault entries matching keywords for user ID: {user.id}.")
-        return jsonify([entry.to_detailed_dict() for entry in entries]), http.SuccessCode.OK.value
+        return jsonify(entries), http.SuccessCode.OK.value
     except http.RouteError as e:
         logger.warning(f"Vault search failed for user ID: {user.id}. Error: {e.error_code.name} - {str(e)}")
         return jsonify({"error": str(e)}), e.error_code.value
@@ -130,6 +208,7 @@ def add_vault_entry():
         # Add the new entry to the database
         db.session.add(new_entry)
         db.session.commit()
+        search.engine.entry_saved(user.id, new_entry)
         logger.info(f"New vault entry '{entry_title}' added successfully for user ID: {user.id}.")
 
         # Return the new entry preview
@@ -168,21 +247,9 @@ def update_vault_entry(id: int):
         entry.set_encrypted_fields(new_encrypted_username, new_encrypted_password)
         logger.debug(f"Encrypted fields updated for vault entry ID: {id} (user ID: {user.id}).")
 
-        # If reencrypting, calculate the remaining number of entries left to patch
-        entries_left = session.get(f"{user.id}_entries_left", 0)
-        entries_left -= 1
-
-        # Commit if this was the last entry to patch
-        if entries_left <= 0:
-            if entries_left == 0:  # Last entry for reencryption process
-                logger.info(f"Re-encryption complete for user ID: {user.id}. Last entry patched: {id}. Total entries: {len(user.entries)}")
-                del session[f"{user.id}_entries_left"]
-            db.session.commit()
-            logger.info(f"Vault entry ID: {id} updated successfully for user ID: {user.id}.")
-        else:
-            session[f"{user.id}_entries_left"] = entries_left  # Save the number of remining entries
-            db.session.flush()
-            logger.info(f"Vault entry ID: {id} patched for user ID: {user.id}. {entries_left} entries remaining for re-encryption.")
+        db.session.commit()
+        search.engine.entry_saved(user.id, entry)
+        logger.info(f"Vault entry ID: {id} updated successfully for user ID: {user.id}.")
         
         return jsonify({"message": "Entry updated successfully"}), http.SuccessCode.OK.value
     except http.RouteError as e:
@@ -205,16 +272,114 @@ def delete_vault_entry(id: int):
             logger.warning(f"Delete vault entry failed: Entry ID {id} not found for user ID: {user.id}")
             raise http.RouteError("Entry not found", http.ErrorCode.NOT_FOUND)
 
-        # Delete the entry
+        # Delete the entry and leave a tombstone for delta syncs
         db.session.delete(entry)
+        VaultTombstone.record(user.id, [id])
         db.session.commit()
+        search.engine.entry_deleted(user.id, id)
         logger.info(f"Vault entry ID: {id} successfully deleted for user ID: {user.id}.")
 
         return jsonify({"message": "Entry deleted successfully"}), http.SuccessCode.OK.value
     except http.RouteError as e:
         logger.warning(f"Delete vault entry failed for entry ID: {id} for user ID: {user.id}. Error: {e.error_code.name} - {str(e)}")
-        return jsonify({"error": str(e)}), e.ErrorCode.value
+        return jsonify({"error": str(e)}), e.error_code.value
     except Exception as e:
         db.session.rollback()
         logger.error(f"An unexpected error occurred during deleting vault entry ID: {id} for user ID: {user.id}. Error: {e}", exc_info=True)
-        return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
\ No newline at end of file
+        return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
+
+@vault_bp.route("/batch", methods=["POST"])
+@login_required
+def batch_vault_entries():
+    """
+    Applies a list of add/update/delete operations in a single transaction.
+    Deletes are executed first, then updates, then adds, each as one bulk statement.
+    The whole batch is rejected if any title conflict occurs.
+    """
+    user: User = current_user
+    try:
+        data = request.get_json()
+        operations = data["operations"]
+        logger.info(f"Attempting to apply a batch of {len(operations)} vault operations for user ID: {user.id}")
+        
+        # Check the batch size
+        max_operations = current_app.config.get("VAULT_BATCH_MAX_OPERATIONS", 1000)
+        if not operations:
+            raise http.RouteError("No operations provided", http.ErrorCode.BAD_REQUEST)
+        if len(operations) > max_operations:
+            raise http.RouteError(f"Too many operations, the maximum is {max_operations}", http.ErrorCode.BAD_REQUEST)
+        
+        # Validate the operations
+        adds, updates, deletes = [], [], []
+        referenced_ids, titles = set(), set()
+        for index, operation in enumerate(operations):
+            op = operation.get("op")
+            if op == "add":
+                entry = operation.get("entry") or {}
+                if not entry.get("title"):
+                    raise http.RouteError(f"Operation {index}: missing entry title", http.ErrorCode.BAD_REQUEST)
+                adds.append((index, entry))
+            elif op in ("update", "delete"):
+                entry_id = operation.get("id")
+                if not isinstance(entry_id, int):
+                    raise http.RouteError(f"Operation {index}: missing entry ID", http.ErrorCode.BAD_REQUEST)
+                if entry_id in referenced_ids:
+                    raise http.RouteError(f"Operation {index}: entry ID {entry_id} is referenced more than once", http.ErrorCode.BAD_REQUEST)
+                referenced_ids.add(entry_id)
+                if op == "update":
+                    entry = operation.get("entry") or {}
+                    if "title" in entry and not entry["title"]:
+                        raise http.RouteError(f"Operation {index}: empty entry title", http.ErrorCode.BAD_REQUEST)
+                    updates.append((index, {**entry, "id": entry_id}))
+                else:
+                    deletes.append((index, entry_id))
+            else:
+                raise http.RouteError(f"Operation {index}: unknown operation '{op}'", http.ErrorCode.BAD_REQUEST)
+            
+            # Titles must be unique inside the batch as well
+            title = (operation.get("entry") or {}).get("title")
+            if title:
+                if title in titles:
+                    raise http.RouteError(f"Operation {index}: title '{title}' is used more than once in the batch", http.ErrorCode.CONFLICT)
+                titles.add(title)
+        
+        # Find which of the referenced entries belong to the user
+        owned_ids = VaultEntry.get_owned_ids(user.id, referenced_ids)
+        results = [None] * len(operations)
+        for index, entry_id in [(i, e["id"]) for i, e in updates] + deletes:
+            if entry_id not in owned_ids:
+                results[index] = {"op": operations[index]["op"], "id": entry_id, "status": http.ErrorCode.NOT_FOUND.value, "error": "Entry not found"}
+        
+        # Apply all operations in one transaction
+        try:
+            delete_ids = [entry_id for _, entry_id in deletes if entry_id in owned_ids]
+            VaultEntry.bulk_delete(user.id, delete_ids)
+            for index, entry_id in deletes:
+                if entry_id in owned_ids:
+                    results[index] = {"op": "delete", "id": entry_id, "status": http.SuccessCode.OK.value}
+            
+            owned_updates = [(index, entry) for index, entry in updates if entry["id"] in owned_ids]
+            VaultEntry.bulk_update([entry for _, entry in owned_updates])
+            for index, entry in owned_updates:
+                results[index] = {"op": "update", "id": entry["id"], "status": http.SuccessCode.OK.value}
+            
+            new_ids = VaultEntry.bulk_insert(user.id, [entry for _, entry in adds])
+            for (index, entry), new_id in zip(adds, new_ids):
+                results[index] = {"op": "add", "id": new_id, "title": entry["title"], "status": http.SuccessCode.CREATED.value}
+            
+            db.session.commit()
+            search.engine.invalidate(user.id)
+        except IntegrityError as e:
+            db.session.rollback()
+            logger.warning(f"Vault batch for user ID: {user.id} violates a unique constraint: {e.orig}")
+            raise http.RouteError("An entry with one of the given titles already exists for this user", http.ErrorCode.CONFLICT)
+        
+        logger.info(f"Vault batch applied successfully for user ID: {user.id}. Added: {len(adds)}, updated: {len(owned_updates)}, deleted: {len(delete_ids)}.")
+        return jsonify({"results": results}), http.SuccessCode.OK.value
+    except http.RouteError as e:
+        logger.warning(f"Vault batch failed for user ID: {user.id}. Error: {e.error_code.name} - {str(e)}")
+        return jsonify({"error": str(e)}), e.error_code.value
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"An unexpected error occurred during vault batch for user ID: {user.id}. Error: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), http.ErrorCode.INTERNAL_SERVER_ERROR.value
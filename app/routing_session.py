@@ -0,0 +1,42 @@
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+# The bind key of the read replica in SQLALCHEMY_BINDS
+REPLICA_BIND = "replica"
+
+class RoutingSession(Session):
+    """The session of db.session, which sends the reads of the requests selected by app.util.read_replica to the replica.
+
+    Everything else goes to the primary: flushes, bulk writes, raw SQL and any read after a write in the same session.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and isinstance(clause, Select) and self._reads_from_replica():
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self) -> bool:
+        return (
+            has_app_context()
+            and g.get("db_reads") == REPLICA_BIND
+            and not self._flushing
+            and not self.info.get("wrote", False)
+            and REPLICA_BIND in self._db.engines
+        )
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_flush(session: RoutingSession, flush_context):
+    session.info["wrote"] = True
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+@event.listens_for(RoutingSession, "after_commit")
+def _mark_commit(session: RoutingSession):
+    # Lets the request pin the client's following reads to the primary
+    if session.info.get("wrote", False) and has_app_context():
+        g.db_committed_writes = True
\ No newline at end of file
@@ -1,6 +1,20 @@
 from .admin import admin_required
+from .eager_load import eager_load, get_eager_load
 from .time import get_now_timestamp, timestamp_as_datetime_string
 from . import security
 from . import http
+from . import search
+from . import query_counter
+from . import handshake
+from . import session_backend
+from . import user_cache
+from . import mail_outbox
+from . import retention
+from . import totp_qrcode
+from . import rate_limit
+from . import async_db
+from . import db_pool
+from . import read_replica
+from . import metrics
 
-__all__ = ["admin_required", "get_now_timestamp",  "timestamp_as_datetime_string", "security", "http"]
\ No newline at end of file
+__all__ = ["admin_required", "eager_load", "get_eager_load", "get_now_timestamp",  "timestamp_as_datetime_string", "security", "http", "search", "query_counter", "handshake", "session_backend", "user_cache", "mail_outbox", "retention", "totp_qrcode", "rate_limit", "async_db", "db_pool", "read_replica", "metrics"]
\ No newline at end of file
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Callable, TypeVar
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+T = TypeVar("T")
+
+# The async drivers of the sync ones
+DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg"
+}
+
+_url: str | None = None
+_engine_options: dict[str, Any] = {}
+_engine: AsyncEngine | None = None
+_sessionmaker: async_sessionmaker[AsyncSession] | None = None
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_pid: int | None = None
+_lock = threading.Lock()
+
+def to_async_url(url: str) -> str:
+    """Returns the URL of a database with its async driver, e.g. postgresql+asyncpg for postgresql+psycopg2."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in DRIVERS:
+        raise ValueError(f"No async driver for the '{backend}' database")
+    return parsed.set(drivername=DRIVERS[backend]).render_as_string(hide_password=False)
+
+def init(url: str, **engine_options):
+    """Configures the async engine of the read path. The engine is created on first use, in every process.
+
+    Args:
+        url (str): The database URL, with a sync or async driver.
+        **engine_options: Passed to create_async_engine, e.g. pool_size.
+    """
+    global _url, _engine_options
+    with _lock:
+        _url = to_async_url(url)
+        _engine_options = engine_options
+    dispose()
+
+def is_enabled() -> bool:
+    return _url is not None
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Returns the event loop of this process, starting it on first use.
+    
+    Pooled async connections belong to the loop that opened them, so all the queries of a process run
+    on one long-lived loop. The requests, which run their async views on their own loops, wait on it.
+    """
+    global _loop, _loop_pid, _engine, _sessionmaker
+    with _lock:
+        if _url is None:
+            raise RuntimeError("The async read path is not enabled")
+        # A loop inherited through a fork has no thread, every process starts its own
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            threading.Thread(target=_loop.run_forever, name="async-db", daemon=True).start()
+            _engine = create_async_engine(_url, **_engine_options)
+            _sessionmaker = async_sessionmaker(_engine, expire_on_commit=False)
+        return _loop
+
+async def _run_in_session(fn: Callable[[AsyncSession], Awaitable[T]]) -> T:
+    async with _sessionmaker() as session:
+        return await fn(session)
+
+async def run(fn: Callable[[AsyncSession], Awaitable[T]]) -> T:
+    """Runs a read with a new AsyncSession and returns its result. Can be awaited from any event loop.
+
+    Args:
+        fn (Callable[[AsyncSession], Awaitable[T]]): Queries the session. Objects loaded by it stay usable, as
+            long as they don't lazy load.
+
+    Returns:
+        T: The result of fn.
+    """
+    future = asyncio.run_coroutine_threadsafe(_run_in_session(fn), _get_loop())
+    return await asyncio.wrap_future(future)
+
+def dispose():
+    """Closes the connections of this process and stops its event loop."""
+    global _loop, _loop_pid, _engine, _sessionmaker
+    with _lock:
+        if _loop is not None and _loop_pid == os.getpid():
+            if _engine is not None:
+                asyncio.run_coroutine_threadsafe(_engine.dispose(), _loop).result()
+            _loop.call_soon_threadsafe(_loop.stop)
+        _loop = _loop_pid = _engine = _sessionmaker = None
\ No newline at end of file
@@ -0,0 +1,234 @@
+import threading
+import time
+from typing import Any, Mapping
+from uuid import uuid4
+from flask import Flask
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool, NullPool
+
+class PoolStats:
+    """Counters of the checkouts of a connection pool, kept per process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    def record_checkout(self, waited: bool, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if not timed_out:
+                self.checkouts += 1
+            if waited:
+                self.waits += 1
+                self.wait_seconds += seconds
+                self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def as_dict(self) -> dict[str, int | float]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_seconds": self.wait_seconds,
+                "max_wait_seconds": self.max_wait_seconds,
+                "timeouts": self.timeouts
+            }
+
+class _MeteredPool:
+    """Records the checkouts of a pool and the time spent waiting for a connection to be returned."""
+
+    stats: PoolStats
+
+    def __init__(self, *args, stats: PoolStats | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = stats if stats is not None else PoolStats()
+
+    def _must_wait(self) -> bool:
+        return False
+
+    def connect(self):
+        waited, start = self._must_wait(), time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.record_checkout(waited, time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record_checkout(waited, time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # Disposing the engine replaces its pool, the counters carry over
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    def __init__(self, *args, max_overflow: int = 10, **kwargs):
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        self.max_overflow = max_overflow  # QueuePool only keeps it privately
+
+    def _must_wait(self) -> bool:
+        # Every connection the pool may open is checked out
+        return self.max_overflow > -1 and self.checkedout() >= self.size() + self.max_overflow
+
+class MeteredNullPool(_MeteredPool, NullPool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._checked_out = 0
+        self._checked_out_lock = threading.Lock()
+
+    def _do_get(self):
+        record = super()._do_get()
+        with self._checked_out_lock:
+            self._checked_out += 1
+        return record
+
+    def _do_return_conn(self, record):
+        with self._checked_out_lock:
+            self._checked_out -= 1
+        super()._do_return_conn(record)
+
+    def checkedout(self) -> int:
+        return self._checked_out
+
+# The pool classes of DB_POOL_CLASS
+POOLS = {
+    "queue": MeteredQueuePool,
+    "null": MeteredNullPool
+}
+
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid4()}__"
+
+def pgbouncer_connect_args(url: str) -> dict[str, Any]:
+    """Returns the driver arguments that turn off server-side prepared statements, which don't survive
+    PgBouncer's transaction pooling since consecutive transactions may run on different server connections.
+
+    psycopg2 never prepares statements, psycopg 3 does after a few executions and asyncpg always does.
+
+    Args:
+        url (str): The database URL.
+
+    Returns:
+        dict[str, Any]: The connect_args of the engine.
+    """
+    driver = make_url(url).get_driver_name()
+    if driver == "asyncpg":
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            # The unnamed statements asyncpg still prepares must not clash across clients either
+            "prepared_statement_name_func": _unique_statement_name
+        }
+    if driver == "psycopg":
+        return {"prepare_threshold": None}
+    return {}
+
+def engine_options(url: str, config: Mapping[str, Any], pool_size: int, max_overflow: int) -> dict[str, Any]:
+    """Returns the engine options of the DB_POOL_* and DB_PGBOUNCER config for a database.
+
+    Args:
+        url (str): The database URL.
+        config (Mapping[str, Any]): The app config.
+        pool_size (int): The number of connections kept open by a queue pool.
+        max_overflow (int): The number of extra connections a queue pool may open under load.
+
+    Returns:
+        dict[str, Any]: The options, without a poolclass for queue pools so that async engines keep their own.
+    """
+    # In-memory SQLite databases live in a single connection, Flask-SQLAlchemy sets up its pool
+    if _is_memory_sqlite(url):
+        return {}
+
+    options: dict[str, Any] = {"pool_pre_ping": config.get("DB_POOL_PRE_PING", True)}
+    pool = config.get("DB_POOL_CLASS", "queue")
+    if pool == "null":
+        options["poolclass"] = NullPool
+    elif pool == "queue":
+        options["pool_size"] = pool_size
+        options["max_overflow"] = max_overflow
+        options["pool_timeout"] = config.get("DB_POOL_TIMEOUT_SECONDS", 10)
+        options["pool_recycle"] = config.get("DB_POOL_RECYCLE_SECONDS", 30 * 60)
+    else:
+        raise ValueError(f"Unknown database pool class: {pool}")
+
+    if config.get("DB_PGBOUNCER", False):
+        connect_args = pgbouncer_connect_args(url)
+        if connect_args:
+            options["connect_args"] = connect_args
+    return options
+
+def configure(app: Flask) -> str:
+    """Sets up the SQLALCHEMY_ENGINE_OPTIONS of the database pool, before Flask-SQLAlchemy creates the engine.
+
+    Options set explicitly in SQLALCHEMY_ENGINE_OPTIONS take precedence.
+
+    Args:
+        app (Flask): The app, with the DB_POOL_* config set.
+
+    Returns:
+        str: The selected pool class, "static" for in-memory SQLite databases.
+    """
+    url = app.config.get("SQLALCHEMY_DATABASE_URI")
+    if url is None or _is_memory_sqlite(url):
+        return "static"
+
+    pool = app.config.get("DB_POOL_CLASS", "queue")
+    options = engine_options(url, app.config, app.config.get("DB_POOL_SIZE", 5), app.config.get("DB_MAX_OVERFLOW", 10))
+    options["poolclass"] = POOLS[pool]
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {**options, **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})}
+    return pool
+
+def prewarm(engine: Engine, count: int) -> int:
+    """Opens connections ahead of the first requests, so that they don't wait for the connection handshakes.
+
+    Args:
+        engine (Engine): The database engine, in the process that will use it.
+        count (int): The number of connections, bounded by the size of a queue pool.
+
+    Returns:
+        int: The number of connections opened.
+    """
+    pool = engine.pool
+    if isinstance(pool, NullPool):
+        return 0  # Closes its connections when they are returned
+    count = min(count, pool.size() if isinstance(pool, QueuePool) else 1)
+
+    # Hold them all at once, otherwise the same connection is checked out every time
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(engine.raw_connection())
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+def get_stats(engine: Engine) -> dict[str, Any]:
+    """Returns the state of the pool of an engine and its checkout counters in this process.
+
+    Args:
+        engine (Engine): The database engine.
+
+    Returns:
+        dict[str, Any]: The pool class, its checked out connections, the size, idle and overflow connections
+            of queue pools and the counters of metered pools.
+    """
+    pool = engine.pool
+    stats: dict[str, Any] = {"pool": type(pool).__name__}
+    if hasattr(pool, "checkedout"):
+        stats["checked_out"] = pool.checkedout()
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), idle=pool.checkedin(), overflow=max(0, pool.overflow()))
+    if isinstance(pool, _MeteredPool):
+        stats.update(pool.stats.as_dict())
+    return stats
\ No newline at end of file
@@ -0,0 +1,19 @@
+from flask import current_app, request, has_request_context
+
+# Decorator to declare the user attributes a route needs, so that they are loaded along with the user
+def eager_load(*attributes: str):
+    def decorator(f):
+        f.eager_load = attributes
+        return f
+    return decorator
+
+def get_eager_load() -> tuple[str, ...]:
+    """Returns the user attributes declared by the route of the current request.
+
+    Returns:
+        tuple[str, ...]: The relationship and column names
+    """
+    if not has_request_context() or request.endpoint is None:
+        return ()
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, "eager_load", ())
\ No newline at end of file
@@ -0,0 +1,28 @@
+from .handshake_store import HandshakeStore, HandshakeState
+from .memory_handshake_store import MemoryHandshakeStore
+from .token_handshake_store import TokenHandshakeStore
+
+store: HandshakeStore = MemoryHandshakeStore()
+
+def init(backend: str, key: bytes, ttl_seconds: int = 60, max_entries: int = 10000) -> HandshakeStore:
+    """Selects the store of the SCRAM handshake states.
+
+    Args:
+        backend (str): "token" or "memory".
+        key (bytes): The key the "token" store derives its encryption key from.
+        ttl_seconds (int): The number of seconds a client has to complete the handshake.
+        max_entries (int): The capacity of the "memory" store.
+
+    Returns:
+        HandshakeStore: The selected store.
+    """
+    global store
+    if backend == "token":
+        store = TokenHandshakeStore(key, ttl_seconds)
+    elif backend == "memory":
+        store = MemoryHandshakeStore(ttl_seconds, max_entries)
+    else:
+        raise ValueError(f"Unknown handshake backend: {backend}")
+    return store
+
+__all__ = ["HandshakeStore", "HandshakeState", "MemoryHandshakeStore", "TokenHandshakeStore", "store", "init"]
\ No newline at end of file
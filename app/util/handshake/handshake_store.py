@@ -0,0 +1,56 @@
+import msgspec
+from abc import ABC, abstractmethod
+
+class HandshakeState(msgspec.Struct, array_like=True):
+    """The state kept between the two steps of a SCRAM login.
+    
+    The server side of the handshake is replayed from it in step 2: a server created with the same
+    nonce and fed the same client first message computes the same server first message, salt and
+    iteration count, and so the same auth message.
+    """
+    email: str
+    client_first: str
+    s_nonce: str
+
+class HandshakeStore(ABC):
+    """Keeps SCRAM handshake states between login step 1 and step 2, keyed by a handshake ID."""
+    
+    name: str
+    
+    def __init__(self, ttl_seconds: int = 60):
+        self.ttl_seconds = ttl_seconds
+    
+    @staticmethod
+    def encode(state: HandshakeState) -> bytes:
+        return msgspec.msgpack.encode(state)
+    
+    @staticmethod
+    def decode(data: bytes) -> HandshakeState | None:
+        try:
+            return msgspec.msgpack.decode(data, type=HandshakeState)
+        except msgspec.DecodeError:
+            return None
+    
+    @abstractmethod
+    def save(self, state: HandshakeState) -> str:
+        """Stores a handshake state.
+
+        Args:
+            state (HandshakeState): The state after login step 1.
+
+        Returns:
+            str: The handshake ID, returned to the client.
+        """
+        pass
+    
+    @abstractmethod
+    def load(self, handshake_id: str) -> HandshakeState | None:
+        """Retrieves a handshake state.
+
+        Args:
+            handshake_id (str): The handshake ID sent by the client.
+
+        Returns:
+            HandshakeState: The state, or None if it is unknown, expired or was already used.
+        """
+        pass
\ No newline at end of file
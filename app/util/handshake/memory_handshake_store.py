@@ -0,0 +1,43 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
+from .handshake_store import HandshakeStore, HandshakeState
+
+class MemoryHandshakeStore(HandshakeStore):
+    """Keeps handshake states in a bounded in-process TTL store. States are single use.
+    
+    Since the states only live in the worker that handled step 1, step 2 must reach the same worker.
+    The oldest states are dropped when the store is full.
+    """
+    
+    name = "memory"
+    
+    def __init__(self, ttl_seconds: int = 60, max_entries: int = 10000):
+        super().__init__(ttl_seconds)
+        self.max_entries = max_entries
+        self._states: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()  # handshake_id -> (state, expires at)
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._states)
+    
+    def save(self, state: HandshakeState) -> str:
+        handshake_id = secrets.token_urlsafe(16)
+        now = time.monotonic()
+        with self._lock:
+            # States are inserted in expiry order, so the expired ones are at the front
+            while self._states and next(iter(self._states.values()))[1] < now:
+                self._states.popitem(last=False)
+            while len(self._states) >= self.max_entries:
+                self._states.popitem(last=False)
+            self._states[handshake_id] = (self.encode(state), now + self.ttl_seconds)
+        return handshake_id
+    
+    def load(self, handshake_id: str) -> HandshakeState | None:
+        with self._lock:
+            entry = self._states.pop(handshake_id, None)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return self.decode(entry[0])
\ No newline at end of file
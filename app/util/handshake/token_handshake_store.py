@@ -0,0 +1,36 @@
+from base64 import urlsafe_b64encode
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from .handshake_store import HandshakeStore, HandshakeState
+
+class TokenHandshakeStore(HandshakeStore):
+    """Sends handshake states to the client as encrypted, authenticated Fernet tokens.
+    
+    The states aren't stored on the server, so step 2 can be handled by any worker or node sharing the key.
+    Tokens are single use: the server nonce of a loaded token is recorded in the database (UsedHandshake)
+    until the token expires, and a token whose nonce was already recorded is rejected.
+    """
+    
+    name = "token"
+    
+    def __init__(self, key: bytes, ttl_seconds: int = 60):
+        super().__init__(ttl_seconds)
+        hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b"vaultberry-scram-handshake")
+        self._fernet = Fernet(urlsafe_b64encode(hkdf.derive(key)))
+    
+    def save(self, state: HandshakeState) -> str:
+        return self._fernet.encrypt(self.encode(state)).decode()
+    
+    def load(self, handshake_id: str) -> HandshakeState | None:
+        try:
+            token = handshake_id.encode()
+            data = self._fernet.decrypt(token, ttl=self.ttl_seconds)
+            expires_at = self._fernet.extract_timestamp(token) + self.ttl_seconds
+        except InvalidToken:
+            return None
+        state = self.decode(data)
+        from app.models import UsedHandshake
+        if state is None or not UsedHandshake.consume(state.s_nonce, expires_at):
+            return None
+        return state
\ No newline at end of file
@@ -7,4 +7,6 @@ class ErrorCode(enum.IntEnum):
     FORBIDDEN = 403
     NOT_FOUND = 404
     CONFLICT = 409
-    INTERNAL_SERVER_ERROR = 500
\ No newline at end of file
+    TOO_MANY_REQUESTS = 429
+    INTERNAL_SERVER_ERROR = 500
+    SERVICE_UNAVAILABLE = 503
\ No newline at end of file
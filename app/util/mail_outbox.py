@@ -0,0 +1,110 @@
+import os
+import threading
+from flask import Flask, current_app
+from flask_mail import Connection
+from app import db, mail
+
+_wakeup = threading.Event()
+_thread: threading.Thread | None = None
+_thread_pid: int | None = None
+_thread_lock = threading.Lock()
+
+def _close(connection: Connection | None):
+    if connection is None:
+        return
+    try:
+        connection.__exit__(None, None, None)
+    except Exception:
+        pass  # The connection is already broken
+
+def send_pending(batch_size: int = 50, max_attempts: int = 8, backoff_seconds: int = 30) -> tuple[int, int]:
+    """Sends the due outbox mails in batches over one reused SMTP connection, until none are left.
+    
+    A failed mail is retried with exponential backoff. If the SMTP server can't be reached, the
+    rest of the batch is rescheduled and the drain stops.
+
+    Args:
+        batch_size (int): The number of mails sent per transaction.
+        max_attempts (int): The number of attempts before a mail is given up on.
+        backoff_seconds (int): The delay before the first retry of a mail.
+
+    Returns:
+        (int, int): The number of sent and failed mails.
+    """
+    from app.models import OutboxMail
+    sent, failed = 0, 0
+    connection: Connection | None = None
+    try:
+        while True:
+            mails = OutboxMail.get_due(batch_size, max_attempts)
+            if not mails:
+                db.session.commit()  # Release the locks
+                return sent, failed
+            for i, outbox_mail in enumerate(mails):
+                if connection is None:
+                    try:
+                        connection = mail.connect()
+                        connection.__enter__()
+                    except Exception as e:
+                        connection = None
+                        current_app.logger.warning(f"Could not connect to the SMTP server. Error: {e}")
+                        for unsent_mail in mails[i:]:
+                            unsent_mail.mark_failed(f"Connection failed: {e}", backoff_seconds)
+                        db.session.commit()
+                        return sent, failed + len(mails) - i
+                try:
+                    connection.send(outbox_mail.to_message())
+                    outbox_mail.mark_sent()
+                    sent += 1
+                except Exception as e:
+                    current_app.logger.warning(f"Could not send outbox mail ID: {outbox_mail.id}. Error: {e}")
+                    outbox_mail.mark_failed(str(e), backoff_seconds)
+                    failed += 1
+                    _close(connection)  # Reconnect in case the connection is broken
+                    connection = None
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        _close(connection)
+
+def send_pending_from_config() -> tuple[int, int]:
+    """Runs send_pending with the MAIL_OUTBOX_* config of the current app."""
+    return send_pending(
+        current_app.config.get("MAIL_OUTBOX_BATCH_SIZE", 50),
+        current_app.config.get("MAIL_OUTBOX_MAX_ATTEMPTS", 8),
+        current_app.config.get("MAIL_OUTBOX_BACKOFF_SECONDS", 30)
+    )
+
+def _run_sender(app: Flask):
+    poll_seconds = app.config.get("MAIL_OUTBOX_POLL_SECONDS", 10)
+    while True:
+        _wakeup.wait(poll_seconds)
+        _wakeup.clear()
+        with app.app_context():
+            try:
+                sent, failed = send_pending_from_config()
+                if sent or failed:
+                    app.logger.info(f"Outbox sender sent {sent} mails, {failed} failed")
+            except Exception as e:
+                app.logger.error(f"Outbox sender failed. Error: {e}", exc_info=True)
+            finally:
+                db.session.remove()
+
+def notify():
+    """Wakes up the outbox sender thread of this process, starting it if needed.
+    
+    Does nothing unless MAIL_OUTBOX_SENDER is "thread". With "worker", the outbox is drained
+    by the separate `flask outbox worker` process instead.
+    """
+    global _thread, _thread_pid
+    if current_app.config.get("MAIL_OUTBOX_SENDER", "thread") != "thread":
+        return
+    with _thread_lock:
+        # Threads don't survive a fork, so every worker process starts its own
+        if _thread is None or _thread_pid != os.getpid() or not _thread.is_alive():
+            _thread = threading.Thread(target=_run_sender, args=(current_app._get_current_object(),), name="outbox-sender", daemon=True)
+            _thread_pid = os.getpid()
+            _thread.start()
+    _wakeup.set()
\ No newline at end of file
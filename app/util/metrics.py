@@ -0,0 +1,121 @@
+import os
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from functools import wraps
+from flask import Response, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from sqlalchemy.engine import Engine
+from . import query_counter, db_pool
+
+# Crypto ranges from microseconds (Fernet) to hundreds of milliseconds (password hashing)
+CRYPTO_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+request_duration = Histogram(
+    "vaultberry_request_duration_seconds", "Time spent handling requests",
+    ["blueprint", "route", "method"]
+)
+requests_total = Counter(
+    "vaultberry_requests", "Responses by status code",
+    ["blueprint", "route", "method", "status"]
+)
+request_queries = Histogram(
+    "vaultberry_request_db_queries", "Database queries per request",
+    ["blueprint", "route"], buckets=QUERY_COUNT_BUCKETS
+)
+request_query_duration = Histogram(
+    "vaultberry_request_db_duration_seconds", "Time spent executing database queries per request",
+    ["blueprint", "route"]
+)
+crypto_duration = Histogram(
+    "vaultberry_crypto_duration_seconds", "Time spent in crypto operations, including the wait for the crypto pool",
+    ["operation"], buckets=CRYPTO_BUCKETS
+)
+# Summed over the live worker processes
+db_pool_connections = Gauge(
+    "vaultberry_db_pool_connections", "Connections of the database pools by state: checked_out, idle or overflow",
+    ["bind", "state"], multiprocess_mode="livesum"
+)
+db_pool_size = Gauge(
+    "vaultberry_db_pool_size", "Connections the database pools keep open",
+    ["bind"], multiprocess_mode="livesum"
+)
+
+def is_multiprocess() -> bool:
+    """Returns True if the metrics are shared by the worker processes, through the files in PROMETHEUS_MULTIPROC_DIR."""
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+def export() -> tuple[bytes, str]:
+    """Renders the metrics of all the worker processes in the Prometheus text format.
+
+    Returns:
+        tuple[bytes, str]: The metrics and their content type.
+    """
+    registry = REGISTRY
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+@contextmanager
+def timer(operation: str):
+    """Observes the duration of the block as a crypto operation."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        crypto_duration.labels(operation).observe(time.perf_counter() - start)
+
+def timed(operation: str):
+    """Observes the duration of every call of the decorated function as a crypto operation."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            with timer(operation):
+                return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+def time_future(operation: str, future: Future) -> Future:
+    """Observes the time until a crypto pool future completes as a crypto operation.
+
+    Returns:
+        Future: The future.
+    """
+    start = time.perf_counter()
+    future.add_done_callback(lambda _: crypto_duration.labels(operation).observe(time.perf_counter() - start))
+    return future
+
+def observe_pools(engines: dict[str | None, Engine]):
+    """Sets the pool gauges of each database bind from the state of its pool in this process.
+
+    Args:
+        engines (dict[str | None, Engine]): The engines by bind key, None for the primary database.
+    """
+    for bind, engine in engines.items():
+        stats = db_pool.get_stats(engine)
+        bind = bind or "primary"
+        for state in ("checked_out", "idle", "overflow"):
+            if state in stats:
+                db_pool_connections.labels(bind, state).set(stats[state])
+        if "size" in stats:
+            db_pool_size.labels(bind).set(stats["size"])
+
+def start_request():
+    g.metrics_start = time.perf_counter()
+
+def observe_request(response: Response) -> Response:
+    """Observes the latency, status and database queries of the request, by blueprint and route."""
+    start = g.get("metrics_start")
+    if start is None:
+        return response
+    blueprint = request.blueprint or "app"
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    request_duration.labels(blueprint, route, request.method).observe(time.perf_counter() - start)
+    requests_total.labels(blueprint, route, request.method, str(response.status_code)).inc()
+    request_queries.labels(blueprint, route).observe(query_counter.get_count())
+    request_query_duration.labels(blueprint, route).observe(query_counter.get_duration())
+    from app import db
+    observe_pools(db.engines)
+    return response
\ No newline at end of file
@@ -0,0 +1,40 @@
+import time
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get("query_count", 0) + 1
+        conn.info["query_start"] = time.perf_counter()
+
+def _time_query(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("query_start", None)
+    if start is not None and has_request_context():
+        g.query_seconds = g.get("query_seconds", 0.0) + time.perf_counter() - start
+
+def init(engine: Engine):
+    """Counts and times the queries executed on the engine during each request.
+
+    Args:
+        engine (Engine): The database engine
+    """
+    if not event.contains(engine, "before_cursor_execute", _count_query):
+        event.listen(engine, "before_cursor_execute", _count_query)
+        event.listen(engine, "after_cursor_execute", _time_query)
+
+def get_count() -> int:
+    """Returns the number of queries executed so far during the current request.
+
+    Returns:
+        int: The query count
+    """
+    return g.get("query_count", 0) if has_request_context() else 0
+
+def get_duration() -> float:
+    """Returns the time spent executing the queries of the current request so far.
+
+    Returns:
+        float: The query time, in seconds
+    """
+    return g.get("query_seconds", 0.0) if has_request_context() else 0.0
\ No newline at end of file
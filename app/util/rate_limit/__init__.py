@@ -0,0 +1,117 @@
+import math
+from functools import wraps
+from typing import Any, Callable
+from flask import current_app, jsonify, request, session
+from app.util.http import RouteError, ErrorCode
+from .rate_limiter import RateLimiter
+from .memory_rate_limiter import MemoryRateLimiter
+from .redis_rate_limiter import RedisRateLimiter
+
+limiter: RateLimiter | None = None
+
+class RateLimited(RouteError):
+    """Raised when a bucket of a rate limit is empty."""
+    
+    def __init__(self, retry_after: float):
+        self.retry_after = max(1, math.ceil(retry_after))
+        hours, rest = divmod(self.retry_after, 3600)
+        minutes, seconds = divmod(rest, 60)
+        super().__init__(f"Too many requests. Please try again in {hours} hours, {minutes} minutes, and {seconds} seconds.", ErrorCode.TOO_MANY_REQUESTS)
+
+def init(backend: str, redis_url: str | None = None, max_entries: int = 100000, redis_backoff_seconds: float = 30) -> RateLimiter | None:
+    """Selects the store of the rate limit buckets.
+
+    Args:
+        backend (str): "memory" (per worker), "redis" (shared) or "none" to disable rate limiting.
+        redis_url (str | None): The URL of the "redis" store.
+        max_entries (int): The number of buckets kept in memory, by the "memory" store or the local stand-in of the "redis" store.
+        redis_backoff_seconds (float): The number of seconds the "redis" store is skipped for after a failure.
+
+    Returns:
+        RateLimiter | None: The selected store, None if rate limiting is disabled.
+    """
+    global limiter
+    if backend == "memory":
+        limiter = MemoryRateLimiter(max_entries)
+    elif backend == "redis":
+        limiter = RedisRateLimiter(redis_url, max_entries=max_entries, backoff_seconds=redis_backoff_seconds)
+    elif backend == "none":
+        limiter = None
+    else:
+        raise ValueError(f"Unknown rate limit backend: {backend}")
+    return limiter
+
+def is_per_worker() -> bool:
+    """Returns True if every worker keeps its own buckets, so a client can get a bucket per worker."""
+    return limiter is not None and not limiter.shared
+
+def get_interval_seconds(name: str, scope: str) -> float:
+    """Returns the number of seconds it takes a bucket of a rate limit to refill one token, 0 if it has no such bucket.
+
+    Args:
+        name (str): The name of the rate limit, e.g. "recovery_email".
+        scope (str): "ip" or "account".
+    """
+    rule = current_app.config.get("RATE_LIMITS", {}).get(name, {}).get(scope)
+    if rule is None:
+        return 0
+    capacity, period_seconds = rule
+    return period_seconds / capacity
+
+def check(name: str, account: Any = None):
+    """Takes a token from the client and account buckets of a rate limit from the RATE_LIMITS config.
+
+    Args:
+        name (str): The name of the rate limit, e.g. "login".
+        account (Any): The account key, e.g. the user ID or email. Only the client bucket is used if None.
+
+    Raises:
+        RateLimited: A bucket is empty.
+    """
+    if limiter is None:
+        return
+    rules = current_app.config.get("RATE_LIMITS", {}).get(name, {})
+    keys = {"ip": request.remote_addr}
+    if account is not None:
+        keys["account"] = str(account).lower()
+    retry_after = 0.0
+    for scope, key in keys.items():
+        if scope in rules:
+            capacity, period_seconds = rules[scope]
+            retry_after = max(retry_after, limiter.acquire(f"{name}:{scope}:{key}", capacity, period_seconds))
+    if retry_after > 0:
+        raise RateLimited(retry_after)
+
+def limit(name: str, account: Callable[[], Any] | None = None):
+    """Decorator that rejects requests over a rate limit with 429 and Retry-After, before the route runs.
+
+    Args:
+        name (str): The name of the rate limit in the RATE_LIMITS config.
+        account (Callable[[], Any] | None): Returns the account key of the request, e.g. the email from the body.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            try:
+                check(name, account() if account is not None else None)
+            except RateLimited as e:
+                current_app.logger.warning(f"Rate limit '{name}' exceeded by {request.remote_addr}. Retry after: {e.retry_after}s")
+                return jsonify({"error": str(e)}), e.error_code.value, {"Retry-After": str(e.retry_after)}
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+def json_email() -> str | None:
+    """Returns the email from the JSON body of the request, as the account key."""
+    data = request.get_json(silent=True)
+    return data.get("email") if isinstance(data, dict) else None
+
+def args_email() -> str | None:
+    """Returns the email from the query string of the request, as the account key."""
+    return request.args.get("email")
+
+def session_user_id() -> str | None:
+    """Returns the ID of the logged in user from the session, as the account key, without loading the user."""
+    return session.get("_user_id")
+
+__all__ = ["RateLimiter", "MemoryRateLimiter", "RedisRateLimiter", "RateLimited", "limiter", "init", "is_per_worker", "get_interval_seconds", "check", "limit", "json_email", "args_email", "session_user_id"]
\ No newline at end of file
@@ -0,0 +1,39 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
+from .rate_limiter import RateLimiter
+
+class MemoryRateLimiter(RateLimiter):
+    """Keeps the buckets in a bounded in-process store.
+    
+    Every worker counts on its own, so the effective limits are multiplied by the number of workers and reset
+    on restarts. When the store is full, the least recently used buckets are dropped.
+    """
+    
+    name = "memory"
+    shared = False
+    
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated at)
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._buckets)
+    
+    def acquire(self, key: str, capacity: int, period_seconds: float) -> float:
+        rate = capacity / period_seconds
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            retry_after = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        return retry_after
\ No newline at end of file
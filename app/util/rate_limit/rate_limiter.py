@@ -0,0 +1,25 @@
+from abc import ABC, abstractmethod
+
+class RateLimiter(ABC):
+    """Token buckets keyed by client or account.
+    
+    A bucket starts full with `capacity` tokens and refills at `capacity` tokens per `period_seconds`,
+    so it allows bursts of up to `capacity` requests and `capacity` requests per period on average.
+    """
+    
+    name: str
+    shared: bool  # True if all the workers and hosts share the buckets
+    
+    @abstractmethod
+    def acquire(self, key: str, capacity: int, period_seconds: float) -> float:
+        """Takes a token from the bucket of a key.
+
+        Args:
+            key (str): The bucket key, e.g. "login:ip:127.0.0.1".
+            capacity (int): The size of the bucket.
+            period_seconds (float): The number of seconds it takes to refill an empty bucket.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the number of seconds until one is available.
+        """
+        pass
\ No newline at end of file
@@ -0,0 +1,55 @@
+import time
+from flask import current_app
+from .rate_limiter import RateLimiter
+from .memory_rate_limiter import MemoryRateLimiter
+
+# Refills and takes a token atomically, on the clock of the Redis server
+_ACQUIRE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated_at")
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated_at", tostring(now))
+redis.call("PEXPIRE", KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(retry_after)
+"""
+
+class RedisRateLimiter(RateLimiter):
+    """Keeps the buckets in a Redis-compatible store shared by all workers and hosts.
+    
+    If the store can't be reached, the buckets fall back to a local in-process stand-in, so an outage relaxes
+    the limits to per-worker ones instead of rejecting or allowing everything. After a failure the store is
+    left alone for `backoff_seconds`, so an outage doesn't add a timeout to every rate limited request.
+    """
+    
+    name = "redis"
+    shared = True
+    
+    def __init__(self, url: str, prefix: str = "vaultberry:rate_limit:", max_entries: int = 100000, backoff_seconds: float = 30):
+        import redis  # Optional dependency, only required by this backend
+        self.prefix = prefix
+        self.backoff_seconds = backoff_seconds
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._script = self._client.register_script(_ACQUIRE_SCRIPT)
+        self._fallback = MemoryRateLimiter(max_entries)
+        self._skip_until = 0.0  # Monotonic time until which the store is not tried
+    
+    def acquire(self, key: str, capacity: int, period_seconds: float) -> float:
+        if time.monotonic() < self._skip_until:
+            return self._fallback.acquire(key, capacity, period_seconds)
+        try:
+            return float(self._script(keys=[self.prefix + key], args=[capacity, capacity / period_seconds]))
+        except Exception as e:
+            self._skip_until = time.monotonic() + self.backoff_seconds
+            current_app.logger.warning(f"Rate limit store unavailable, using the local buckets for {self.backoff_seconds}s. Error: {e}")
+            return self._fallback.acquire(key, capacity, period_seconds)
\ No newline at end of file
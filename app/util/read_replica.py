@@ -0,0 +1,77 @@
+from functools import wraps
+from flask import Flask, Response, current_app, g, request
+from app.routing_session import REPLICA_BIND
+from .time import get_now_timestamp
+
+# Set on the responses of requests that wrote, holding the time until which the client reads from the primary
+PIN_COOKIE = "read_primary_until"
+
+# Sent by clients that need the primary for a request, e.g. after a write through another session
+PIN_HEADER = "X-Read-From"
+
+def configure(app: Flask) -> bool:
+    """Adds the read replica at REPLICA_DATABASE_URI to the binds, before Flask-SQLAlchemy creates the engines.
+
+    Args:
+        app (Flask): The app, with the REPLICA_DATABASE_URI config set.
+
+    Returns:
+        bool: True if a replica is configured.
+    """
+    url = app.config.get("REPLICA_DATABASE_URI")
+    if not url:
+        return False
+    app.config["SQLALCHEMY_BINDS"] = {**app.config.get("SQLALCHEMY_BINDS", {}), REPLICA_BIND: url}
+    return True
+
+def _is_pinned() -> bool:
+    if request.headers.get(PIN_HEADER, "").lower() == "primary":
+        return True
+    try:
+        return int(request.cookies.get(PIN_COOKIE, 0)) > get_now_timestamp()
+    except ValueError:
+        return False
+
+def select_reads():
+    """Reads GET and HEAD requests from the replica, unless the client wrote recently or asks for the primary."""
+    g.db_reads = REPLICA_BIND if request.method in ("GET", "HEAD") and not _is_pinned() else "primary"
+
+def use_replica(f):
+    """Reads the route from the replica regardless of its method, unless the client is pinned to the primary.
+
+    For routes that only read, like the SCRAM lookup of the first login step.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.db_reads = "primary" if _is_pinned() else REPLICA_BIND
+        return f(*args, **kwargs)
+    return decorated_function
+
+def use_primary(f):
+    """Reads the route from the primary regardless of its method.
+
+    For GET routes that write, or that must not miss a write, like the sync changes.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.db_reads = "primary"
+        return f(*args, **kwargs)
+    return decorated_function
+
+def pin_after_writes(response: Response) -> Response:
+    """Pins the reads of a client to the primary for READ_YOUR_WRITES_SECONDS after a request that committed a write.
+
+    Also returns the rest of the request to the primary, since the session backend reads the session it is about to write.
+    """
+    g.db_reads = "primary"
+    if g.get("db_committed_writes", False):
+        seconds = current_app.config.get("READ_YOUR_WRITES_SECONDS", 10)
+        response.set_cookie(
+            PIN_COOKIE,
+            str(get_now_timestamp() + seconds),
+            max_age=seconds,
+            secure=current_app.config.get("SESSION_COOKIE_SECURE", True),
+            httponly=True,
+            samesite=current_app.config.get("SESSION_COOKIE_SAMESITE", "Strict")
+        )
+    return response
\ No newline at end of file
@@ -0,0 +1,101 @@
+import threading
+import time
+import datetime
+from flask import Flask, current_app
+from sqlalchemy import Table, ColumnElement, select, delete, inspect, table, column, DateTime, Integer
+from app import db
+
+def delete_in_batches(target: Table, key: ColumnElement, condition: ColumnElement, batch_size: int = 500) -> int:
+    """Deletes the matching rows in small batches, walking the key in order.
+    
+    Every batch is committed separately, so locks are only held briefly on a busy database.
+
+    Args:
+        target (Table): The table to delete from.
+        key (ColumnElement): An indexed column of the table, usually the primary key. If it isn't unique,
+            a batch deletes all the matching rows of its keys.
+        condition (ColumnElement): Selects the rows to delete.
+        batch_size (int): The number of rows deleted per transaction.
+
+    Returns:
+        int: The number of deleted rows.
+    """
+    deleted, last_key = 0, None
+    while True:
+        query = select(key).where(condition).order_by(key).limit(batch_size)
+        if last_key is not None:
+            query = query.where(key > last_key)
+        keys = db.session.scalars(query).all()
+        if not keys:
+            return deleted
+        deleted += db.session.execute(delete(target).where(key.in_(keys), condition)).rowcount
+        db.session.commit()
+        last_key = keys[-1]
+
+def purge_expired_sessions(batch_size: int = 500) -> int:
+    """Deletes the expired server-side sessions, if they are stored in the database.
+
+    Returns:
+        int: The number of deleted sessions.
+    """
+    table_name = current_app.config.get("SESSION_SQLALCHEMY_TABLE", "sessions")
+    if not inspect(db.engine).has_table(table_name):
+        return 0
+    sessions = table(table_name, column("id", Integer), column("expiry", DateTime))
+    # Flask-Session stores naive UTC expiry times
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    return delete_in_batches(sessions, sessions.c.id, sessions.c.expiry <= now, batch_size)
+
+def purge_all() -> dict[str, tuple[int, float]]:
+    """Runs every purge with the RETENTION_* config of the current app.
+
+    Returns:
+        dict[str, tuple[int, float]]: The number of deleted rows and the duration in seconds, by table.
+    """
+    from app.models import OneTimePassword, OutboxMail, VaultTombstone, ReencryptionJob, UsedHandshake
+    batch_size = current_app.config.get("RETENTION_BATCH_SIZE", 500)
+    purges = {
+        "otps": lambda: OneTimePassword.purge_expired(current_app.config.get("OTP_RETENTION_SECONDS", 24*60*60), batch_size),
+        "sessions": lambda: purge_expired_sessions(batch_size),
+        "mail_outbox": lambda: OutboxMail.purge_done(
+            current_app.config.get("MAIL_OUTBOX_RETENTION_SECONDS", 7*24*60*60),
+            current_app.config.get("MAIL_OUTBOX_MAX_ATTEMPTS", 8),
+            batch_size
+        ),
+        "vault_tombstones": lambda: VaultTombstone.purge_expired(
+            current_app.config.get("VAULT_TOMBSTONE_RETENTION_SECONDS", 30*24*60*60),
+            batch_size
+        ),
+        "reencryption_jobs": lambda: ReencryptionJob.purge_expired(batch_size),
+        "used_handshakes": lambda: UsedHandshake.purge_expired(batch_size),
+    }
+    results = {}
+    for name, purge in purges.items():
+        start = time.perf_counter()
+        deleted = purge()
+        results[name] = (deleted, time.perf_counter() - start)
+        current_app.logger.info(f"Purged {deleted} rows from {name} in {results[name][1]:.3f}s")
+    return results
+
+def _run_scheduler(app: Flask, interval_seconds: int):
+    while True:
+        time.sleep(interval_seconds)
+        with app.app_context():
+            try:
+                purge_all()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"Scheduled purge failed. Error: {e}", exc_info=True)
+            finally:
+                db.session.remove()
+
+def start_scheduler(app: Flask, interval_seconds: int) -> threading.Thread:
+    """Runs purge_all in a background thread of this process every interval.
+
+    Args:
+        app (Flask): The app.
+        interval_seconds (int): The number of seconds between purges.
+    """
+    thread = threading.Thread(target=_run_scheduler, args=(app, interval_seconds), name="retention-scheduler", daemon=True)
+    thread.start()
+    return thread
\ No newline at end of file
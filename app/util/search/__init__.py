@@ -0,0 +1,38 @@
+from sqlalchemy import Engine
+from .search_engine import SearchEngine
+from .like_search_engine import LikeSearchEngine
+from .fts_search_engine import FtsSearchEngine
+from .trigram_search_engine import TrigramSearchEngine
+from .ngram_index import NgramIndex
+from .memory_search_engine import MemorySearchEngine
+
+engine: SearchEngine = LikeSearchEngine()
+
+def init(db_engine: Engine, backend: str = "auto", memory_index_max_bytes: int = 64 * 1024 * 1024, memory_index_ttl_seconds: int = 30) -> SearchEngine:
+    """Selects the search engine for the database and creates the objects it requires.
+
+    Args:
+        db_engine (Engine): The SQLAlchemy engine.
+        backend (str): "like", "fts", "trigram", "memory" or "auto" to pick the best available database engine.
+        memory_index_max_bytes (int): The memory cap of the "memory" engine, across all users.
+        memory_index_ttl_seconds (int): The number of seconds a user's in-memory index is used before being rebuilt.
+
+    Returns:
+        SearchEngine: The selected engine.
+    """
+    global engine
+    candidates = {
+        "auto": [TrigramSearchEngine(), FtsSearchEngine(), LikeSearchEngine()],
+        "like": [LikeSearchEngine()],
+        "fts": [FtsSearchEngine(), LikeSearchEngine()],
+        "trigram": [TrigramSearchEngine(), LikeSearchEngine()],
+        "memory": [MemorySearchEngine(memory_index_max_bytes, memory_index_ttl_seconds)]
+    }
+    if backend not in candidates:
+        raise ValueError(f"Unknown search backend: {backend}")
+    with db_engine.begin() as connection:
+        engine = next(candidate for candidate in candidates[backend] if candidate.is_available(connection))
+        engine.setup(connection)
+    return engine
+
+__all__ = ["SearchEngine", "LikeSearchEngine", "FtsSearchEngine", "TrigramSearchEngine", "NgramIndex", "MemorySearchEngine", "engine", "init"]
\ No newline at end of file
@@ -0,0 +1,76 @@
+import sqlite3
+from sqlalchemy import Connection, select, text
+from sqlalchemy.orm import Session
+from typing import List
+from app import db
+from .search_engine import SearchEngine
+from .like_search_engine import LikeSearchEngine
+
+class FtsSearchEngine(SearchEngine):
+    """SQLite FTS5 index over the entries table, using the trigram tokenizer for substring matches
+    and bm25 for ranking. Kept in sync by triggers.
+    """
+    
+    name = "fts"
+    
+    # The trigram tokenizer can't match keywords shorter than this
+    MIN_KEYWORD_LENGTH = 3
+    
+    SETUP_STATEMENTS = [
+        """CREATE TRIGGER IF NOT EXISTS entries_fts_ai AFTER INSERT ON entries BEGIN
+            INSERT INTO entries_fts(rowid, title, url, notes) VALUES (new.id, new.title, new.url, new.notes);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS entries_fts_ad AFTER DELETE ON entries BEGIN
+            INSERT INTO entries_fts(entries_fts, rowid, title, url, notes) VALUES ('delete', old.id, old.title, old.url, old.notes);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS entries_fts_au AFTER UPDATE OF title, url, notes ON entries BEGIN
+            INSERT INTO entries_fts(entries_fts, rowid, title, url, notes) VALUES ('delete', old.id, old.title, old.url, old.notes);
+            INSERT INTO entries_fts(rowid, title, url, notes) VALUES (new.id, new.title, new.url, new.notes);
+        END"""
+    ]
+    
+    def __init__(self):
+        self._fallback = LikeSearchEngine()
+    
+    def is_available(self, connection: Connection) -> bool:
+        if connection.dialect.name != "sqlite" or sqlite3.sqlite_version_info < (3, 34, 0):
+            return False
+        try:
+            connection.execute(text("CREATE VIRTUAL TABLE temp.fts_probe USING fts5(value, tokenize='trigram')"))
+            connection.execute(text("DROP TABLE temp.fts_probe"))
+            return True
+        except Exception:
+            return False
+    
+    def setup(self, connection: Connection):
+        exists = connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'entries_fts'")).first() is not None
+        if not exists:
+            connection.execute(text(
+                "CREATE VIRTUAL TABLE entries_fts USING fts5(title, url, notes, content='entries', content_rowid='id', tokenize='trigram')"
+            ))
+            # Index the existing entries
+            connection.execute(text("INSERT INTO entries_fts(entries_fts) VALUES ('rebuild')"))
+        for statement in self.SETUP_STATEMENTS:
+            connection.execute(text(statement))
+    
+    def search(self, user_id: int, keywords: List[str], limit: int | None = None, session: Session | None = None):
+        from app.models import VaultEntry
+        
+        if any(len(keyword) < self.MIN_KEYWORD_LENGTH for keyword in keywords):
+            return self._fallback.search(user_id, keywords, limit, session)
+        session = session or db.session
+        
+        # Quote every keyword so that it is matched as a plain substring
+        match_query = " OR ".join('"' + keyword.replace('"', '""') + '"' for keyword in keywords)
+        query = text(
+            "SELECT entries_fts.rowid FROM entries_fts JOIN entries ON entries.id = entries_fts.rowid "
+            "WHERE entries_fts MATCH :match_query AND entries.user_id = :user_id "
+            "ORDER BY bm25(entries_fts), entries_fts.rowid LIMIT :limit"
+        )
+        ids = list(session.scalars(query, {"match_query": match_query, "user_id": user_id, "limit": -1 if limit is None else limit}))
+        if not ids:
+            return []
+        
+        # Load the entries and keep the ranking order
+        entries = {entry.id: entry for entry in session.scalars(select(VaultEntry).where(VaultEntry.id.in_(ids)))}
+        return [entries[id].to_detailed_dict() for id in ids if id in entries]
\ No newline at end of file
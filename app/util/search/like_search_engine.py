@@ -0,0 +1,26 @@
+from sqlalchemy import select, or_
+from sqlalchemy.orm import Session
+from typing import List
+from app import db
+from .search_engine import SearchEngine
+
+class LikeSearchEngine(SearchEngine):
+    """Portable fallback that ORs an ILIKE condition per keyword and column. Cannot use B-tree indexes."""
+    
+    name = "like"
+    
+    def search(self, user_id: int, keywords: List[str], limit: int | None = None, session: Session | None = None):
+        from app.models import VaultEntry
+        
+        # Compute search conditions
+        search_conditions = []
+        for keyword in keywords:
+            search_term = self.escape_like(keyword)
+            search_conditions.append(VaultEntry.title.ilike(search_term, escape="\\"))
+            search_conditions.append(VaultEntry.url.ilike(search_term, escape="\\"))
+            search_conditions.append(VaultEntry.notes.ilike(search_term, escape="\\"))
+        
+        query = select(VaultEntry).where(VaultEntry.user_id == user_id, or_(*search_conditions)).order_by(VaultEntry.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return [entry.to_detailed_dict() for entry in (session or db.session).scalars(query)]
\ No newline at end of file
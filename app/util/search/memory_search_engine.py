@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import TYPE_CHECKING, List, Tuple
+from app import db
+from .search_engine import SearchEngine
+from .ngram_index import NgramIndex
+
+if TYPE_CHECKING:
+    from app.models import VaultEntry
+
+class MemorySearchEngine(SearchEngine):
+    """Serves searches from per-user in-process n-gram indexes.
+    
+    An index is built with one query on the first search of a user and then kept up to date by the
+    entry_saved/entry_deleted/invalidate hooks called by the routes of this worker. Since other workers
+    don't call the hooks, indexes are also rebuilt once they are older than the TTL. The least recently
+    used indexes are evicted when the total estimated size exceeds the memory cap.
+    """
+    
+    name = "memory"
+    
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: int = 30):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._indexes: "OrderedDict[int, Tuple[NgramIndex, float]]" = OrderedDict()  # user_id -> (index, built at)
+        self._size_bytes = 0
+        self._building: dict[int, bool] = {}  # user_id -> changed while building
+        self._lock = threading.Lock()
+    
+    @property
+    def size_bytes(self) -> int:
+        return self._size_bytes
+    
+    def _build(self, user_id: int, session: Session) -> NgramIndex:
+        from app.models import VaultEntry
+        index = NgramIndex()
+        for entry in session.scalars(select(VaultEntry).where(VaultEntry.user_id == user_id)):
+            index.add(entry.id, entry.title, entry.url, entry.notes, entry.to_detailed_dict())
+        return index
+    
+    def _get(self, user_id: int) -> NgramIndex | None:
+        """Returns the loaded, fresh index of a user and marks it as recently used. Must hold the lock."""
+        cached = self._indexes.get(user_id)
+        if cached is None:
+            return None
+        index, built_at = cached
+        if time.monotonic() - built_at > self.ttl_seconds:
+            self._discard(user_id)
+            return None
+        self._indexes.move_to_end(user_id)
+        return index
+    
+    def _discard(self, user_id: int):
+        """Drops the index of a user. Must hold the lock."""
+        cached = self._indexes.pop(user_id, None)
+        if cached is not None:
+            self._size_bytes -= cached[0].size_bytes
+    
+    def _evict(self):
+        """Evicts the least recently used indexes until the memory cap is respected. Must hold the lock."""
+        while self._size_bytes > self.max_bytes and self._indexes:
+            self._discard(next(iter(self._indexes)))
+    
+    def _track(self, index: NgramIndex, change):
+        """Applies a change to an index and updates the total size. Must hold the lock."""
+        before = index.size_bytes
+        change()
+        self._size_bytes += index.size_bytes - before
+        self._evict()
+    
+    def search(self, user_id: int, keywords: List[str], limit: int | None = None, session: Session | None = None) -> List[dict]:
+        with self._lock:
+            index = self._get(user_id)
+            if index is not None:
+                return index.search(keywords, limit)
+        
+        # Build outside of the lock, so that other users' searches aren't blocked
+        with self._lock:
+            self._building[user_id] = False
+        index = self._build(user_id, session or db.session)
+        results = index.search(keywords, limit)
+        with self._lock:
+            # Don't keep an index that missed a write committed while it was being built
+            changed = self._building.pop(user_id, True)
+            if not changed:
+                self._store(user_id, index)
+        return results
+    
+    def _store(self, user_id: int, index: NgramIndex):
+        """Keeps the index of a user, unless it exceeds the memory cap by itself. Must hold the lock."""
+        if index.size_bytes > self.max_bytes:
+            return
+        self._discard(user_id)
+        self._indexes[user_id] = (index, time.monotonic())
+        self._size_bytes += index.size_bytes
+        self._evict()
+    
+    def _mark_changed(self, user_id: int):
+        """Flags a build in progress for the user as outdated. Must hold the lock."""
+        if user_id in self._building:
+            self._building[user_id] = True
+    
+    def entry_saved(self, user_id: int, entry: "VaultEntry"):
+        if user_id not in self._indexes and user_id not in self._building:
+            return
+        values = (entry.id, entry.title, entry.url, entry.notes, entry.to_detailed_dict())
+        with self._lock:
+            self._mark_changed(user_id)
+            index = self._get(user_id)
+            if index is not None:
+                self._track(index, lambda: index.add(*values))
+    
+    def entry_deleted(self, user_id: int, entry_id: int):
+        with self._lock:
+            self._mark_changed(user_id)
+            index = self._get(user_id)
+            if index is not None:
+                self._track(index, lambda: index.remove(entry_id))
+    
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._mark_changed(user_id)
+            self._discard(user_id)
\ No newline at end of file
@@ -0,0 +1,97 @@
+import sys
+from typing import Dict, List, Set, Tuple
+
+class NgramIndex:
+    """In-memory n-gram posting lists over the title, url and notes of one user's entries.
+    
+    Matches have the same semantics as ILIKE '%keyword%': the postings only narrow down the
+    candidates, which are then checked with a plain substring test.
+    """
+    
+    N = 3
+    
+    # Rough per-item overheads used to estimate the memory footprint
+    POSTING_BYTES = 72
+    DOCUMENT_BYTES = 512
+    
+    def __init__(self):
+        self.documents: Dict[int, Tuple[Tuple[str, ...], dict]] = {}  # id -> (lowercase fields, detailed dict)
+        self.postings: Dict[str, Set[int]] = {}
+        self.size_bytes = 0
+    
+    @classmethod
+    def _ngrams(cls, value: str) -> Set[str]:
+        return {value[i:i + cls.N] for i in range(len(value) - cls.N + 1)}
+    
+    @staticmethod
+    def _estimate_bytes(fields: Tuple[str, ...], details: dict) -> int:
+        return sum(sys.getsizeof(value) for value in fields) + sum(sys.getsizeof(value) for value in details.values())
+    
+    def add(self, entry_id: int, title: str | None, url: str | None, notes: str | None, details: dict):
+        """Adds or replaces an entry.
+
+        Args:
+            entry_id (int): The ID of the entry.
+            title (str | None): The title.
+            url (str | None): The url.
+            notes (str | None): The notes.
+            details (dict): The detailed dictionary returned by searches.
+        """
+        self.remove(entry_id)
+        fields = tuple((value or "").lower() for value in (title, url, notes))
+        ngrams = set().union(*(self._ngrams(value) for value in fields))
+        for ngram in ngrams:
+            self.postings.setdefault(ngram, set()).add(entry_id)
+        self.documents[entry_id] = (fields, details)
+        self.size_bytes += self.DOCUMENT_BYTES + self._estimate_bytes(fields, details) + len(ngrams) * self.POSTING_BYTES
+        
+    def remove(self, entry_id: int):
+        """Removes an entry, if present.
+
+        Args:
+            entry_id (int): The ID of the entry.
+        """
+        document = self.documents.pop(entry_id, None)
+        if document is None:
+            return
+        fields, details = document
+        ngrams = set().union(*(self._ngrams(value) for value in fields))
+        for ngram in ngrams:
+            posting = self.postings.get(ngram)
+            if posting is not None:
+                posting.discard(entry_id)
+                if not posting:
+                    del self.postings[ngram]
+        self.size_bytes -= self.DOCUMENT_BYTES + self._estimate_bytes(fields, details) + len(ngrams) * self.POSTING_BYTES
+    
+    def _candidates(self, keyword: str) -> Set[int] | None:
+        """Returns the IDs of the entries that contain every n-gram of the keyword, or None if the keyword is too short."""
+        ngrams = self._ngrams(keyword)
+        if not ngrams:
+            return None
+        postings = sorted((self.postings.get(ngram, set()) for ngram in ngrams), key=len)
+        return set(postings[0]).intersection(*postings[1:])
+    
+    def search(self, keywords: List[str], limit: int | None = None) -> List[dict]:
+        """Finds the entries that contain any of the keywords.
+        Entries matching more keywords come first, then entries matching in the title.
+
+        Args:
+            keywords (List[str]): The keywords.
+            limit (int | None): The maximum number of results.
+
+        Returns:
+            List[dict]: The detailed dictionaries of the matching entries.
+        """
+        scores: Dict[int, Tuple[int, int]] = {}
+        for keyword in (keyword.lower() for keyword in keywords):
+            candidates = self._candidates(keyword)
+            for entry_id in (self.documents.keys() if candidates is None else candidates):
+                fields = self.documents[entry_id][0]
+                if any(keyword in value for value in fields):
+                    matches, title_matches = scores.get(entry_id, (0, 0))
+                    scores[entry_id] = (matches + 1, title_matches + (keyword in fields[0]))
+        ranked = sorted(scores, key=lambda entry_id: (-scores[entry_id][0], -scores[entry_id][1], entry_id))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self.documents[entry_id][1] for entry_id in ranked]
\ No newline at end of file
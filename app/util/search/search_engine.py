@@ -0,0 +1,77 @@
+from abc import ABC, abstractmethod
+from sqlalchemy import Connection
+from sqlalchemy.orm import Session
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    from app.models import VaultEntry
+
+class SearchEngine(ABC):
+    
+    name: str
+    
+    def is_available(self, connection: Connection) -> bool:
+        """Checks if the engine can be used with the given database connection.
+
+        Args:
+            connection (Connection): A connection to the database.
+
+        Returns:
+            bool: True if the engine is available, False otherwise.
+        """
+        return True
+    
+    def setup(self, connection: Connection):
+        """Creates the database objects required by the engine, if they don't exist.
+
+        Args:
+            connection (Connection): A connection to the database.
+        """
+        pass
+    
+    @abstractmethod
+    def search(self, user_id: int, keywords: List[str], limit: int | None = None, session: Session | None = None) -> List[dict]:
+        """Finds the vault entries of a user that contain any of the keywords in the title, url or notes.
+
+        Args:
+            user_id (int): The ID of the user.
+            keywords (List[str]): The keywords.
+            limit (int | None): The maximum number of results.
+            session (Session | None): The session to query with, db.session if None.
+
+        Returns:
+            List[dict]: The detailed dictionaries of the matching entries, best matches first.
+        """
+        pass
+    
+    def entry_saved(self, user_id: int, entry: "VaultEntry"):
+        """Called by the routes after an entry was added or updated and committed.
+
+        Args:
+            user_id (int): The ID of the user who owns the entry.
+            entry (VaultEntry): The entry.
+        """
+        pass
+    
+    def entry_deleted(self, user_id: int, entry_id: int):
+        """Called by the routes after an entry was deleted and the deletion committed.
+
+        Args:
+            user_id (int): The ID of the user who owned the entry.
+            entry_id (int): The ID of the entry.
+        """
+        pass
+    
+    def invalidate(self, user_id: int):
+        """Called by the routes after bulk changes to the entries of a user were committed.
+
+        Args:
+            user_id (int): The ID of the user.
+        """
+        pass
+    
+    @staticmethod
+    def escape_like(keyword: str) -> str:
+        """Escapes the LIKE wildcards in a keyword and wraps it for a substring match."""
+        escaped = keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return f"%{escaped}%"
\ No newline at end of file
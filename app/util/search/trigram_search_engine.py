@@ -0,0 +1,43 @@
+from sqlalchemy import Connection, select, text, or_, func
+from sqlalchemy.orm import Session
+from typing import List
+from app import db
+from .search_engine import SearchEngine
+
+class TrigramSearchEngine(SearchEngine):
+    """Postgres pg_trgm search. The ILIKE conditions are served by GIN trigram indexes
+    on title, url and notes, and the results are ranked by word similarity.
+    """
+    
+    name = "trigram"
+    
+    def is_available(self, connection: Connection) -> bool:
+        if connection.dialect.name != "postgresql":
+            return False
+        return connection.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+    
+    def search(self, user_id: int, keywords: List[str], limit: int | None = None, session: Session | None = None):
+        from app.models import VaultEntry
+        
+        search_conditions = []
+        scores = []
+        for keyword in keywords:
+            search_term = self.escape_like(keyword)
+            search_conditions.append(VaultEntry.title.ilike(search_term, escape="\\"))
+            search_conditions.append(VaultEntry.url.ilike(search_term, escape="\\"))
+            search_conditions.append(VaultEntry.notes.ilike(search_term, escape="\\"))
+            scores.append(func.greatest(
+                func.word_similarity(keyword, VaultEntry.title),
+                func.word_similarity(keyword, func.coalesce(VaultEntry.url, "")),
+                func.word_similarity(keyword, func.coalesce(VaultEntry.notes, ""))
+            ))
+        score = sum(scores[1:], scores[0])
+        
+        query = (
+            select(VaultEntry)
+            .where(VaultEntry.user_id == user_id, or_(*search_conditions))
+            .order_by(score.desc(), VaultEntry.id)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        return [entry.to_detailed_dict() for entry in (session or db.session).scalars(query)]
\ No newline at end of file
@@ -1,8 +1,14 @@
 from .crypto import fernet, kdf
 from .password_hasher import PasswordHasher
 from .token_generator import TokenGenerator
+from .secret_cache import SecretCache
+from .otp_hasher import OtpHasher
+from .crypto_pool import CryptoPool, CryptoPoolBusy, pool, make_scram_auth_info
+from . import calibration
 
 hasher = PasswordHasher()
 generator = TokenGenerator()
+secret_cache = SecretCache()
+otp_hasher = OtpHasher()
 
-__all__ = ["hasher", "generator", "fernet", "kdf"]
\ No newline at end of file
+__all__ = ["hasher", "generator", "fernet", "kdf", "secret_cache", "otp_hasher", "pool", "CryptoPool", "CryptoPoolBusy", "make_scram_auth_info", "calibration"]
\ No newline at end of file
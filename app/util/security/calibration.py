@@ -0,0 +1,58 @@
+import time
+import werkzeug.security as wz_security
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from scramp import ScramMechanism
+
+# Lower bounds, whatever the host
+MIN_KDF_ITERATIONS = 100000
+MIN_SCRAM_ITERATIONS = 4096  # RFC 7677
+MIN_SCRYPT_N = 2 ** 14
+MAX_SCRYPT_N = 2 ** 20  # 1 GiB of memory per hash with r = 8
+
+def _measure(fn, *args, repeat: int = 3) -> float:
+    """Returns the best time of a few runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _scale_iterations(measure, probe_iterations: int, target_seconds: float, minimum: int) -> int:
+    """Scales a probe iteration count linearly to the target time, rounded to a thousand."""
+    elapsed = measure(probe_iterations)
+    iterations = int(probe_iterations * target_seconds / elapsed) // 1000 * 1000
+    return max(iterations, minimum)
+
+def calibrate_kdf(target_seconds: float) -> int:
+    """Returns the PBKDF2-SHA256 iteration count of KdfHandler that takes about the target time."""
+    def measure(iterations):
+        return _measure(lambda: PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=b"0" * 16, iterations=iterations).derive(b"password"))
+    return _scale_iterations(measure, 50000, target_seconds, MIN_KDF_ITERATIONS)
+
+def calibrate_scram(target_seconds: float, mechanism: str = "SCRAM-SHA-256") -> int:
+    """Returns the SCRAM iteration count that takes about the target time.
+    
+    Clients derive the salted password with the same count on every login, so the target should
+    account for the slowest supported client, not only this host.
+    """
+    def measure(iterations):
+        return _measure(ScramMechanism(mechanism).make_auth_info, "password", iterations)
+    return _scale_iterations(measure, 20000, target_seconds, MIN_SCRAM_ITERATIONS)
+
+def calibrate_password_hash(target_seconds: float, family: str = "scrypt") -> str:
+    """Returns the werkzeug hash method of PasswordHasher that takes about the target time.
+    
+    For scrypt, the cost N is doubled until the target is reached, keeping r = 8 and p = 1.
+    """
+    if family == "pbkdf2":
+        def measure(iterations):
+            return _measure(wz_security.generate_password_hash, "password", f"pbkdf2:sha256:{iterations}")
+        return f"pbkdf2:sha256:{_scale_iterations(measure, 50000, target_seconds, MIN_KDF_ITERATIONS)}"
+    if family != "scrypt":
+        raise ValueError(f"Unknown password hash family: {family}")
+    n = MIN_SCRYPT_N
+    while n < MAX_SCRYPT_N and _measure(wz_security.generate_password_hash, "password", f"scrypt:{n}:8:1", repeat=1) < target_seconds:
+        n *= 2
+    return f"scrypt:{n}:8:1"
\ No newline at end of file
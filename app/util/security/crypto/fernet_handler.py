@@ -1,4 +1,5 @@
 from cryptography.fernet import Fernet
+from app.util.metrics import timed
 from .crypto_handler import CryptoHandler
 
 class FernetHandler(CryptoHandler):
@@ -15,11 +16,13 @@ class FernetHandler(CryptoHandler):
         super().init(key)
         self._fernet = Fernet(key)
     
+    @timed("fernet_encrypt")
     def encrypt(self, data: bytes) -> bytes:
         if not self.is_initialized:
             raise ValueError("CryptoHandler is not initialized")
         return self._fernet.encrypt(data)
     
+    @timed("fernet_decrypt")
     def decrypt(self, encrypted_data: bytes) -> bytes:
         if not self.is_initialized:
             raise ValueError("CryptoHandler is not initialized")
@@ -1,6 +1,18 @@
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
+from app.util.metrics import timed
+from ..crypto_pool import pool
+
+def _pbkdf2(password: bytes, salt: bytes, iterations: int) -> bytes:
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        iterations=iterations,
+        backend=default_backend()
+    )
+    return kdf.derive(password)
 
 class KdfHandler:
     
@@ -17,6 +29,7 @@ class KdfHandler:
         self.iterations = iterations
         self.is_initialized = True
         
+    @timed("kdf_derive")
     def derive_key(self, password: bytes, salt: bytes) -> bytes:
         """Derives a key from the password and salt using PBKDF2.
 
@@ -34,12 +47,4 @@ class KdfHandler:
         if salt is not None and not isinstance(salt, bytes):
             raise TypeError("Salt must be bytes.")
         
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=self.iterations,
-            backend=default_backend()
-        )
-        derived_key = kdf.derive(password + self.secret)
-        return derived_key
\ No newline at end of file
+        return pool.run(_pbkdf2, password + self.secret, salt, self.iterations)
\ No newline at end of file
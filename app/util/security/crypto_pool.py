@@ -0,0 +1,115 @@
+import asyncio
+import os
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable
+from scramp import ScramMechanism
+from app.util.http import RouteError, ErrorCode
+
+class CryptoPoolBusy(RouteError):
+    """Raised when too many operations are already waiting for the crypto pool."""
+    
+    def __init__(self):
+        super().__init__("The server is busy, please try again later", ErrorCode.SERVICE_UNAVAILABLE)
+
+def make_scram_auth_info(password: str, mechanism: str = "SCRAM-SHA-256", iteration_count: int | None = None) -> tuple[bytes, bytes, bytes, int]:
+    """Runs ScramMechanism.make_auth_info. Defined at module level so the pool processes can run it."""
+    return ScramMechanism(mechanism).make_auth_info(password, iteration_count)
+
+class CryptoPool:
+    """Runs CPU-bound crypto (password hashing, key derivation) in a bounded pool of processes.
+    
+    Offloading keeps a burst of registrations or password changes from holding the web workers,
+    which only wait for the result. Submissions beyond the queue limit fail fast with CryptoPoolBusy
+    (a 503 RouteError) instead of piling up. With 0 workers, the operations run inline.
+    
+    The functions and arguments must be picklable, i.e. functions defined at module level.
+    """
+    
+    def __init__(self):
+        self.workers = 0
+        self.max_pending = 0
+        self.timeout_seconds = None
+        self._executor: ProcessPoolExecutor | None = None
+        self._executor_pid: int | None = None
+        self._pending: threading.BoundedSemaphore | None = None
+        self._lock = threading.Lock()
+    
+    def init(self, workers: int, max_pending: int, timeout_seconds: float | None = None):
+        """Configures the pool. The processes are started on the first submission.
+
+        Args:
+            workers (int): The number of processes, 0 to run the operations inline.
+            max_pending (int): The maximum number of queued and running operations.
+            timeout_seconds (float | None): How long run() waits for a result.
+        """
+        self.shutdown()
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout_seconds = timeout_seconds
+        self._pending = threading.BoundedSemaphore(max_pending) if workers > 0 else None
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            # A pool inherited through a fork can't be used, every process starts its own
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                self._executor_pid = os.getpid()
+            return self._executor
+    
+    def submit(self, fn: Callable, *args) -> Future:
+        """Starts an operation in the pool.
+
+        Args:
+            fn (Callable): A module level function.
+            *args: Its picklable arguments.
+
+        Raises:
+            CryptoPoolBusy: The queue is full.
+
+        Returns:
+            Future: The future result. Use asyncio.wrap_future to await it.
+        """
+        if self.workers <= 0:
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        if not self._pending.acquire(blocking=False):
+            raise CryptoPoolBusy()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        return future
+    
+    def run(self, fn: Callable, *args) -> Any:
+        """Runs an operation in the pool and waits for its result."""
+        return self.submit(fn, *args).result(self.timeout_seconds)
+    
+    def results(self, *futures: Future) -> list[Any]:
+        """Waits for futures returned by submit(), which run concurrently, and returns their results in order."""
+        return [future.result(self.timeout_seconds) for future in futures]
+    
+    async def run_async(self, fn: Callable, *args) -> Any:
+        """Runs an operation in the pool without blocking the event loop."""
+        return await asyncio.wait_for(asyncio.wrap_future(self.submit(fn, *args)), self.timeout_seconds)
+    
+    def shutdown(self, wait: bool = False):
+        """Stops the processes started by this process. The pool starts new ones on the next submission.
+
+        Args:
+            wait (bool): Wait for the processes to exit, e.g. before forking.
+        """
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            self._executor_pid = None
+
+pool = CryptoPool()
\ No newline at end of file
@@ -0,0 +1,31 @@
+import hashlib
+import hmac
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+class OtpHasher:
+    
+    def __init__(self):
+        self.is_initialized = False
+        self._key = None
+        
+    def init(self, secret: bytes):
+        """Initializes the OtpHasher with a key derived from the secret."""
+        if secret is None or not isinstance(secret, bytes):
+            raise TypeError("Secret must be bytes.")
+        hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b"vaultberry-otp")
+        self._key = hkdf.derive(secret)
+        self.is_initialized = True
+    
+    def hash(self, otp: str) -> str:
+        """Hashes an OTP with HMAC-SHA256. The hash can be looked up, but not brute forced without the key.
+
+        Args:
+            otp (str): The OTP to hash.
+
+        Returns:
+            str: The hex encoded hash.
+        """
+        if not self.is_initialized:
+            raise ValueError("OtpHasher is not initialized")
+        return hmac.new(self._key, otp.encode(), hashlib.sha256).hexdigest()
\ No newline at end of file
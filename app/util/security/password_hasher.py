@@ -1,9 +1,23 @@
 import werkzeug.security as wz_security
+from concurrent.futures import Future
+from app.util.metrics import timed, time_future
+from .crypto_pool import pool
 
 class PasswordHasher:
+    
+    def __init__(self):
+        self.method = "scrypt:32768:8:1"
+        
+    def init(self, method: str = "scrypt"):
+        """Initializes the PasswordHasher with the werkzeug hash method used for new hashes.
+        
+        Args:
+            method (str): e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:1000000". Omitted parameters get werkzeug's defaults.
+        """
+        # Normalize the method to the prefix of the hashes it produces
+        self.method = wz_security.generate_password_hash("", method).split("$")[0]
 
-    @staticmethod
-    def hash(password: str) -> str:
+    def hash(self, password: str) -> str:
         """Hashes a password using the werkzeug security module.
 
         Args:
@@ -12,10 +26,21 @@ class PasswordHasher:
         Returns:
             str: The hashed password.
         """
-        return wz_security.generate_password_hash(password)
+        return self.submit_hash(password).result(pool.timeout_seconds)
+    
+    def submit_hash(self, password: str) -> Future:
+        """Starts hashing a password in the crypto pool, so that other derivations can run alongside it.
 
-    @staticmethod
-    def check(password_hash: str, password: str) -> bool:
+        Args:
+            password (str): The password to hash.
+
+        Returns:
+            Future: The future hashed password.
+        """
+        return time_future("password_hash", pool.submit(wz_security.generate_password_hash, password, self.method))
+
+    @timed("password_check")
+    def check(self, password_hash: str, password: str) -> bool:
         """Checks if a password matches its hash.
 
         Args:
@@ -25,4 +50,15 @@ class PasswordHasher:
         Returns:
             bool: True if the password matches the hash, False otherwise.
         """
-        return wz_security.check_password_hash(password_hash, password)
\ No newline at end of file
+        return pool.run(wz_security.check_password_hash, password_hash, password)
+    
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Checks if a hash was made with other parameters than the current ones.
+
+        Args:
+            password_hash (str): The hash to check.
+
+        Returns:
+            bool: True if the password should be hashed again, once it is known to be correct.
+        """
+        return password_hash.split("$")[0] != self.method
\ No newline at end of file
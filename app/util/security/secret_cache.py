@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Tuple
+
+class SecretCache:
+    """Bounded LRU cache of decrypted secrets with a TTL.
+    
+    Every entry remembers the ciphertext it was decrypted from, so a secret changed by another
+    worker is never served stale: a different ciphertext is a cache miss. Plaintexts are kept in
+    bytearrays that are overwritten with zeros when they are evicted or invalidated. Expired entries
+    are wiped when they are looked up, or by a sweep that put runs at most once per TTL, so an idle
+    cache can keep expired plaintexts until its next put. The bytes returned to callers are copies
+    and can't be wiped by the cache.
+    """
+    
+    def __init__(self, max_entries: int = 10000, ttl_seconds: int = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, bytearray, float]]" = OrderedDict()  # key -> (ciphertext, plaintext, expires at)
+        self._lock = threading.Lock()
+        self._next_sweep_at = 0.0
+        
+    def init(self, max_entries: int, ttl_seconds: int):
+        """Configures the cache and clears it. A size or TTL of 0 disables the cache."""
+        with self._lock:
+            self.max_entries = max_entries
+            self.ttl_seconds = ttl_seconds
+            self._clear()
+    
+    @property
+    def is_enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    @staticmethod
+    def _wipe(buffer: bytearray):
+        buffer[:] = bytes(len(buffer))
+    
+    def _remove(self, key: Hashable):
+        """Removes and wipes an entry. Must hold the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._wipe(entry[1])
+    
+    def _clear(self):
+        """Removes and wipes all entries. Must hold the lock."""
+        for _, plaintext, _ in self._entries.values():
+            self._wipe(plaintext)
+        self._entries.clear()
+    
+    def _sweep(self, now: float):
+        """Removes and wipes the expired entries. Must hold the lock."""
+        # Lookups move entries to the end without extending their expiry, so the expired ones can be anywhere
+        for key in [key for key, (_, _, expires_at) in self._entries.items() if expires_at < now]:
+            self._remove(key)
+        self._next_sweep_at = now + self.ttl_seconds
+    
+    def get(self, key: Hashable, ciphertext: bytes) -> bytes | None:
+        """Returns the cached plaintext of the ciphertext, or None on a miss.
+
+        Args:
+            key (Hashable): The cache key, e.g. (user_id, secret type).
+            ciphertext (bytes): The current ciphertext of the secret.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            cached_ciphertext, plaintext, expires_at = entry
+            if cached_ciphertext != ciphertext or expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return bytes(plaintext)
+    
+    def put(self, key: Hashable, ciphertext: bytes, plaintext: bytes):
+        """Caches the plaintext of a ciphertext, evicting the least recently used entries if full
+        and sweeping the expired ones if the last sweep is older than the TTL.
+
+        Args:
+            key (Hashable): The cache key, e.g. (user_id, secret type).
+            ciphertext (bytes): The ciphertext.
+            plaintext (bytes): The decrypted ciphertext.
+        """
+        if not self.is_enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_sweep_at:
+                self._sweep(now)
+            self._remove(key)
+            self._entries[key] = (ciphertext, bytearray(plaintext), now + self.ttl_seconds)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+    
+    def get_or_decrypt(self, key: Hashable, ciphertext: bytes, decrypt: Callable[[bytes], bytes]) -> bytes:
+        """Returns the cached plaintext of the ciphertext, decrypting and caching it on a miss.
+
+        Args:
+            key (Hashable): The cache key, e.g. (user_id, secret type).
+            ciphertext (bytes): The current ciphertext of the secret.
+            decrypt (Callable[[bytes], bytes]): Decrypts the ciphertext.
+        """
+        plaintext = self.get(key, ciphertext)
+        if plaintext is None:
+            plaintext = decrypt(ciphertext)
+            self.put(key, ciphertext, plaintext)
+        return plaintext
+    
+    def invalidate(self, key: Hashable):
+        """Removes and wipes the entry of a key, if present."""
+        with self._lock:
+            self._remove(key)
\ No newline at end of file
@@ -0,0 +1,50 @@
+from flask import Flask, Response, session, current_app
+from cachelib import SimpleCache
+from app import db
+from .time import get_now_timestamp
+
+def configure(app: Flask) -> str:
+    """Sets up the Flask-Session config of the selected session backend.
+    
+    "sqlalchemy" keeps the sessions in the database, "memory" in a bounded per-worker cache,
+    "redis" in a Redis-compatible store at SESSION_REDIS_URL and "cookie" in Flask's signed cookies,
+    which suits small payloads and doesn't require Flask-Session at all.
+
+    Args:
+        app (Flask): The app, with the SESSION_BACKEND config set.
+
+    Returns:
+        str: The selected backend.
+    """
+    backend = app.config.get("SESSION_BACKEND", "sqlalchemy")
+    if backend == "sqlalchemy":
+        app.config["SESSION_TYPE"] = "sqlalchemy"
+        app.config["SESSION_SQLALCHEMY"] = db
+    elif backend == "memory":
+        app.config["SESSION_TYPE"] = "cachelib"
+        app.config["SESSION_CACHELIB"] = SimpleCache(
+            threshold=app.config.get("SESSION_MEMORY_MAX_ENTRIES", 10000),
+            default_timeout=int(app.permanent_session_lifetime.total_seconds())
+        )
+    elif backend == "redis":
+        import redis  # Optional dependency, only required by this backend
+        app.config["SESSION_TYPE"] = "redis"
+        app.config["SESSION_REDIS"] = redis.Redis.from_url(app.config.get("SESSION_REDIS_URL", "redis://localhost:6379"))
+    elif backend != "cookie":
+        raise ValueError(f"Unknown session backend: {backend}")
+    return backend
+
+def refresh_session(response: Response) -> Response:
+    """Extends the lifetime of a non-empty session when it is written or at most once per refresh interval.
+    
+    With SESSION_REFRESH_EACH_REQUEST off, a session is only written when it changes, so
+    this is what keeps active sessions from expiring, at the cost of one write per interval.
+    """
+    if not session:
+        return response
+    now = get_now_timestamp()
+    interval = current_app.config.get("SESSION_REFRESH_INTERVAL_SECONDS", 5 * 60)
+    if session.modified or now - session.get("_refreshed_at", 0) >= interval:
+        session["_refreshed_at"] = now
+        session.permanent = current_app.config.get("SESSION_PERMANENT", True)
+    return response
\ No newline at end of file
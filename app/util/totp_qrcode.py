@@ -0,0 +1,73 @@
+import io
+import json
+from typing import Callable
+from app.util.security import SecretCache
+
+# The output formats and their content types
+FORMATS = {
+    "svg": "image/svg+xml",
+    "png": "image/png",
+    "matrix": "application/json"
+}
+
+# The QR codes contain the TOTP secret, so they are cached like decrypted secrets
+_cache = SecretCache(max_entries=1000, ttl_seconds=300)
+
+def init(max_entries: int, ttl_seconds: int):
+    """Configures the per-worker QR code cache and clears it. A size or TTL of 0 disables the cache.
+
+    Args:
+        max_entries (int): The number of QR codes kept
+        ttl_seconds (int): The number of seconds a QR code is served from the cache
+    """
+    _cache.init(max_entries, ttl_seconds)
+
+def render(data: str, format: str) -> bytes:
+    """Renders a QR code. The imaging stack is imported on the first call, so workers that never render
+    QR codes don't load it.
+
+    Args:
+        data (str): The encoded data, e.g. a provisioning URI
+        format (str): svg (a single path), png, or matrix (JSON rows of 0 and 1 modules, for clients that draw it themselves)
+
+    Returns:
+        bytes: The QR code in the given format
+    """
+    import qrcode
+    
+    if format == "matrix":
+        qr = qrcode.QRCode(border=0)
+        qr.add_data(data)
+        qr.make(fit=True)
+        rows = ["".join("1" if module else "0" for module in row) for row in qr.get_matrix()]
+        return json.dumps({"size": len(rows), "matrix": rows}).encode()
+    
+    if format == "svg":
+        import qrcode.image.svg
+        image = qrcode.make(data, image_factory=qrcode.image.svg.SvgPathImage)
+    elif format == "png":
+        image = qrcode.make(data)
+    else:
+        raise ValueError(f"Unknown QR code format: {format}")
+    buffered = io.BytesIO()
+    image.save(buffered)
+    return buffered.getvalue()
+
+def get(user_id: int, format: str, encrypted_secret: bytes, get_data: Callable[[], str]) -> bytes:
+    """Returns the QR code of a user, rendering it on a cache miss.
+    
+    Args:
+        user_id (int): The ID of the user
+        format (str): The output format
+        encrypted_secret (bytes): The current ciphertext of the encoded secret, a new secret is a cache miss
+        get_data (Callable[[], str]): Returns the data to encode, only called on a cache miss
+
+    Returns:
+        bytes: The QR code in the given format
+    """
+    return _cache.get_or_decrypt((user_id, format), encrypted_secret, lambda _: render(get_data(), format))
+
+def invalidate(user_id: int):
+    """Removes the QR codes of a user from the cache."""
+    for format in FORMATS:
+        _cache.invalidate((user_id, format))
\ No newline at end of file
@@ -0,0 +1,50 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Tuple
+
+_max_entries = 10000
+_ttl_seconds = 5
+_entries: "OrderedDict[int, Tuple[dict[str, Any], float]]" = OrderedDict()  # user_id -> (column values, expires at)
+_lock = threading.Lock()
+
+def init(max_entries: int, ttl_seconds: int):
+    """Configures the per-worker user cache and clears it. A size or TTL of 0 disables the cache.
+
+    Args:
+        max_entries (int): The number of users kept
+        ttl_seconds (int): The number of seconds a user is served from the cache
+    """
+    global _max_entries, _ttl_seconds
+    with _lock:
+        _max_entries = max_entries
+        _ttl_seconds = ttl_seconds
+        _entries.clear()
+
+def get(user_id: int) -> dict[str, Any] | None:
+    """Returns the cached column values of a user, or None on a miss."""
+    with _lock:
+        entry = _entries.get(user_id)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del _entries[user_id]
+            return None
+        _entries.move_to_end(user_id)
+        return dict(entry[0])
+
+def put(user_id: int, values: dict[str, Any]):
+    """Caches the column values of a user, evicting the least recently used users if full."""
+    if _max_entries <= 0 or _ttl_seconds <= 0:
+        return
+    with _lock:
+        _entries[user_id] = (dict(values), time.monotonic() + _ttl_seconds)
+        _entries.move_to_end(user_id)
+        while len(_entries) > _max_entries:
+            _entries.popitem(last=False)
+
+def invalidate(user_ids: Iterable[int]):
+    """Removes users from the cache."""
+    with _lock:
+        for user_id in user_ids:
+            _entries.pop(user_id, None)
\ No newline at end of file
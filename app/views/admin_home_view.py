@@ -1,10 +1,13 @@
 from flask_admin import AdminIndexView, expose
 from flask_login import current_user
-from app.util import admin_required
+from app import db
+from app.util import admin_required, db_pool
 
 class AdminHomeView(AdminIndexView):
 
     @expose('/')
     @admin_required
     def index(self):
-        return self.render("admin_home.html", admin_email=current_user.email)
+        # The pools of the worker serving this page
+        pool_stats = {bind or "default": db_pool.get_stats(engine) for bind, engine in db.engines.items()}
+        return self.render("admin_home.html", admin_email=current_user.email, pool_stats=pool_stats)
\ No newline at end of file
@@ -6,7 +6,6 @@ class OTPModelView(AdminModelView):
         "id",
         "user_id",
         "type",
-        "otp",
         "created_at",
         "expires_at",
         "used"
@@ -0,0 +1,102 @@
+"""Compares the sync and async read routes under concurrent load in one worker process.
+
+Every request thread of the worker (gunicorn's gthread threads) is simulated by a client thread that sends
+requests back to back through the WSGI app, so the numbers leave out the HTTP server and the network.
+
+Usage: python -m benchmarks.async_reads [--db-url URL] [--entries N] [--requests N] [--threads 1,4,16]
+
+Without --db-url, a temporary SQLite file is used. Use a Postgres URL to include real network round trips.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from scramp import ScramClient
+from config import TestConfig
+from app import create_app, db
+from app.util import async_db
+
+ROUTES = [
+    ("GET", "/vault/previews", None),
+    ("GET", "/vault/details?limit=50", None),
+    ("GET", "/vault/details/1", None),
+    ("POST", "/vault/search", {"keywords": ["site 1"], "limit": 20}),
+    ("GET", "/account", None)
+]
+
+class BenchmarkConfig(TestConfig):
+    ASYNC_READS_ENABLED = True
+    RATE_LIMIT_BACKEND = "none"
+
+def log_in(client, email: str, password: str):
+    scram_client = ScramClient(["SCRAM-SHA-256"], email, password)
+    response = client.post("/login/step1", json={"email": email, "client_message": scram_client.get_client_first()})
+    scram_client.set_server_first(response.json["server_message"])
+    response = client.post("/login/step2", json={"email": email, "client_message": scram_client.get_client_final(), "handshake_id": response.json["handshake_id"]})
+    scram_client.set_server_final(response.json["server_message"])
+
+def seed(app, entries: int) -> str:
+    """Registers a user with some entries and returns the session cookie."""
+    from tests.base_test_case import BaseTestCase
+    client = app.test_client()
+    client.post("/register", json={**BaseTestCase.example_register_data, "no_activation_required": True})
+    log_in(client, BaseTestCase.example_email, BaseTestCase.example_password)
+    for i in range(entries):
+        client.post("/vault/add", json={**BaseTestCase.example_entry_data1, "title": f"Site {i}", "url": f"https://site{i}.example.com"})
+    return client.get_cookie("session").value
+
+def run(app, cookie: str, method: str, path: str, body, requests: int, threads: int) -> tuple[float, float, float]:
+    """Sends the requests from the given number of threads and returns the throughput and the p50 and p99 latencies."""
+    def worker(count: int) -> list[float]:
+        client = app.test_client()
+        client.set_cookie("session", cookie)
+        latencies = []
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, (path, response.status_code, response.data)
+        return latencies
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        latencies = [latency for result in executor.map(worker, [requests // threads] * threads) for latency in result]
+    elapsed = time.perf_counter() - start
+    quantiles = statistics.quantiles(latencies, n=100)
+    return len(latencies) / elapsed, quantiles[49] * 1000, quantiles[98] * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", help="The database URL, a temporary SQLite file by default")
+    parser.add_argument("--entries", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=400, help="Requests per route, path and thread count")
+    parser.add_argument("--threads", default="1,4,16")
+    args = parser.parse_args()
+    
+    path = None
+    if args.db_url is None:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+    BenchmarkConfig.SQLALCHEMY_DATABASE_URI = args.db_url or f"sqlite:///{path}"
+    app = create_app(BenchmarkConfig)
+    app.logger.setLevel("WARNING")
+    try:
+        cookie = seed(app, args.entries)
+        print(f"{'route':<28}{'threads':>8}{'sync req/s':>12}{'async req/s':>13}{'sync p50/p99 ms':>18}{'async p50/p99 ms':>19}")
+        for method, route, body in ROUTES:
+            for threads in map(int, args.threads.split(",")):
+                sync = run(app, cookie, method, route, body, args.requests, threads)
+                asynchronous = run(app, cookie, method, f"/async{route}", body, args.requests, threads)
+                print(f"{route:<28}{threads:>8}{sync[0]:>12.0f}{asynchronous[0]:>13.0f}{sync[1]:>10.1f}/{sync[2]:<7.1f}{asynchronous[1]:>11.1f}/{asynchronous[2]:<7.1f}")
+    finally:
+        async_db.dispose()
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        if path is not None:
+            os.remove(path)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -9,10 +9,24 @@ except Exception as e:
 
 class BaseConfig:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DB_POOL_CLASS = os.environ.get("DB_POOL_CLASS", "queue")  # queue (per worker) or null (a new connection per checkout, e.g. behind PgBouncer)
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))  # Connections kept open per worker, should cover WEB_THREADS
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))  # Extra connections opened under load, closed when returned
+    DB_POOL_TIMEOUT_SECONDS = 10  # Wait for a connection before failing the request
+    DB_POOL_RECYCLE_SECONDS = 30 * 60  # Reopen older connections, keep below the idle timeouts of the server and any proxy
+    DB_POOL_PRE_PING = True  # Test connections on checkout, replacing the ones closed by the server
+    DB_POOL_PREWARM = int(os.environ.get("DB_POOL_PREWARM", 2))  # Connections opened when a gunicorn worker starts
+    DB_PGBOUNCER = os.environ.get("DB_PGBOUNCER", "0") == "1"  # Turns off server-side prepared statements, for PgBouncer's transaction pooling
+    REPLICA_DATABASE_URI = os.environ.get("DATABASE_REPLICA_URL")  # Read replica for the GET routes and the SCRAM lookup, unset to read everything from the primary
+    READ_YOUR_WRITES_SECONDS = 10  # A client reads from the primary for this long after it writes, keep above the replica lag
     
-    SESSION_TYPE = "sqlalchemy"
+    SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "sqlalchemy")  # sqlalchemy, memory (per worker), redis or cookie
     SESSION_SQLALCHEMY_TABLE = "sessions"
+    SESSION_MEMORY_MAX_ENTRIES = 10000
+    SESSION_REDIS_URL = os.environ.get("SESSION_REDIS_URL", "redis://localhost:6379")
     SESSION_PERMANENT = True
+    SESSION_REFRESH_EACH_REQUEST = False  # Only write sessions when they change...
+    SESSION_REFRESH_INTERVAL_SECONDS = 5 * 60  # ...or at most once per interval to extend their lifetime
     PERMANENT_SESSION_LIFETIME = timedelta(minutes=30)
     SESSION_COOKIE_SECURE = True
     SESSION_COOKIE_HTTPONLY = True
@@ -30,9 +44,69 @@ class BaseConfig:
     MAIL_USERNAME = os.environ.get("MAIL_USERNAME")
     MAIL_PASSWORD = os.environ.get("MAIL_PASSWORD")
     MAIL_DEFAULT_SENDER = os.environ.get("MAIL_USERNAME")
+    MAIL_OUTBOX_SENDER = os.environ.get("MAIL_OUTBOX_SENDER", "thread")  # thread (in every worker) or worker (flask outbox worker)
+    MAIL_OUTBOX_BATCH_SIZE = 50
+    MAIL_OUTBOX_MAX_ATTEMPTS = 8
+    MAIL_OUTBOX_BACKOFF_SECONDS = 30  # Doubled after every failed attempt
+    MAIL_OUTBOX_POLL_SECONDS = 10
     
     FERNET_KEY = os.environ.get("FERNET_KEY")
     KDF_SECRET = os.environ.get("KDF_SECRET")
+    # Cost parameters for new secrets, see flask security calibrate. Outdated hashes are upgraded when the password is next checked
+    KDF_ITERATIONS = int(os.environ.get("KDF_ITERATIONS", 390000))
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    SCRAM_ITERATIONS = int(os.environ.get("SCRAM_ITERATIONS", 4096))
+    CRYPTO_POOL_WORKERS = int(os.environ.get("CRYPTO_POOL_WORKERS", 2))  # Processes for password hashing and key derivation, 0 to run them inline
+    CRYPTO_POOL_MAX_PENDING = 64  # Further requests get a 503
+    CRYPTO_POOL_TIMEOUT_SECONDS = 30
+    SECRET_CACHE_MAX_ENTRIES = 10000  # Decrypted secrets kept per worker, 0 to disable
+    SECRET_CACHE_TTL_SECONDS = 300
+    SCRAM_HANDSHAKE_STORE = os.environ.get("SCRAM_HANDSHAKE_STORE", "token")  # token (shared through the database) or memory (per worker), both single use
+    SCRAM_HANDSHAKE_TTL_SECONDS = 60
+    SCRAM_HANDSHAKE_MAX_ENTRIES = 10000
+    
+    RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")  # memory (per worker), redis (shared) or none
+    RATE_LIMIT_REDIS_URL = os.environ.get("RATE_LIMIT_REDIS_URL", "redis://localhost:6379")
+    RATE_LIMIT_MAX_ENTRIES = 100000  # Buckets kept in memory per worker
+    RATE_LIMIT_REDIS_BACKOFF_SECONDS = 30  # The local buckets are used for this long after the Redis store fails
+    RATE_LIMITS = {  # Token buckets per client IP and per account: (capacity, seconds to refill)
+        "login": {"ip": (60, 60), "account": (20, 60)},  # Both login steps take a token
+        "recovery_login": {"ip": (10, 60), "account": (5, 5 * 60)},
+        "account_delete": {"ip": (10, 60), "account": (5, 5 * 60)},
+        "activation_email": {"ip": (10, 60 * 60), "account": (1, 30 * 60)},
+        "recovery_email": {"ip": (10, 60 * 60), "account": (1, 24 * 60 * 60)},
+    }
+    
+    USER_CACHE_MAX_ENTRIES = 10000  # Logged in users kept per worker, 0 to disable
+    USER_CACHE_TTL_SECONDS = 5  # Bounds staleness from account changes handled by other workers
+    TOTP_QRCODE_CACHE_MAX_ENTRIES = 1000  # Rendered 2FA setup QR codes kept per worker, 0 to disable
+    TOTP_QRCODE_CACHE_TTL_SECONDS = 300
+    
+    QUERY_COUNT_HEADER = False  # Adds the number of queries of each request as the X-Query-Count response header
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")  # Bearer token of the Prometheus scraper for /metrics, which admins can also open when logged in
+    
+    VAULT_BATCH_MAX_OPERATIONS = 1000
+    VAULT_PAGE_DEFAULT_LIMIT = 100
+    VAULT_PAGE_MAX_LIMIT = 500
+    VAULT_SYNC_CURSOR_LAG_SECONDS = 5
+    VAULT_TOMBSTONE_RETENTION_SECONDS = 30 * 24 * 60 * 60
+    VAULT_SEARCH_BACKEND = os.environ.get("VAULT_SEARCH_BACKEND", "auto")  # auto, like, fts (SQLite), trigram (Postgres) or memory
+    VAULT_SEARCH_MAX_RESULTS = 1000
+    VAULT_SEARCH_INDEX_MAX_BYTES = 64 * 1024 * 1024  # In-memory indexes of the memory backend, per worker
+    VAULT_SEARCH_INDEX_TTL_SECONDS = 30  # Bounds staleness from writes handled by other workers
+    
+    ASYNC_READS_ENABLED = os.environ.get("ASYNC_READS_ENABLED", "0") == "1"  # Mounts the async read routes under /async
+    ASYNC_DATABASE_URI = os.environ.get("ASYNC_DATABASE_URI")  # Defaults to the database URL with its async driver
+    ASYNC_DB_POOL_SIZE = 10  # Per worker, shared by all its threads
+    ASYNC_DB_MAX_OVERFLOW = 10
+    
+    OTP_RETENTION_SECONDS = 24 * 60 * 60  # Must cover the account intervals of the email rate limits, which fall back to the last OTP
+    MAIL_OUTBOX_RETENTION_SECONDS = 7 * 24 * 60 * 60
+    RETENTION_BATCH_SIZE = 500
+    RETENTION_PURGE_INTERVAL_SECONDS = int(os.environ.get("RETENTION_PURGE_INTERVAL_SECONDS", 0))  # 0 to only purge with flask retention purge
+    
+    REENCRYPTION_JOB_TTL_SECONDS = 60 * 60
+    REENCRYPTION_MAX_CHUNK_ENTRIES = 1000
 
 class DevConfig(BaseConfig):
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL")
@@ -41,4 +115,10 @@ class DevConfig(BaseConfig):
 class TestConfig(BaseConfig):
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     SECRET_KEY = "test key"
-    TESTING = True
\ No newline at end of file
+    TESTING = True
+    SESSION_BACKEND = "cookie"
+    MAIL_OUTBOX_SENDER = "worker"
+    CRYPTO_POOL_WORKERS = 0
+    KDF_ITERATIONS = 1000  # Fast tests
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
+    QUERY_COUNT_HEADER = True
\ No newline at end of file
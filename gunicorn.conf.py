@@ -0,0 +1,80 @@
+"""The gunicorn configuration, loaded by `gunicorn run:app` from the project root.
+
+The app is imported once by the master and the workers are forked from it, so their memory is shared
+copy-on-write. Send SIGHUP for a graceful reload of the workers, e.g. after changing the environment.
+Since the code is preloaded, code changes need a new master: SIGUSR2, then SIGQUIT to the old one.
+"""
+import gc
+import multiprocessing
+import os
+import tempfile
+
+bind = os.environ.get("WEB_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.environ.get("WEB_THREADS", 4))
+worker_class = "gthread"
+preload_app = True
+
+# Recycle workers now and then, staggered so they don't restart together
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", 10000))
+max_requests_jitter = max_requests // 10
+
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Serve HTTPS directly when the certificate is present (see Build in the README)
+if os.path.exists("cert.pem") and os.path.exists("key.pem"):
+    certfile = "cert.pem"
+    keyfile = "key.pem"
+
+accesslog = "-"
+errorlog = "-"
+
+# The workers share their metrics through files in this directory, which must be set before the app is loaded.
+# A new one for every master. It is kept when the config is reloaded by SIGHUP, and by a new master started with SIGUSR2
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="vaultberry-metrics-")
+
+def when_ready(server):
+    # The workers start their own crypto pools, the one used while creating the app must not be inherited
+    from app.util import security
+    security.pool.shutdown(wait=True)
+    
+    # Per-worker rate limit buckets multiply the limits by the number of workers
+    from run import app
+    if app.config.get("RATE_LIMIT_BACKEND", "memory") == "memory" and server.num_workers > 1:
+        server.log.warning(
+            f"RATE_LIMIT_BACKEND is 'memory' with {server.num_workers} workers: every worker keeps its own buckets, "
+            f"so the login and recovery limits are {server.num_workers} times higher. Set RATE_LIMIT_BACKEND=redis to share them"
+        )
+    
+    # Move everything allocated while importing the app out of the collector's reach. Otherwise the first
+    # collection in each worker touches every object and copies the shared pages
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Froze {gc.get_freeze_count()} objects before forking the workers")
+
+def post_fork(server, worker):
+    # The connections opened by the master while creating the app can't be shared with the workers.
+    # Drop them from the pools without closing them, since they still belong to the master
+    from run import app
+    from app import db
+    from app.util import db_pool
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+        
+        # Open the worker's own connections before it accepts requests. A database that is down must not
+        # keep the worker from starting, the requests will retry
+        for bind, engine in db.engines.items():
+            try:
+                opened = db_pool.prewarm(engine, app.config.get("DB_POOL_PREWARM", 2))
+                server.log.info(f"Worker {worker.pid} opened {opened} connections to the {bind or 'primary'} database")
+            except Exception as e:
+                server.log.warning(f"Worker {worker.pid} could not open connections to the {bind or 'primary'} database: {e}")
+
+def child_exit(server, worker):
+    # Keep the counters of the worker, drop its live values
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
\ No newline at end of file
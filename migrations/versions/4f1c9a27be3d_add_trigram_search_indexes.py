@@ -0,0 +1,40 @@
+"""Add trigram indexes for vault search
+
+Revision ID: 4f1c9a27be3d
+Revises: d66b70c8b567
+Create Date: 2026-10-18 11:03:27.905164
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f1c9a27be3d'
+down_revision = 'd66b70c8b567'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = ["title", "url", "notes"]
+# The SQLite full-text index is created by app.util.search.FtsSearchEngine on startup
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for column in COLUMNS:
+            op.create_index(
+                f"ix_entries_{column}_trgm", "entries", [column], if_not_exists=True,
+                postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"}, postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    with op.get_context().autocommit_block():
+        for column in reversed(COLUMNS):
+            op.drop_index(f"ix_entries_{column}_trgm", table_name="entries", if_exists=True, postgresql_concurrently=True)
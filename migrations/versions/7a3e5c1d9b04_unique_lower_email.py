@@ -0,0 +1,42 @@
+"""Make emails unique ignoring case
+
+Revision ID: 7a3e5c1d9b04
+Revises: b81e4d2f6a9c
+Create Date: 2026-10-18 19:05:44.218307
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a3e5c1d9b04'
+down_revision = 'b81e4d2f6a9c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Accounts that only differ in case can't be merged automatically, they must be resolved by hand
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT lower(email) FROM users GROUP BY lower(email) HAVING count(*) > 1"
+    )).scalars().all()
+    if duplicates:
+        raise RuntimeError(f"Emails used by several accounts with different case: {', '.join(duplicates)}")
+    
+    # Build the unique index before dropping the plain one, so lookups always have an index
+    with op.get_context().autocommit_block():
+        op.create_index("uq_users_email_lower", "users", [sa.text("lower(email)")], unique=True, if_not_exists=True, postgresql_concurrently=True)
+        op.drop_index("ix_users_email_lower", table_name="users", if_exists=True, postgresql_concurrently=True)
+    
+    # The case-sensitive constraint is covered by the index. SQLite keeps its unnamed one
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("ALTER TABLE users DROP CONSTRAINT IF EXISTS users_email_key")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.create_unique_constraint("users_email_key", "users", ["email"])
+    with op.get_context().autocommit_block():
+        op.create_index("ix_users_email_lower", "users", [sa.text("lower(email)")], if_not_exists=True, postgresql_concurrently=True)
+        op.drop_index("uq_users_email_lower", table_name="users", if_exists=True, postgresql_concurrently=True)
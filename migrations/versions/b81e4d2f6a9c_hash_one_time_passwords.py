@@ -0,0 +1,53 @@
+"""Store one-time passwords as keyed hashes
+
+Revision ID: b81e4d2f6a9c
+Revises: 4f1c9a27be3d
+Create Date: 2026-10-18 14:21:08.663190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b81e4d2f6a9c'
+down_revision = '4f1c9a27be3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The hash key is derived from KDF_SECRET by the app that runs the migration
+    from app.util import security
+    
+    # A database created by the app on startup (db.create_all) already has the new layout
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("otps")}
+    indexes = {index["name"] for index in inspector.get_indexes("otps")}
+    
+    if "otp_hash" not in columns:
+        with op.batch_alter_table("otps") as batch_op:
+            batch_op.add_column(sa.Column("otp_hash", sa.String(length=64), nullable=True))
+    
+    if "otp" in columns:
+        # Hash the outstanding OTPs so they stay usable
+        otps = sa.table("otps", sa.column("id", sa.Integer), sa.column("otp", sa.String), sa.column("otp_hash", sa.String))
+        connection = op.get_bind()
+        for otp_id, otp in connection.execute(sa.select(otps.c.id, otps.c.otp)).all():
+            connection.execute(otps.update().where(otps.c.id == otp_id).values(otp_hash=security.otp_hasher.hash(otp)))
+    
+    with op.batch_alter_table("otps") as batch_op:
+        if "otp" in columns:
+            batch_op.drop_column("otp")
+        if "ix_otps_user_id_otp_hash" not in indexes:
+            batch_op.create_index("ix_otps_user_id_otp_hash", ["user_id", "otp_hash"])
+
+
+def downgrade():
+    # Hashes can't be reversed, so the outstanding OTPs are invalidated
+    with op.batch_alter_table("otps") as batch_op:
+        batch_op.drop_index("ix_otps_user_id_otp_hash")
+        batch_op.add_column(sa.Column("otp", sa.String(length=255), nullable=True))
+    op.execute(sa.text("UPDATE otps SET used = true"))
+    with op.batch_alter_table("otps") as batch_op:
+        batch_op.drop_column("otp_hash")
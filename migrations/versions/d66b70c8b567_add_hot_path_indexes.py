@@ -0,0 +1,43 @@
+"""Add indexes for the hot lookup paths
+
+Revision ID: d66b70c8b567
+Revises: 
+Create Date: 2026-10-18 10:12:41.417312
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd66b70c8b567'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns)
+INDEXES = [
+    # Every auth route looks up the user by email, ignoring case
+    ("ix_users_email_lower", "users", [sa.text("lower(email)")]),
+    # Single entry lookups and keyset pagination
+    ("ix_entries_user_id_id", "entries", ["user_id", "id"]),
+    # Delta sync
+    ("ix_entries_user_id_last_modified", "entries", ["user_id", "last_modified"]),
+    # OTP cooldown checks
+    ("ix_otps_user_id_type_created_at", "otps", ["user_id", "type", "created_at"]),
+]
+# (user_id, title) and (user_id, type) are already covered by the _user_title_uc and _user_type_uc constraints
+
+
+def upgrade():
+    # Build the indexes without blocking writes on Postgres
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -1,4 +1,8 @@
-"""The entry point of the application"""
+"""The entry point of the application.
+
+Served by gunicorn (`gunicorn run:app`, settings in gunicorn.conf.py), which imports it once in the master
+process and forks the workers from it. `flask run` still works for development.
+"""
 from app import create_app
 from config import DevConfig
 
@@ -106,7 +106,7 @@ class BaseTestCase(unittest.TestCase):
     def tearDown(self):
         with self.app.app_context():
             db.session.remove()
-            db.drop_all()  # Clean up the database
+            db.drop_all(bind_key=None)  # Clean up the database
             
     def register_user(self, json_data):
         return self.client.post("/register", json=json_data)
@@ -114,22 +114,34 @@ class BaseTestCase(unittest.TestCase):
     def login_user_step1(self, email, password):
         self.scram_client = ScramClient(['SCRAM-SHA-256'], email, password)
         client_first_message = self.scram_client.get_client_first()
-        return self.client.post("/login/step1", json={
+        response = self.client.post("/login/step1", json={
             "email": email,
             "client_message": client_first_message
         })
+        self.handshake_id = response.json.get("handshake_id") if response.is_json else None
+        return response
     
     def login_user_step2(self, server_first_message):
         self.scram_client.set_server_first(server_first_message)
         client_final_message = self.scram_client.get_client_final()
         return self.client.post("/login/step2", json={
             "email": self.scram_client.username,
-            "client_message": client_final_message
+            "client_message": client_final_message,
+            "handshake_id": self.handshake_id
         })
         
     def login_user_step3(self, server_final_message):
         self.scram_client.set_server_final(server_final_message)
     
+    def send_activation_email(self, email):
+        return self.client.post("/activation/send", query_string={"email": email})
+    
+    def send_recovery_otp(self, email):
+        return self.client.post("/recovery/send", query_string={"email": email})
+    
+    def recovery_login(self, json_data):
+        return self.client.post("/recovery/login", json=json_data)
+    
     def logout_user(self):
         return self.client.post("/logout")
     
@@ -139,6 +151,15 @@ class BaseTestCase(unittest.TestCase):
     def get_all_vault_entry_previews(self):
         return self.client.get("/vault/previews")
     
+    def get_vault_entry_details_page(self, query_string):
+        return self.client.get("/vault/details", query_string=query_string)
+    
+    def get_vault_entry_previews_page(self, query_string):
+        return self.client.get("/vault/previews", query_string=query_string)
+    
+    def get_vault_changes(self, since=None):
+        return self.client.get("/vault/changes", query_string={} if since is None else {"since": since})
+    
     def add_vault_entry(self, json_data):
         return self.client.post("/vault/add", json=json_data)
     
@@ -148,6 +169,9 @@ class BaseTestCase(unittest.TestCase):
     def delete_vault_entry(self, id):
         return self.client.delete(f"/vault/delete/{id}")
     
+    def batch_vault_entries(self, json_data):
+        return self.client.post("/vault/batch", json=json_data)
+    
     def search_vault_entries_by_keyword(self, json_data):
         return self.client.post("/vault/search", json=json_data)
     
@@ -160,5 +184,20 @@ class BaseTestCase(unittest.TestCase):
     def change_password(self, json_data):
         return self.client.patch("/account/password", json=json_data)
     
+    def open_reencryption_job(self):
+        return self.client.post("/account/password/jobs")
+    
+    def get_reencryption_job(self, job_id):
+        return self.client.get(f"/account/password/jobs/{job_id}")
+    
+    def upload_reencryption_chunk(self, job_id, chunk_number, json_data):
+        return self.client.put(f"/account/password/jobs/{job_id}/chunks/{chunk_number}", json=json_data)
+    
+    def commit_reencryption_job(self, job_id, json_data):
+        return self.client.post(f"/account/password/jobs/{job_id}/commit", json=json_data)
+    
     def setup_2fa(self):
-        return self.client.post("/account/2fa/setup")
\ No newline at end of file
+        return self.client.post("/account/2fa/setup")
+    
+    def get_2fa_qrcode(self, format):
+        return self.client.get(f"/account/2fa/qrcode?format={format}")
\ No newline at end of file
@@ -1,4 +1,7 @@
+import pyotp
+from unittest.mock import patch
 from tests import BaseTestCase, unittest
+from app import db
 
 class AccountTestCase(BaseTestCase):
 
@@ -15,6 +18,34 @@ class AccountTestCase(BaseTestCase):
         response = self.update_account(self.example_account_update_data)
         self.assertEqual(response.status_code, 200)
 
+    def test_user_cache(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 200)
+        response = self.login_user_step2(response.json["server_message"])
+        self.assertEqual(response.status_code, 200)
+        self.login_user_step3(response.json["server_message"])
+        
+        # The first request loads the user, the next ones are served from the cache
+        response = self.client.get("/account/2fa/status")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Query-Count"], "1")
+        response = self.client.get("/account/2fa/status")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Query-Count"], "0")
+        
+        # Account changes invalidate the cached user
+        response = self.update_account(self.example_account_update_data)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get("/account/2fa/status")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Query-Count"], "1")
+        response = self.client.get("/account")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["email"], self.example_account_update_data["account"]["email"])
+
     def test_delete_account(self):
         response = self.register_user(self.example_register_data)
         self.assertEqual(response.status_code, 201)
@@ -44,6 +75,73 @@ class AccountTestCase(BaseTestCase):
         response = self.change_password(self.example_password_change_data)
         self.assertEqual(response.status_code, 200)
         
+        # The password hash is updated along with the SCRAM auth info
+        new_password_data = {**self.example_password_change_data, "passwords": {"regular_password": "new_password", "recovery_password": "test"}}
+        response = self.change_password(new_password_data)
+        self.assertEqual(response.status_code, 200)
+        response = self.delete_account(self.example_account_delete_data)
+        self.assertEqual(response.status_code, 401)
+        response = self.delete_account({"password": "new_password"})
+        self.assertEqual(response.status_code, 200)
+        
+    def test_change_password_with_reencryption(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 200)
+        response = self.login_user_step2(response.json["server_message"])
+        self.assertEqual(response.status_code, 200)
+        self.login_user_step3(response.json["server_message"])
+        
+        response = self.add_vault_entry(self.example_entry_data1)
+        self.assertEqual(response.status_code, 201)
+        id1 = response.json["id"]
+        response = self.add_vault_entry(self.example_entry_data2)
+        self.assertEqual(response.status_code, 201)
+        id2 = response.json["id"]
+        
+        response = self.open_reencryption_job()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json["total_entries"], 2)
+        job_id = response.json["job_id"]
+        
+        new_username = "bmV3dXNlcm5hbWU="
+        response = self.upload_reencryption_chunk(job_id, 0, {"entries": [{"id": id1, "encrypted_username": new_username}]})
+        self.assertEqual(response.status_code, 200)
+        
+        # Committing with missing entries fails
+        response = self.commit_reencryption_job(job_id, self.example_password_change_data)
+        self.assertEqual(response.status_code, 409)
+        
+        # Re-uploading a chunk replaces it
+        response = self.upload_reencryption_chunk(job_id, 1, {"entries": [{"id": id1, "encrypted_username": new_username}]})
+        self.assertEqual(response.status_code, 200)
+        response = self.upload_reencryption_chunk(job_id, 1, {"entries": [{"id": id2, "encrypted_username": new_username}]})
+        self.assertEqual(response.status_code, 200)
+        response = self.get_reencryption_job(job_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["received_chunks"], [0, 1])
+        
+        # A concurrent first upload of the same chunk is a conflict, not an error
+        from app.models import ReencryptionChunk
+        def store_concurrently(job_id, chunk_number, entries):
+            db.session.add(ReencryptionChunk(job_id=job_id, chunk_number=chunk_number, entries="[]"))
+        with patch.object(ReencryptionChunk, "store", store_concurrently):
+            response = self.upload_reencryption_chunk(job_id, 1, {"entries": [{"id": id2, "encrypted_username": new_username}]})
+        self.assertEqual(response.status_code, 409)
+        
+        response = self.commit_reencryption_job(job_id, self.example_password_change_data)
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.get_all_vault_entry_details()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry["encrypted_username"] for entry in response.json], [new_username, new_username])
+        
+        # The job is gone after the commit
+        response = self.get_reencryption_job(job_id)
+        self.assertEqual(response.status_code, 404)
+        
     def test_2fa_setup(self):
         response = self.register_user(self.example_register_data)
         self.assertEqual(response.status_code, 201)
@@ -54,8 +152,42 @@ class AccountTestCase(BaseTestCase):
         self.assertEqual(response.status_code, 200)
         self.login_user_step3(response.json["server_message"])
         
+        response = self.get_2fa_qrcode("svg")
+        self.assertEqual(response.status_code, 404)
+        
         response = self.setup_2fa()
         self.assertEqual(response.status_code, 200)
+        provisioning_uri = response.json["provisioning_uri"]
+        self.assertNotIn("qrcode", response.json)
+        
+        # The QR code is rendered on demand
+        response = self.get_2fa_qrcode("svg")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "image/svg+xml")
+        self.assertIn(b"<svg", response.data)
+        self.assertEqual(self.get_2fa_qrcode("svg").data, response.data)
+        response = self.get_2fa_qrcode("png")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data.startswith(b"\x89PNG"))
+        response = self.get_2fa_qrcode("matrix")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json["matrix"]), response.json["size"])
+        response = self.get_2fa_qrcode("gif")
+        self.assertEqual(response.status_code, 400)
+        
+        # A new secret gets a new QR code
+        svg = self.get_2fa_qrcode("svg").data
+        response = self.setup_2fa()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.json["provisioning_uri"], provisioning_uri)
+        self.assertNotEqual(self.get_2fa_qrcode("svg").data, svg)
+        
+        # And none once it is activated
+        totp_code = pyotp.parse_uri(response.json["provisioning_uri"]).now()
+        response = self.client.post("/account/2fa/activate", json={"totp_code": totp_code})
+        self.assertEqual(response.status_code, 200)
+        response = self.get_2fa_qrcode("svg")
+        self.assertEqual(response.status_code, 400)
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
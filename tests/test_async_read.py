@@ -0,0 +1,64 @@
+import os
+import tempfile
+from config import TestConfig
+from tests import BaseTestCase, unittest
+from app import create_app
+from app.util import async_db
+
+class AsyncReadConfig(TestConfig):
+    ASYNC_READS_ENABLED = True
+
+class AsyncReadTestCase(BaseTestCase):
+    
+    def setUp(self):
+        # The async engine needs a database it can open on its own connections
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        AsyncReadConfig.SQLALCHEMY_DATABASE_URI = f"sqlite:///{self.db_path}"
+        self.app = create_app(AsyncReadConfig)
+        self.client = self.app.test_client()
+        
+    def tearDown(self):
+        async_db.dispose()
+        super().tearDown()
+        os.remove(self.db_path)
+        
+    def test_to_async_url(self):
+        self.assertEqual(async_db.to_async_url("sqlite:///vault.db"), "sqlite+aiosqlite:///vault.db")
+        self.assertEqual(async_db.to_async_url("postgresql+psycopg2://user:password@db/vault"), "postgresql+asyncpg://user:password@db/vault")
+        with self.assertRaises(ValueError):
+            async_db.to_async_url("mysql://db/vault")
+        
+    def test_same_responses(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 200)
+        response = self.login_user_step2(response.json["server_message"])
+        self.assertEqual(response.status_code, 200)
+        self.login_user_step3(response.json["server_message"])
+        
+        for entry in (self.example_entry_data1, self.example_entry_data2, self.example_entry_data3):
+            response = self.add_vault_entry(entry)
+            self.assertEqual(response.status_code, 201)
+        
+        # The async routes answer like the sync ones
+        for path in ("/vault/details", "/vault/previews", "/vault/details?limit=2", "/vault/previews?limit=2&after=1", "/vault/details/2", "/vault/details/100", "/account"):
+            sync_response = self.client.get(path)
+            async_response = self.client.get(f"/async{path}")
+            self.assertEqual(async_response.status_code, sync_response.status_code, path)
+            self.assertEqual(async_response.json, sync_response.json, path)
+        
+        for data in ({"keywords": ["example"]}, {"keywords": ["ex"], "limit": 1}, {"keywords": []}):
+            sync_response = self.search_vault_entries_by_keyword(data)
+            async_response = self.client.post("/async/vault/search", json=data)
+            self.assertEqual(async_response.status_code, sync_response.status_code, data)
+            self.assertEqual(async_response.json, sync_response.json, data)
+            
+    def test_login_required(self):
+        response = self.client.get("/async/vault/details")
+        self.assertEqual(response.status_code, 401)
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
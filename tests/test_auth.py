@@ -1,4 +1,9 @@
+from config import TestConfig
 from tests import BaseTestCase, unittest
+from app import create_app
+
+class MemoryHandshakeConfig(TestConfig):
+    SCRAM_HANDSHAKE_STORE = "memory"
 
 class AuthTestCase(BaseTestCase):
     
@@ -12,6 +17,24 @@ class AuthTestCase(BaseTestCase):
         
         response = self.register_user(self.example_register_data)
         self.assertEqual(response.status_code, 409)
+        
+    def test_register_existing_email_other_case(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+        
+        data = {**self.example_register_data, "account_info": {**self.example_register_data["account_info"], "email": self.example_email.upper()}}
+        response = self.register_user(data)
+        self.assertEqual(response.status_code, 409)
+        
+        # The database enforces it too, for registrations racing past the check
+        from sqlalchemy.exc import IntegrityError
+        from app import db
+        from app.models import User
+        with self.app.app_context():
+            db.session.add(User(email=self.example_email.upper(), created_at=0))
+            with self.assertRaises(IntegrityError):
+                db.session.commit()
+            db.session.rollback()
 
     def test_login_success(self):
         response = self.register_user(self.example_register_data)
@@ -23,6 +46,70 @@ class AuthTestCase(BaseTestCase):
         self.assertEqual(response.status_code, 200)
         self.login_user_step3(response.json["server_message"])
         
+    def test_login_query_count(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+        
+        # Each handshake step loads the user and their secrets in a single query, step 2 also uses up the handshake token
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Query-Count"], "1")
+        response = self.login_user_step2(response.json["server_message"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Query-Count"], "2")
+        self.login_user_step3(response.json["server_message"])
+        
+    def test_login_handshake(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+        
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 200)
+        first_client, first_handshake_id = self.scram_client, self.handshake_id
+        first_client.set_server_first(response.json["server_message"])
+        client_final_message = first_client.get_client_final()
+        
+        # A second, concurrent handshake doesn't overwrite the first one
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 200)
+        
+        # A missing or tampered handshake ID is rejected
+        for handshake_id in (None, first_handshake_id[:-4] + "AAAA"):
+            response = self.client.post("/login/step2", json={
+                "email": self.example_email,
+                "client_message": client_final_message,
+                "handshake_id": handshake_id
+            })
+            self.assertEqual(response.status_code, 400)
+        
+        response = self.client.post("/login/step2", json={
+            "email": self.example_email,
+            "client_message": client_final_message,
+            "handshake_id": first_handshake_id
+        })
+        self.assertEqual(response.status_code, 200)
+        first_client.set_server_final(response.json["server_message"])
+        
+    def test_recovery_login_otp_single_use(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+        response = self.send_recovery_otp(self.example_email)
+        self.assertEqual(response.status_code, 200)
+        
+        # Only the hash of the OTP is stored, the OTP itself is in the queued email
+        from app.models import OneTimePassword, OutboxMail
+        with self.app.app_context():
+            otp = OutboxMail.query.one().body.split(": ")[1]
+            self.assertNotIn(otp, OneTimePassword.query.one().otp_hash)
+        
+        data = {"email": self.example_email, "recovery_password": "test", "otp": otp}
+        response = self.recovery_login({**data, "otp": "000000000" if otp != "000000000" else "111111111"})
+        self.assertEqual(response.status_code, 401)
+        response = self.recovery_login(data)
+        self.assertEqual(response.status_code, 200)
+        response = self.recovery_login(data)
+        self.assertEqual(response.status_code, 401)
+        
     def test_login_fail(self):
         response = self.login_user_step1(self.example_email, self.example_password)
         self.assertEqual(response.status_code, 404)
@@ -44,5 +131,33 @@ class AuthTestCase(BaseTestCase):
         response = self.logout_user()
         self.assertEqual(response.status_code, 401)
 
+    def test_login_handshake_single_use(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+        
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 200)
+        self.scram_client.set_server_first(response.json["server_message"])
+        data = {
+            "email": self.example_email,
+            "client_message": self.scram_client.get_client_final(),
+            "handshake_id": self.handshake_id
+        }
+        response = self.client.post("/login/step2", json=data)
+        self.assertEqual(response.status_code, 200)
+        self.login_user_step3(response.json["server_message"])
+        
+        # The handshake can't be replayed
+        response = self.client.post("/login/step2", json=data)
+        self.assertEqual(response.status_code, 400)
+
+class MemoryHandshakeTestCase(BaseTestCase):
+    
+    def setUp(self):
+        self.app = create_app(MemoryHandshakeConfig)
+        self.client = self.app.test_client()
+        
+    test_login_handshake_single_use = AuthTestCase.test_login_handshake_single_use
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
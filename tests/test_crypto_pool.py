@@ -0,0 +1,78 @@
+import time
+import werkzeug.security as wz_security
+from config import TestConfig
+from tests import BaseTestCase, unittest
+from app import create_app
+from app.util.security import CryptoPool, CryptoPoolBusy
+
+class CryptoPoolConfig(TestConfig):
+    CRYPTO_POOL_WORKERS = 1
+
+class CryptoPoolTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.pool = CryptoPool()
+        
+    def tearDown(self):
+        self.pool.shutdown()
+    
+    def test_run(self):
+        self.pool.init(workers=1, max_pending=4)
+        password_hash = self.pool.run(wz_security.generate_password_hash, "password")
+        self.assertTrue(self.pool.run(wz_security.check_password_hash, password_hash, "password"))
+        
+    def test_results(self):
+        self.pool.init(workers=2, max_pending=4)
+        # Start both processes
+        self.pool.results(self.pool.submit(time.sleep, 0.2), self.pool.submit(time.sleep, 0.2))
+        
+        start = time.perf_counter()
+        futures = [self.pool.submit(time.sleep, 0.5) for _ in range(2)]
+        self.assertEqual(self.pool.results(*futures), [None, None])
+        
+        # Both operations ran at the same time
+        self.assertLess(time.perf_counter() - start, 0.9)
+        
+    def test_inline(self):
+        self.pool.init(workers=0, max_pending=0)
+        future = self.pool.submit(wz_security.check_password_hash, "invalid", "password")
+        self.assertTrue(future.done())
+        self.assertFalse(future.result())
+        
+    def test_queue_limit(self):
+        self.pool.init(workers=1, max_pending=1)
+        future = self.pool.submit(time.sleep, 0.5)
+        with self.assertRaises(CryptoPoolBusy):
+            self.pool.submit(time.sleep, 0)
+        future.result()
+        
+        # The slot is released once the operation is done
+        time.sleep(0.1)
+        self.pool.submit(time.sleep, 0).result()
+
+class CryptoPoolRouteTestCase(BaseTestCase):
+    
+    def setUp(self):
+        self.app = create_app(CryptoPoolConfig)
+        self.client = self.app.test_client()
+        
+    def tearDown(self):
+        from app.util import security
+        security.pool.shutdown()
+        super().tearDown()
+    
+    def test_register_and_login(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+        
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 200)
+        response = self.login_user_step2(response.json["server_message"])
+        self.assertEqual(response.status_code, 200)
+        self.login_user_step3(response.json["server_message"])
+        
+        response = self.delete_account(self.example_account_delete_data)
+        self.assertEqual(response.status_code, 200)
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
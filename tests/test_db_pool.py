@@ -0,0 +1,110 @@
+import os
+import tempfile
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import NullPool
+from config import TestConfig
+from tests import BaseTestCase, unittest
+from app import create_app, db
+from app.util import db_pool
+
+class DBPoolConfig(TestConfig):
+    DB_POOL_SIZE = 2
+    DB_MAX_OVERFLOW = 0
+    DB_POOL_TIMEOUT_SECONDS = 1
+
+class DBPoolTestCase(BaseTestCase):
+
+    def setUp(self):
+        # In-memory databases have a single connection, the pool needs a file
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        DBPoolConfig.SQLALCHEMY_DATABASE_URI = f"sqlite:///{self.db_path}"
+        self.app = create_app(DBPoolConfig)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        super().tearDown()
+        with self.app.app_context():
+            db.engine.dispose()
+        os.remove(self.db_path)
+
+    def test_engine_options(self):
+        self.assertEqual(db_pool.engine_options("sqlite:///:memory:", {}, 5, 10), {})
+
+        options = db_pool.engine_options("postgresql://user:password@db/vault", {}, 5, 10)
+        self.assertEqual(options["pool_size"], 5)
+        self.assertEqual(options["max_overflow"], 10)
+        self.assertTrue(options["pool_pre_ping"])
+        self.assertNotIn("connect_args", options)
+
+        options = db_pool.engine_options("postgresql://user:password@db/vault", {"DB_POOL_CLASS": "null", "DB_PGBOUNCER": True}, 5, 10)
+        self.assertIs(options["poolclass"], NullPool)
+        self.assertNotIn("pool_size", options)
+        self.assertNotIn("connect_args", options)  # psycopg2 doesn't prepare statements
+
+        options = db_pool.engine_options("postgresql+asyncpg://user:password@db/vault", {"DB_PGBOUNCER": True}, 5, 10)
+        self.assertEqual(options["connect_args"]["statement_cache_size"], 0)
+        self.assertEqual(options["connect_args"]["prepared_statement_cache_size"], 0)
+
+        with self.assertRaises(ValueError):
+            db_pool.engine_options("postgresql://user:password@db/vault", {"DB_POOL_CLASS": "lifo"}, 5, 10)
+
+    def test_prewarm(self):
+        with self.app.app_context():
+            db.engine.dispose()
+            self.assertEqual(db_pool.prewarm(db.engine, 10), 2)  # Bounded by the pool size
+            stats = db_pool.get_stats(db.engine)
+            self.assertEqual(stats["pool"], "MeteredQueuePool")
+            self.assertEqual(stats["idle"], 2)
+            self.assertEqual(stats["checked_out"], 0)
+
+    def test_waits_and_timeouts(self):
+        with self.app.app_context():
+            engine = db.engine
+            before = db_pool.get_stats(engine)
+            first, second = engine.raw_connection(), engine.raw_connection()
+            self.assertEqual(db_pool.get_stats(engine)["checked_out"], 2)
+
+            # The pool is exhausted, the next checkout waits until a connection is returned
+            threading.Timer(0.05, second.close).start()
+            third = engine.raw_connection()
+            stats = db_pool.get_stats(engine)
+            self.assertEqual(stats["waits"], before["waits"] + 1)
+            self.assertGreater(stats["wait_seconds"], before["wait_seconds"])
+
+            # Or gives up after the pool timeout
+            start = time.perf_counter()
+            with self.assertRaises(exc.TimeoutError):
+                engine.raw_connection()
+            self.assertGreaterEqual(time.perf_counter() - start, 1)
+            stats = db_pool.get_stats(engine)
+            self.assertEqual(stats["waits"], before["waits"] + 2)
+            self.assertEqual(stats["timeouts"], before["timeouts"] + 1)
+            self.assertEqual(stats["checkouts"], before["checkouts"] + 3)
+
+            first.close()
+            third.close()
+            self.assertEqual(db_pool.get_stats(engine)["checked_out"], 0)
+
+    def test_stats_survive_dispose(self):
+        with self.app.app_context():
+            db.engine.raw_connection().close()
+            checkouts = db_pool.get_stats(db.engine)["checkouts"]
+            db.engine.dispose()
+            self.assertEqual(db_pool.get_stats(db.engine)["checkouts"], checkouts)
+
+    def test_pool_metrics(self):
+        from prometheus_client import REGISTRY
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+
+        # Set at the end of every request
+        self.assertEqual(REGISTRY.get_sample_value("vaultberry_db_pool_size", {"bind": "primary"}), 2)
+        self.assertEqual(REGISTRY.get_sample_value("vaultberry_db_pool_connections", {"bind": "primary", "state": "checked_out"}), 0)
+        self.assertEqual(REGISTRY.get_sample_value("vaultberry_db_pool_connections", {"bind": "primary", "state": "idle"}), 1)
+        self.assertEqual(REGISTRY.get_sample_value("vaultberry_db_pool_connections", {"bind": "primary", "state": "overflow"}), 0)
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,133 @@
+import socketserver
+import threading
+from config import TestConfig
+from tests import BaseTestCase, unittest
+from app import create_app, db
+
+class SmtpStubHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP for smtplib, recording the received messages."""
+    
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+        
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 stub")
+        data, in_data = [], False
+        for line in self.rfile:
+            if in_data:
+                if line == b".\r\n":
+                    self.server.messages.append(b"".join(data).decode())
+                    data, in_data = [], False
+                    self.reply("250 OK")
+                else:
+                    data.append(line)
+                continue
+            command = line[:4].upper()
+            if command in (b"EHLO", b"HELO"):
+                self.reply("250 stub")
+            elif command == b"MAIL" and self.server.reject:
+                self.reply("451 Try again later")
+            elif command == b"DATA":
+                in_data = True
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+            elif command == b"QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+class SmtpStub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SmtpStubHandler)
+        self.connections = 0
+        self.messages = []
+        self.reject = False
+
+class MailOutboxTestCase(BaseTestCase):
+    
+    def setUp(self):
+        self.smtp = SmtpStub()
+        threading.Thread(target=self.smtp.serve_forever, daemon=True).start()
+        
+        class MailOutboxConfig(TestConfig):
+            BASE_URL = "https://localhost"
+            MAIL_SERVER = "127.0.0.1"
+            MAIL_PORT = self.smtp.server_address[1]
+            MAIL_USE_SSL = False
+            MAIL_SUPPRESS_SEND = False
+            MAIL_DEFAULT_SENDER = "noreply@vaultberry.test"
+        self.app = create_app(MailOutboxConfig)
+        self.client = self.app.test_client()
+        
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+        
+    def tearDown(self):
+        super().tearDown()
+        self.smtp.shutdown()
+        self.smtp.server_close()
+        
+    def send_pending(self):
+        from app.util import mail_outbox
+        with self.app.app_context():
+            return mail_outbox.send_pending_from_config()
+        
+    def get_outbox(self):
+        from app.models import OutboxMail
+        with self.app.app_context():
+            return [(mail.attempts, mail.sent_at is not None, mail.body) for mail in OutboxMail.query.order_by(OutboxMail.id)]
+        
+    def test_send_batch(self):
+        response = self.send_activation_email(self.example_email)
+        self.assertEqual(response.status_code, 200)
+        response = self.send_recovery_otp(self.example_email)
+        self.assertEqual(response.status_code, 200)
+        
+        # Nothing is sent by the requests themselves
+        self.assertEqual(self.smtp.messages, [])
+        self.assertEqual([sent for _, sent, _ in self.get_outbox()], [False, False])
+        
+        # Both mails are sent over one connection, and their bodies are cleared
+        self.assertEqual(self.send_pending(), (2, 0))
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertEqual(len(self.smtp.messages), 2)
+        self.assertIn("Verify Your Email Address", self.smtp.messages[0])
+        self.assertIn("Your Recovery OTP", self.smtp.messages[1])
+        self.assertEqual(self.get_outbox(), [(1, True, None), (1, True, None)])
+        self.assertEqual(self.send_pending(), (0, 0))
+        
+    def test_retry_with_backoff(self):
+        self.smtp.reject = True
+        response = self.send_recovery_otp(self.example_email)
+        self.assertEqual(response.status_code, 200)
+        
+        # The failed mail is kept and only retried once its backoff has passed
+        self.assertEqual(self.send_pending(), (0, 1))
+        self.assertEqual(self.send_pending(), (0, 0))
+        attempts, sent, body = self.get_outbox()[0]
+        self.assertEqual((attempts, sent), (1, False))
+        self.assertIn("Your OTP is", body)
+        
+        from app.models import OutboxMail
+        self.smtp.reject = False
+        with self.app.app_context():
+            OutboxMail.query.update({"next_attempt_at": 0})
+            db.session.commit()
+        self.assertEqual(self.send_pending(), (1, 0))
+        self.assertEqual(len(self.smtp.messages), 1)
+        
+    def test_smtp_outage(self):
+        self.smtp.shutdown()
+        self.smtp.server_close()
+        
+        response = self.send_recovery_otp(self.example_email)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.send_pending(), (0, 1))
+        self.assertEqual(self.get_outbox()[0][:2], (1, False))
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,51 @@
+from prometheus_client import REGISTRY
+from config import TestConfig
+from tests import BaseTestCase, unittest
+from app import create_app
+
+class MetricsConfig(TestConfig):
+    METRICS_TOKEN = "test token"
+
+class MetricsTestCase(BaseTestCase):
+    
+    def setUp(self):
+        self.app = create_app(MetricsConfig)
+        self.client = self.app.test_client()
+        
+    def get_sample(self, name, **labels) -> float:
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+        
+    def test_protected(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 302)  # To the admin login
+        response = self.client.get("/metrics", headers={"Authorization": "Bearer wrong token"})
+        self.assertEqual(response.status_code, 302)
+        response = self.client.get("/metrics", headers={"Authorization": "Bearer test token"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        
+    def test_login_metrics(self):
+        logins = self.get_sample("vaultberry_requests_total", blueprint="auth", route="/login/step2", method="POST", status="200")
+        hashes = self.get_sample("vaultberry_crypto_duration_seconds_count", operation="password_hash")
+        scram_finals = self.get_sample("vaultberry_crypto_duration_seconds_count", operation="scram_server_final")
+        decryptions = self.get_sample("vaultberry_crypto_duration_seconds_count", operation="fernet_decrypt")
+        
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 200)
+        response = self.login_user_step2(response.json["server_message"])
+        self.assertEqual(response.status_code, 200)
+        
+        self.assertEqual(self.get_sample("vaultberry_requests_total", blueprint="auth", route="/login/step2", method="POST", status="200"), logins + 1)
+        self.assertEqual(self.get_sample("vaultberry_crypto_duration_seconds_count", operation="password_hash"), hashes + 2)
+        self.assertEqual(self.get_sample("vaultberry_crypto_duration_seconds_count", operation="scram_server_final"), scram_finals + 1)
+        self.assertGreater(self.get_sample("vaultberry_crypto_duration_seconds_count", operation="fernet_decrypt"), decryptions)
+        self.assertGreater(self.get_sample("vaultberry_request_db_queries_sum", blueprint="auth", route="/register"), 0)
+        
+        # Exported in the text format
+        response = self.client.get("/metrics", headers={"Authorization": "Bearer test token"})
+        self.assertIn('vaultberry_request_duration_seconds_bucket{blueprint="auth",le="0.005",method="POST",route="/login/step2"}', response.get_data(as_text=True))
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import flask_migrate
+from sqlalchemy import inspect
+from config import TestConfig
+from tests import BaseTestCase, unittest
+from app import create_app, db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+class MigrationConfig(TestConfig):
+    pass
+
+class MigrationTestCase(BaseTestCase):
+
+    def setUp(self):
+        # Alembic runs on its own connection, the tables must be in a file
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        MigrationConfig.SQLALCHEMY_DATABASE_URI = f"sqlite:///{self.db_path}"
+        self.app = create_app(MigrationConfig)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        super().tearDown()
+        with self.app.app_context():
+            db.engine.dispose()
+        os.remove(self.db_path)
+
+    def test_upgrade_after_create_all(self):
+        # create_app already created the tables with the current layout
+        with self.app.app_context():
+            flask_migrate.upgrade(directory=MIGRATIONS_DIR)
+            inspector = inspect(db.engine)
+            columns = {column["name"] for column in inspector.get_columns("otps")}
+            self.assertIn("otp_hash", columns)
+            self.assertNotIn("otp", columns)
+            self.assertEqual(db.session.execute(db.text("SELECT version_num FROM alembic_version")).scalar(), self.head())
+
+    def head(self) -> str:
+        from alembic.config import Config
+        from alembic.script import ScriptDirectory
+        config = Config()
+        config.set_main_option("script_location", MIGRATIONS_DIR)
+        return ScriptDirectory.from_config(config).get_current_head()
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
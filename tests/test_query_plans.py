@@ -0,0 +1,100 @@
+from sqlalchemy import select, update, func, text
+from tests import BaseTestCase, unittest
+from app import db
+
+class QueryPlanTestCase(BaseTestCase):
+    """Runs EXPLAIN on every hot query and fails if any of them falls back to a sequential scan."""
+    
+    seeded_users = 20
+    seeded_entries_per_user = 50
+    
+    def setUp(self):
+        super().setUp()
+        from app import models  # Models can only be imported after the app is created
+        self.models = models
+        with self.app.app_context():
+            self.seed()
+    
+    def seed(self):
+        User, Secret, OneTimePassword, VaultEntry, VaultTombstone = self.get_models()
+        from app.util import security
+        users = [User(email=f"user{i}@email.com", created_at=0) for i in range(self.seeded_users)]
+        db.session.add_all(users)
+        db.session.flush()
+        for user in users:
+            Secret.create_default_secrets(user.id)
+            db.session.add_all([
+                VaultEntry(user_id=user.id, last_modified=i, title=f"Entry {i}", url=f"www.site{i}.com")
+                for i in range(self.seeded_entries_per_user)
+            ])
+            db.session.add_all([
+                OneTimePassword(user_id=user.id, type="RECOVERY", otp_hash=security.otp_hasher.hash(str(i)), created_at=i, expires_at=i + 300)
+                for i in range(5)
+            ])
+            db.session.add(VaultTombstone(user_id=user.id, entry_id=10000, deleted_at=0))
+        db.session.commit()
+    
+    def get_models(self):
+        return self.models.User, self.models.Secret, self.models.OneTimePassword, self.models.VaultEntry, self.models.VaultTombstone
+    
+    def get_plan(self, statement) -> list[str]:
+        dialect = db.engine.dialect
+        sql = str(statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+        if dialect.name == "sqlite":
+            return [row[-1] for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+        db.session.execute(text("SET LOCAL enable_seqscan = off"))
+        return [row[0] for row in db.session.execute(text(f"EXPLAIN {sql}"))]
+    
+    def assertUsesIndex(self, statement):
+        with self.app.app_context():
+            plan = self.get_plan(statement)
+            full_scans = [step for step in plan if step.startswith("SCAN ") or "Seq Scan" in step]
+            self.assertEqual(full_scans, [], f"Sequential scan in query plan: {plan}")
+            
+    def test_user_by_email(self):
+        User, Secret, OneTimePassword, VaultEntry, VaultTombstone = self.get_models()
+        self.assertUsesIndex(select(User).where(func.lower(User.email) == "user1@email.com").order_by(User.id).limit(1))
+        
+    def test_user_secrets(self):
+        User, Secret, OneTimePassword, VaultEntry, VaultTombstone = self.get_models()
+        self.assertUsesIndex(select(Secret).where(Secret.user_id == 1))
+        self.assertUsesIndex(select(Secret).where(Secret.user_id == 1, Secret.type == "TOTP"))
+        
+    def test_entry_by_id(self):
+        User, Secret, OneTimePassword, VaultEntry, VaultTombstone = self.get_models()
+        self.assertUsesIndex(select(VaultEntry).where(VaultEntry.user_id == 1, VaultEntry.id == 5))
+        
+    def test_entry_by_title(self):
+        User, Secret, OneTimePassword, VaultEntry, VaultTombstone = self.get_models()
+        self.assertUsesIndex(select(VaultEntry).where(VaultEntry.user_id == 1, VaultEntry.title == "Entry 5"))
+        
+    def test_entries_of_user(self):
+        User, Secret, OneTimePassword, VaultEntry, VaultTombstone = self.get_models()
+        self.assertUsesIndex(select(VaultEntry).where(VaultEntry.user_id == 1))
+        
+    def test_entries_page(self):
+        User, Secret, OneTimePassword, VaultEntry, VaultTombstone = self.get_models()
+        self.assertUsesIndex(select(VaultEntry).where(VaultEntry.user_id == 1, VaultEntry.id > 10).order_by(VaultEntry.id).limit(20))
+        
+    def test_entries_changed_since(self):
+        User, Secret, OneTimePassword, VaultEntry, VaultTombstone = self.get_models()
+        self.assertUsesIndex(select(VaultEntry).where(VaultEntry.user_id == 1, VaultEntry.last_modified >= 25).order_by(VaultEntry.id))
+        
+    def test_tombstones_since(self):
+        User, Secret, OneTimePassword, VaultEntry, VaultTombstone = self.get_models()
+        self.assertUsesIndex(select(VaultTombstone.entry_id).where(VaultTombstone.user_id == 1, VaultTombstone.deleted_at >= 0))
+        
+    def test_otp_by_hash(self):
+        User, Secret, OneTimePassword, VaultEntry, VaultTombstone = self.get_models()
+        self.assertUsesIndex(
+            update(OneTimePassword)
+            .where(OneTimePassword.user_id == 1, OneTimePassword.otp_hash == "0" * 64, OneTimePassword.used.is_(False), OneTimePassword.expires_at > 0)
+            .values(used=True)
+        )
+        
+    def test_otps_of_user(self):
+        User, Secret, OneTimePassword, VaultEntry, VaultTombstone = self.get_models()
+        self.assertUsesIndex(select(OneTimePassword).where(OneTimePassword.user_id == 1))
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
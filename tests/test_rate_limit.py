@@ -0,0 +1,154 @@
+import importlib.util
+from unittest.mock import patch
+from config import TestConfig
+from tests import BaseTestCase, unittest
+from app import create_app
+from app.util.rate_limit import MemoryRateLimiter
+
+class RateLimitConfig(TestConfig):
+    RATE_LIMITS = {
+        **TestConfig.RATE_LIMITS,
+        "login": {"ip": (100, 60), "account": (2, 60)},
+        "recovery_login": {"ip": (2, 60)},
+        "account_delete": {"ip": (100, 60), "account": (1, 60)}
+    }
+
+class MemoryRateLimiterTestCase(unittest.TestCase):
+    
+    def test_burst_and_refill(self):
+        limiter = MemoryRateLimiter()
+        with patch("time.monotonic", return_value=1000.0):
+            self.assertEqual(limiter.acquire("key", 2, 60), 0)
+            self.assertEqual(limiter.acquire("key", 2, 60), 0)
+            self.assertAlmostEqual(limiter.acquire("key", 2, 60), 30)
+            self.assertEqual(limiter.acquire("other", 2, 60), 0)
+        
+        # One token is back after half the period
+        with patch("time.monotonic", return_value=1030.0):
+            self.assertEqual(limiter.acquire("key", 2, 60), 0)
+            self.assertAlmostEqual(limiter.acquire("key", 2, 60), 30)
+    
+    def test_max_entries(self):
+        limiter = MemoryRateLimiter(max_entries=2)
+        for key in ("a", "b", "c"):
+            limiter.acquire(key, 1, 60)
+        self.assertEqual(len(limiter), 2)
+        
+        # The least recently used bucket was dropped
+        self.assertEqual(limiter.acquire("a", 1, 60), 0)
+        self.assertGreater(limiter.acquire("c", 1, 60), 0)
+
+class RateLimitTestCase(BaseTestCase):
+    
+    def setUp(self):
+        self.app = create_app(RateLimitConfig)
+        self.client = self.app.test_client()
+        
+    def test_login_rejected_before_db(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+        
+        for _ in range(2):
+            response = self.login_user_step1(self.example_email, self.example_password)
+            self.assertEqual(response.status_code, 200)
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "30")
+        self.assertEqual(response.headers["X-Query-Count"], "0")
+        
+        # The account bucket is shared by all the spellings of the email
+        response = self.login_user_step1(self.example_email.upper(), self.example_password)
+        self.assertEqual(response.status_code, 429)
+        
+    def test_account_delete_rejected_before_db(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 200)
+        response = self.login_user_step2(response.json["server_message"])
+        self.assertEqual(response.status_code, 200)
+        self.login_user_step3(response.json["server_message"])
+        
+        response = self.delete_account({"password": "wrong"})
+        self.assertEqual(response.status_code, 401)
+        
+        # The user isn't loaded for a throttled request
+        response = self.delete_account({"password": "wrong"})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["X-Query-Count"], "0")
+        
+    def test_client_limit(self):
+        for email in ("a@example.com", "b@example.com"):
+            response = self.recovery_login({"email": email, "recovery_password": "test", "otp": "123456"})
+            self.assertEqual(response.status_code, 404)
+        response = self.recovery_login({"email": "c@example.com", "recovery_password": "test", "otp": "123456"})
+        self.assertEqual(response.status_code, 429)
+        
+        # Other clients are not affected
+        self.client.environ_base["REMOTE_ADDR"] = "10.0.0.2"
+        response = self.recovery_login({"email": "c@example.com", "recovery_password": "test", "otp": "123456"})
+        self.assertEqual(response.status_code, 404)
+        
+    def test_email_cooldown(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+        
+        response = self.send_recovery_otp(self.example_email)
+        self.assertEqual(response.status_code, 200)
+        response = self.send_recovery_otp(self.example_email)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], str(24 * 60 * 60))
+        self.assertIn("Please try again in 24 hours", response.json["error"])
+        
+        # The activation email has its own cooldown
+        response = self.send_activation_email(self.example_email)
+        self.assertEqual(response.status_code, 200)
+        response = self.send_activation_email(self.example_email)
+        self.assertEqual(response.status_code, 429)
+        
+    def test_email_cooldown_across_workers(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+        
+        response = self.send_recovery_otp(self.example_email)
+        self.assertEqual(response.status_code, 200)
+        
+        # Another worker has its own empty buckets, the last OTP still enforces the cooldown
+        with patch("app.util.rate_limit.limiter", MemoryRateLimiter()):
+            response = self.send_recovery_otp(self.example_email)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response.headers["Retry-After"]), 24 * 60 * 60 - 60)
+
+@unittest.skipUnless(importlib.util.find_spec("redis"), "redis is not installed")
+class RedisRateLimiterTestCase(unittest.TestCase):
+    
+    def test_fallback_to_local_buckets(self):
+        from flask import Flask
+        from app.util.rate_limit import RedisRateLimiter
+        
+        # Nothing listens on the port, so the local stand-in counts
+        limiter = RedisRateLimiter("redis://127.0.0.1:1")
+        with Flask(__name__).app_context():
+            self.assertEqual(limiter.acquire("key", 1, 60), 0)
+            self.assertGreater(limiter.acquire("key", 1, 60), 0)
+    
+    def test_backoff_after_failure(self):
+        from flask import Flask
+        from app.util.rate_limit import RedisRateLimiter
+        
+        limiter = RedisRateLimiter("redis://127.0.0.1:1", backoff_seconds=30)
+        with Flask(__name__).app_context(), patch.object(limiter, "_script", side_effect=ConnectionError) as script:
+            with patch("time.monotonic", return_value=1000.0):
+                self.assertEqual(limiter.acquire("key", 2, 60), 0)
+                self.assertEqual(script.call_count, 1)
+            
+            # The store is skipped until the backoff is over
+            with patch("time.monotonic", return_value=1029.0):
+                self.assertEqual(limiter.acquire("key", 2, 60), 0)
+                self.assertEqual(script.call_count, 1)
+            with patch("time.monotonic", return_value=1031.0):
+                limiter.acquire("key", 2, 60)
+                self.assertEqual(script.call_count, 2)
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
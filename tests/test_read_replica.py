@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+from flask import Response, g
+from config import TestConfig
+from tests import BaseTestCase, unittest
+from app import create_app, db
+from app.routing_session import REPLICA_BIND
+from app.util import read_replica
+
+class ReadReplicaConfig(TestConfig):
+    READ_YOUR_WRITES_SECONDS = 60
+
+class ReadReplicaTestCase(BaseTestCase):
+
+    def setUp(self):
+        # Two database files, the replica is only updated by replicate()
+        self.db_paths = []
+        for _ in range(2):
+            fd, path = tempfile.mkstemp(suffix=".db")
+            os.close(fd)
+            self.db_paths.append(path)
+        ReadReplicaConfig.SQLALCHEMY_DATABASE_URI = f"sqlite:///{self.db_paths[0]}"
+        ReadReplicaConfig.REPLICA_DATABASE_URI = f"sqlite:///{self.db_paths[1]}"
+        self.app = create_app(ReadReplicaConfig)
+        self.client = self.app.test_client()
+        self.replicate()
+
+    def tearDown(self):
+        super().tearDown()
+        with self.app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+        for path in self.db_paths:
+            os.remove(path)
+
+    def replicate(self):
+        with self.app.app_context():
+            db.engines[REPLICA_BIND].dispose()
+        shutil.copyfile(*self.db_paths)
+
+    def unpin(self):
+        self.client.delete_cookie(read_replica.PIN_COOKIE)
+
+    def login(self, email, password):
+        response = self.login_user_step1(email, password)
+        self.assertEqual(response.status_code, 200)
+        response = self.login_user_step2(response.json["server_message"])
+        self.assertEqual(response.status_code, 200)
+        self.login_user_step3(response.json["server_message"])
+
+    def test_routing(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNotNone(self.client.get_cookie(read_replica.PIN_COOKIE))
+        self.replicate()
+        self.login(self.example_email, self.example_password)
+
+        # The client reads its own writes from the primary
+        response = self.add_vault_entry(self.example_entry_data1)
+        self.assertEqual(response.status_code, 201)
+        response = self.get_all_vault_entry_details()
+        self.assertEqual(len(response.json), 1)
+
+        # Then from the replica, which hasn't caught up yet
+        self.unpin()
+        response = self.get_all_vault_entry_details()
+        self.assertEqual(response.json, [])
+
+        # Unless it asks for the primary
+        response = self.client.get("/vault/details", headers={read_replica.PIN_HEADER: "primary"})
+        self.assertEqual(len(response.json), 1)
+        self.assertIsNone(self.client.get_cookie(read_replica.PIN_COOKIE))
+
+        # The sync changes always come from the primary
+        response = self.get_vault_changes()
+        self.assertEqual(len(response.json["entries"]), 1)
+
+        self.replicate()
+        response = self.get_all_vault_entry_details()
+        self.assertEqual(len(response.json), 1)
+
+    def test_login_lookup(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+
+        # The first login step looks the user up on the replica
+        self.unpin()
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 404)
+
+        self.replicate()
+        self.login(self.example_email, self.example_password)
+        response = self.client.get("/account")
+        self.assertEqual(response.status_code, 200)
+
+    def test_session_writes(self):
+        # The session backend reads the session it writes after the view, which must not come from the replica
+        with self.app.test_request_context("/account", method="GET"):
+            read_replica.select_reads()
+            self.assertEqual(g.db_reads, REPLICA_BIND)
+            read_replica.pin_after_writes(Response())
+            self.assertEqual(g.db_reads, "primary")
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,102 @@
+import datetime
+from sqlalchemy import Table, Column, Integer, String, LargeBinary, DateTime, MetaData, insert, select, func
+from config import TestConfig
+from tests import BaseTestCase, unittest
+from app import create_app, db
+
+class RetentionConfig(TestConfig):
+    RETENTION_BATCH_SIZE = 2  # Several batches per table
+
+class RetentionTestCase(BaseTestCase):
+    
+    def setUp(self):
+        self.app = create_app(RetentionConfig)
+        self.client = self.app.test_client()
+        from app import models  # Models can only be imported after the app is created
+        self.models = models
+        self.sessions = Table(
+            "sessions", MetaData(),
+            Column("id", Integer, primary_key=True),
+            Column("session_id", String(255)),
+            Column("data", LargeBinary),
+            Column("expiry", DateTime)
+        )
+        with self.app.app_context():
+            self.sessions.create(db.engine)
+            self.seed()
+            
+    def tearDown(self):
+        with self.app.app_context():
+            self.sessions.drop(db.engine)
+        super().tearDown()
+            
+    def seed(self):
+        from app.util import get_now_timestamp
+        now = get_now_timestamp()
+        old = now - 2*24*60*60
+        user = self.models.User(email=self.example_email, created_at=now)
+        db.session.add(user)
+        db.session.flush()
+        
+        OneTimePassword = self.models.OneTimePassword
+        db.session.add_all([
+            OneTimePassword(user_id=user.id, type="RECOVERY", otp_hash=f"used{i}", created_at=old, expires_at=now + 300, used=True)
+            for i in range(3)
+        ] + [
+            OneTimePassword(user_id=user.id, type="RECOVERY", otp_hash=f"expired{i}", created_at=old, expires_at=old + 300, used=False)
+            for i in range(2)
+        ] + [
+            # Kept: still valid, or within the retention period
+            OneTimePassword(user_id=user.id, type="ACTIVATION", otp_hash="valid", created_at=old, expires_at=now + 300, used=False),
+            OneTimePassword(user_id=user.id, type="RECOVERY", otp_hash="recent", created_at=now, expires_at=now - 1, used=True)
+        ])
+        
+        OutboxMail = self.models.OutboxMail
+        for created_at, sent_at, attempts in [(old - 7*24*60*60, old, 1), (old - 7*24*60*60, None, 8), (old - 7*24*60*60, None, 1), (now, now, 1)]:
+            db.session.add(OutboxMail(recipients="[]", subject="", created_at=created_at, next_attempt_at=created_at, sent_at=sent_at, attempts=attempts))
+        
+        VaultTombstone = self.models.VaultTombstone
+        db.session.add_all([VaultTombstone(user_id=user.id, entry_id=i, deleted_at=now - (31*24*60*60 if i < 3 else 60)) for i in range(4)])
+        
+        ReencryptionJob, ReencryptionChunk = self.models.ReencryptionJob, self.models.ReencryptionChunk
+        for expires_at, chunk_count in [(now - 60, 3), (now + 3600, 1)]:
+            job = ReencryptionJob(user_id=user.id, total_entries=0, created_at=now - 3600, expires_at=expires_at)
+            job.chunks = [ReencryptionChunk(chunk_number=i, entries="[]") for i in range(chunk_count)]
+            db.session.add(job)
+        
+        UsedHandshake = self.models.UsedHandshake
+        db.session.add_all([UsedHandshake(nonce_hash=f"h{i}", expires_at=now + (-60 if i < 3 else 60)) for i in range(4)])
+        
+        utcnow = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        db.session.execute(insert(self.sessions), [
+            {"session_id": f"s{i}", "data": b"", "expiry": utcnow + datetime.timedelta(minutes=-5 if i < 3 else 5)}
+            for i in range(5)
+        ])
+        db.session.commit()
+        
+    def test_purge(self):
+        result = self.app.test_cli_runner().invoke(args=["retention", "purge"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("otps: deleted 5 rows", result.output)
+        self.assertIn("sessions: deleted 3 rows", result.output)
+        self.assertIn("mail_outbox: deleted 2 rows", result.output)
+        self.assertIn("vault_tombstones: deleted 3 rows", result.output)
+        self.assertIn("reencryption_jobs: deleted 1 rows", result.output)
+        self.assertIn("used_handshakes: deleted 3 rows", result.output)
+        
+        with self.app.app_context():
+            OneTimePassword = self.models.OneTimePassword
+            self.assertEqual(sorted(otp.otp_hash for otp in OneTimePassword.query), ["recent", "valid"])
+            self.assertEqual(self.models.OutboxMail.query.count(), 2)
+            self.assertEqual([tombstone.entry_id for tombstone in self.models.VaultTombstone.query], [3])
+            self.assertEqual(self.models.ReencryptionJob.query.count(), 1)
+            self.assertEqual(self.models.ReencryptionChunk.query.count(), 1)
+            self.assertEqual(self.models.UsedHandshake.query.count(), 1)
+            self.assertEqual(db.session.scalar(select(func.count()).select_from(self.sessions)), 2)
+        
+        # Nothing is left to purge
+        result = self.app.test_cli_runner().invoke(args=["retention", "purge"])
+        self.assertIn("otps: deleted 0 rows", result.output)
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
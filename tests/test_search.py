@@ -0,0 +1,100 @@
+from sqlalchemy import event
+from config import TestConfig
+from tests import BaseTestCase, unittest
+from app import create_app, db
+
+class MemorySearchConfig(TestConfig):
+    VAULT_SEARCH_BACKEND = "memory"
+
+class MemorySearchTestCase(BaseTestCase):
+    
+    def setUp(self):
+        self.app = create_app(MemorySearchConfig)
+        self.client = self.app.test_client()
+        
+    def login(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 200)
+        response = self.login_user_step2(response.json["server_message"])
+        self.assertEqual(response.status_code, 200)
+        self.login_user_step3(response.json["server_message"])
+        
+    def count_entry_queries(self, request):
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if "FROM entries" in statement:
+                statements.append(statement)
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            response = request()
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        return response, len(statements)
+    
+    def test_search_served_from_memory(self):
+        self.login()
+        for entry in (self.example_entry_data1, self.example_entry_data2, self.example_entry_data3, self.example_entry_data4):
+            response = self.add_vault_entry(entry)
+            self.assertEqual(response.status_code, 201)
+        
+        # The first search builds the index
+        response, queries = self.count_entry_queries(lambda: self.search_vault_entries_by_keyword(self.example_keywords_data))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 3)
+        self.assertEqual(queries, 1)
+        
+        # The next ones don't touch the database
+        response, queries = self.count_entry_queries(lambda: self.search_vault_entries_by_keyword({"keywords": ["ent"]}))
+        self.assertEqual(sorted(entry["title"] for entry in response.json), ["Entry 1", "Entry 2"])
+        self.assertEqual(queries, 0)
+        
+    def test_index_follows_writes(self):
+        self.login()
+        response = self.add_vault_entry(self.example_entry_data1)
+        self.assertEqual(response.status_code, 201)
+        id1 = response.json["id"]
+        response = self.search_vault_entries_by_keyword({"keywords": ["account"]})
+        self.assertEqual(len(response.json), 1)
+        
+        response = self.add_vault_entry(self.example_entry_data2)
+        self.assertEqual(response.status_code, 201)
+        id2 = response.json["id"]
+        response = self.search_vault_entries_by_keyword({"keywords": ["account"]})
+        self.assertEqual(len(response.json), 2)
+        
+        response = self.update_vault_entry(id1, {"title": "Renamed"})
+        self.assertEqual(response.status_code, 200)
+        response = self.delete_vault_entry(id2)
+        self.assertEqual(response.status_code, 200)
+        response = self.search_vault_entries_by_keyword({"keywords": ["account"]})
+        self.assertEqual(response.json, [])
+        response = self.search_vault_entries_by_keyword({"keywords": ["renamed"]})
+        self.assertEqual([entry["title"] for entry in response.json], ["Renamed"])
+        
+    def test_memory_cap(self):
+        from app.util.search import MemorySearchEngine, NgramIndex
+        indexes = []
+        for user_id in range(1, 4):
+            index = NgramIndex()
+            index.add(1, f"Title of user {user_id}", "www.website.com", None, {"title": f"Title of user {user_id}"})
+            indexes.append(index)
+        
+        # Room for two indexes
+        engine = MemorySearchEngine(max_bytes=indexes[0].size_bytes * 2 + 100)
+        for user_id, index in enumerate(indexes, start=1):
+            with engine._lock:
+                engine._store(user_id, index)
+        
+        # The least recently used index was evicted
+        self.assertLessEqual(engine.size_bytes, engine.max_bytes)
+        self.assertIn(2, engine._indexes)
+        self.assertIn(3, engine._indexes)
+        self.assertNotIn(1, engine._indexes)
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,67 @@
+import time
+import unittest
+from unittest.mock import patch
+from app.util.security import SecretCache
+
+class SecretCacheTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.cache = SecretCache(max_entries=2, ttl_seconds=60)
+        
+    def test_get_or_decrypt(self):
+        decrypted = []
+        def decrypt(ciphertext):
+            decrypted.append(ciphertext)
+            return b"plain-" + ciphertext
+        
+        self.assertEqual(self.cache.get_or_decrypt((1, "TOTP"), b"a", decrypt), b"plain-a")
+        self.assertEqual(self.cache.get_or_decrypt((1, "TOTP"), b"a", decrypt), b"plain-a")
+        self.assertEqual(decrypted, [b"a"])
+        
+        # A changed ciphertext is never served from the cache
+        self.assertEqual(self.cache.get_or_decrypt((1, "TOTP"), b"b", decrypt), b"plain-b")
+        self.assertEqual(decrypted, [b"a", b"b"])
+        
+    def test_invalidate_wipes_plaintext(self):
+        self.cache.put((1, "TOTP"), b"a", b"secret")
+        buffer = self.cache._entries[(1, "TOTP")][1]
+        self.cache.invalidate((1, "TOTP"))
+        self.assertIsNone(self.cache.get((1, "TOTP"), b"a"))
+        self.assertEqual(buffer, bytearray(6))
+        
+    def test_eviction(self):
+        self.cache.put(1, b"a", b"1")
+        self.cache.put(2, b"b", b"2")
+        self.cache.get(1, b"a")
+        buffer = self.cache._entries[2][1]
+        self.cache.put(3, b"c", b"3")
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNone(self.cache.get(2, b"b"))
+        self.assertEqual(buffer, bytearray(1))
+        self.assertEqual(self.cache.get(1, b"a"), b"1")
+        
+    def test_expiry(self):
+        self.cache.init(max_entries=2, ttl_seconds=1)
+        self.cache.put(1, b"a", b"1")
+        self.cache._entries[1] = self.cache._entries[1][:2] + (time.monotonic() - 1,)
+        self.assertIsNone(self.cache.get(1, b"a"))
+        self.assertEqual(len(self.cache), 0)
+        
+    def test_sweep_on_put(self):
+        with patch("time.monotonic", return_value=1000.0):
+            self.cache.put(1, b"a", b"1")
+        buffer = self.cache._entries[1][1]
+        
+        # The next put after the TTL wipes the expired entry without it being looked up
+        with patch("time.monotonic", return_value=1061.0):
+            self.cache.put(2, b"b", b"2")
+        self.assertNotIn(1, self.cache._entries)
+        self.assertEqual(buffer, bytearray(1))
+        
+    def test_disabled(self):
+        self.cache.init(max_entries=0, ttl_seconds=60)
+        self.cache.put(1, b"a", b"1")
+        self.assertIsNone(self.cache.get(1, b"a"))
+        
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,40 @@
+from tests import BaseTestCase, unittest
+
+class SecurityTestCase(BaseTestCase):
+    
+    def test_calibrate(self):
+        result = self.app.test_cli_runner().invoke(args=["security", "calibrate", "--target-ms", "1", "--scram-target-ms", "1", "--hash", "pbkdf2"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        settings = dict(line.split("=", 1) for line in result.output.splitlines() if not line.startswith("#"))
+        self.assertTrue(settings["PASSWORD_HASH_METHOD"].startswith("pbkdf2:sha256:"))
+        self.assertGreaterEqual(int(settings["KDF_ITERATIONS"]), 100000)
+        self.assertGreaterEqual(int(settings["SCRAM_ITERATIONS"]), 4096)
+        
+    def test_rehash_on_check(self):
+        from app.util import security
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+        response = self.send_recovery_otp(self.example_email)
+        self.assertEqual(response.status_code, 200)
+        
+        from app.models import User, OutboxMail
+        with self.app.app_context():
+            otp = OutboxMail.query.one().body.split(": ")[1]
+            old_hash = User.get_by_email(self.example_email).hashed_password
+        
+        # Raise the cost, the recovery password hash is upgraded on the next successful check
+        security.hasher.init("pbkdf2:sha256:2000")
+        response = self.recovery_login({"email": self.example_email, "recovery_password": "test", "otp": otp})
+        self.assertEqual(response.status_code, 200)
+        with self.app.app_context():
+            user = User.get_by_email(self.example_email)
+            recovery_hash = next(s for s in user.secrets if s.type == "RECOVERY").get_secret().decode()
+            self.assertTrue(recovery_hash.startswith("pbkdf2:sha256:2000$"))
+            
+            # The regular password hash waits for the next password change
+            self.assertTrue(user.check_password(self.example_password))
+            self.assertEqual(user.hashed_password, old_hash)
+            self.assertTrue(security.hasher.needs_rehash(old_hash))
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
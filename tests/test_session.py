@@ -0,0 +1,54 @@
+from unittest.mock import patch
+from config import TestConfig
+from tests import BaseTestCase, unittest
+from app import create_app
+
+class MemorySessionConfig(TestConfig):
+    SESSION_BACKEND = "memory"
+
+class SessionTestCase(BaseTestCase):
+    
+    def setUp(self):
+        self.app = create_app(MemorySessionConfig)
+        self.client = self.app.test_client()
+        self.client.environ_base["wsgi.url_scheme"] = "https"  # Secure session cookie
+        
+    def login(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 200)
+        response = self.login_user_step2(response.json["server_message"])
+        self.assertEqual(response.status_code, 200)
+        self.login_user_step3(response.json["server_message"])
+        
+    def test_unchanged_session_not_written(self):
+        cache = self.app.config["SESSION_CACHELIB"]
+        with patch.object(cache, "set", wraps=cache.set) as cache_set:
+            self.login()
+            self.assertEqual(cache_set.call_count, 1)
+            
+            for _ in range(3):
+                response = self.get_all_vault_entry_details()
+                self.assertEqual(response.status_code, 200)
+            self.assertEqual(cache_set.call_count, 1)
+            
+    def test_session_refreshed_after_interval(self):
+        self.app.config["SESSION_REFRESH_INTERVAL_SECONDS"] = 0
+        cache = self.app.config["SESSION_CACHELIB"]
+        with patch.object(cache, "set", wraps=cache.set) as cache_set:
+            self.login()
+            response = self.get_all_vault_entry_details()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(cache_set.call_count, 2)
+            
+    def test_logout_deletes_session(self):
+        self.login()
+        response = self.logout_user()
+        self.assertEqual(response.status_code, 200)
+        response = self.get_all_vault_entry_details()
+        self.assertEqual(response.status_code, 401)
+        
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -94,6 +94,165 @@ class VaultTestCase(BaseTestCase):
         response = self.search_vault_entries_by_keyword(self.example_keywords_data)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.json), 3)
+    
+    def test_search_entries_ranked(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 200)
+        response = self.login_user_step2(response.json["server_message"])
+        self.assertEqual(response.status_code, 200)
+        self.login_user_step3(response.json["server_message"])
+
+        for entry in (self.example_entry_data1, self.example_entry_data2, self.example_entry_data3):
+            response = self.add_vault_entry(entry)
+            self.assertEqual(response.status_code, 201)
+        id3 = response.json["id"]
+        
+        response = self.search_vault_entries_by_keyword({"keywords": ["website"], "limit": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 1)
+        
+        # Keywords shorter than a trigram
+        response = self.search_vault_entries_by_keyword({"keywords": ["2"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry["title"] for entry in response.json], ["Account 2"])
+        
+        # The index follows updates and deletes
+        response = self.update_vault_entry(id3, {"title": "Renamed"})
+        self.assertEqual(response.status_code, 200)
+        response = self.search_vault_entries_by_keyword({"keywords": ["renamed"]})
+        self.assertEqual([entry["title"] for entry in response.json], ["Renamed"])
+        response = self.delete_vault_entry(id3)
+        self.assertEqual(response.status_code, 200)
+        response = self.search_vault_entries_by_keyword({"keywords": ["renamed"]})
+        self.assertEqual(response.json, [])
+        
+    def test_paginate_entries(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 200)
+        response = self.login_user_step2(response.json["server_message"])
+        self.assertEqual(response.status_code, 200)
+        self.login_user_step3(response.json["server_message"])
+
+        for entry in (self.example_entry_data1, self.example_entry_data2, self.example_entry_data3):
+            response = self.add_vault_entry(entry)
+            self.assertEqual(response.status_code, 201)
+        
+        response = self.get_vault_entry_previews_page({"limit": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([preview["title"] for preview in response.json["entries"]], ["Account 1", "Account 2"])
+        next_cursor = response.json["next_cursor"]
+        self.assertIsNotNone(next_cursor)
+        
+        response = self.get_vault_entry_details_page({"limit": 2, "after": next_cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry["title"] for entry in response.json["entries"]], ["Entry 1"])
+        self.assertIsNone(response.json["next_cursor"])
+        
+        response = self.get_vault_entry_previews_page({"limit": 0})
+        self.assertEqual(response.status_code, 400)
+        
+        # Unpaginated requests keep returning a plain list
+        response = self.get_all_vault_entry_previews()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 3)
+        
+    def test_vault_changes(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 200)
+        response = self.login_user_step2(response.json["server_message"])
+        self.assertEqual(response.status_code, 200)
+        self.login_user_step3(response.json["server_message"])
+
+        response = self.add_vault_entry(self.example_entry_data1)
+        self.assertEqual(response.status_code, 201)
+        id1 = response.json["id"]
+        response = self.add_vault_entry(self.example_entry_data2)
+        self.assertEqual(response.status_code, 201)
+        
+        # The first sync returns the whole vault
+        response = self.get_vault_changes()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json["full_resync"])
+        self.assertEqual(len(response.json["entries"]), 2)
+        cursor = response.json["cursor"]
+        
+        response = self.delete_vault_entry(id1)
+        self.assertEqual(response.status_code, 200)
+        response = self.add_vault_entry(self.example_entry_data3)
+        self.assertEqual(response.status_code, 201)
+        id3 = response.json["id"]
+        
+        response = self.get_vault_changes(cursor)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json["full_resync"])
+        self.assertIn(id1, response.json["deleted"])
+        self.assertIn(id3, [entry["id"] for entry in response.json["entries"]])
+        
+    def test_batch_entries(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 200)
+        response = self.login_user_step2(response.json["server_message"])
+        self.assertEqual(response.status_code, 200)
+        self.login_user_step3(response.json["server_message"])
+
+        response = self.add_vault_entry(self.example_entry_data1)
+        self.assertEqual(response.status_code, 201)
+        id1 = response.json["id"]
+        
+        response = self.add_vault_entry(self.example_entry_data2)
+        self.assertEqual(response.status_code, 201)
+        id2 = response.json["id"]
+        
+        response = self.batch_vault_entries({"operations": [
+            {"op": "add", "entry": self.example_entry_data3},
+            {"op": "update", "id": id1, "entry": {"title": "New Account", "notes": "Some notes"}},
+            {"op": "delete", "id": id2},
+            {"op": "delete", "id": 9999},
+            {"op": "add", "entry": self.example_entry_data4}
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = response.json["results"]
+        self.assertEqual([result["status"] for result in results], [201, 200, 200, 404, 201])
+        
+        response = self.get_all_vault_entry_previews()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(preview["title"] for preview in response.json), ["Entry 1", "Entry 2", "New Account"])
+        
+    def test_batch_entries_title_conflict(self):
+        response = self.register_user(self.example_register_data)
+        self.assertEqual(response.status_code, 201)
+
+        response = self.login_user_step1(self.example_email, self.example_password)
+        self.assertEqual(response.status_code, 200)
+        response = self.login_user_step2(response.json["server_message"])
+        self.assertEqual(response.status_code, 200)
+        self.login_user_step3(response.json["server_message"])
+
+        response = self.add_vault_entry(self.example_entry_data1)
+        self.assertEqual(response.status_code, 201)
+        
+        response = self.batch_vault_entries({"operations": [
+            {"op": "add", "entry": self.example_entry_data3},
+            {"op": "add", "entry": self.example_entry_data1}
+        ]})
+        self.assertEqual(response.status_code, 409)
+        
+        # Nothing from the rejected batch was applied
+        response = self.get_all_vault_entry_previews()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 1)
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file